@@ -0,0 +1,124 @@
+"""
+Audio input and output for the assistant.
+
+The assistant opens input streams through an audio source and plays sound
+through an audio sink, so the live microphone and speaker can be swapped
+for recorded WAV fixtures (see ``tests/benchmark_replay.py``).
+
+A source's ``open()`` returns a context manager with
+``read(frames) -> (data, overflowed)``, the interface of
+``sounddevice.InputStream``. A sink has ``play(data, samplerate)`` and
+blocks until playback finishes.
+"""
+import threading
+import time
+import wave
+
+import numpy as np
+
+
+class MicrophoneSource:
+    """The default input device."""
+
+    def __init__(self, samplerate, channels, dtype):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+
+    def open(self):
+        import sounddevice as sd
+        return sd.InputStream(samplerate=self.samplerate, channels=self.channels, dtype=self.dtype)
+
+
+class SpeakerSink:
+    """The default output device."""
+
+    def play(self, data, samplerate):
+        import sounddevice as sd
+        sd.play(data, samplerate)
+        sd.wait()
+
+
+def read_wav(path):
+    """Read a 16-bit PCM WAV file into an int16 array of shape (frames, channels)."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM, got {8 * wav.getsampwidth()}-bit")
+        channels = wav.getnchannels()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        return samples.reshape(-1, channels), wav.getframerate()
+
+
+def write_wav(path, samples, samplerate):
+    samples = np.asarray(samples, dtype=np.int16)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1 if samples.ndim == 1 else samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(samples.tobytes())
+
+
+class WavFileSource:
+    """Replays a recording in real time, the way a microphone would deliver it.
+
+    The recording starts playing when the first stream is opened. Like a
+    microphone, a stream opened later starts at the current position, and
+    two open streams both see the same audio. Once the recording has run
+    out, streams read silence and ``finished`` is set.
+    """
+
+    def __init__(self, samples, samplerate):
+        samples = np.asarray(samples, dtype=np.int16)
+        self.samples = samples.reshape(-1, 1) if samples.ndim == 1 else samples
+        self.samplerate = samplerate
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, samplerate=None):
+        samples, file_rate = read_wav(path)
+        if samplerate and samplerate != file_rate:
+            raise ValueError(f"{path}: recorded at {file_rate} Hz, the assistant expects {samplerate} Hz")
+        return cls(samples, file_rate)
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.samplerate
+
+    def position(self):
+        """Frames played so far."""
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.perf_counter()
+            return int((time.perf_counter() - self._started_at) * self.samplerate)
+
+    @property
+    def finished(self):
+        return self._started_at is not None and self.position() >= len(self.samples)
+
+    def open(self):
+        return _ReplayStream(self, self.position())
+
+
+class _ReplayStream:
+    def __init__(self, source, cursor):
+        self.source = source
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self, frames):
+        end = self.cursor + frames
+        wait = (end - self.source.position()) / self.source.samplerate
+        if wait > 0:
+            time.sleep(wait)
+        samples = self.source.samples
+        data = samples[self.cursor:end]
+        if len(data) < frames:
+            data = np.concatenate([data, np.zeros((frames - len(data), samples.shape[1]), dtype=np.int16)])
+        self.cursor = end
+        return data, False
@@ -1,6 +1,7 @@
 """
 Configuration for the Quintilian voice assistant.
 """
+import os
 
 # The domain name that will point to your server
 SERVER_DOMAIN = "13.57.89.95"
@@ -8,12 +9,66 @@ SERVER_DOMAIN = "13.57.89.95"
 # The base URL for the server
 SERVER_URL = f"http://{SERVER_DOMAIN}:8000"
 
+# Identifies this home to the server (rate limits, fair scheduling, usage)
+HOUSEHOLD_ID = "default"
+# Proves it is this home (X-Household-Key); must match the server's HOUSEHOLD_KEYS entry.
+# Leave empty for a server without HOUSEHOLD_KEYS, which serves only the "default" household
+HOUSEHOLD_KEY = os.getenv("QUINTILIAN_HOUSEHOLD_KEY", "")
+
+# How often to pull schedule changes made on the household's other devices (seconds)
+SCHEDULE_SYNC_INTERVAL = 30
+
+# Questions asked while the server is unreachable wait in the local outbox (see outbox.py)
+OUTBOX_SETTINGS = {
+    "interval": 15.0,  # Seconds between delivery rounds while commands are waiting
+    "batch_size": 10,  # Commands sent per round, oldest first
+    "backoff_seconds": 5.0,  # Wait after a failed round, doubled per failure (with jitter)
+    "max_backoff_seconds": 300.0,
+    "max_attempts": 5,  # Server errors before a command is dropped
+}
+QUESTION_TIMEOUT = 60  # Seconds to wait for the server to answer a question
+
+# "msgpack" sends the context and asks for answers as MessagePack (smaller, faster to encode).
+# Only switch once the server is deployed with wire.py: an older one ignores the packed context
+# and answers without it. Falls back to JSON if the msgpack package is missing (see wire.py)
+WIRE_FORMAT = "json"
+
 # Wake word settings
-WAKE_WORD = "hey_jarvis"
+WAKE_WORD = "hey_jarvis"  # Primary wake word (benchmarks and tests use this one)
+
+# Every wake word the household uses, scored together on each frame. The one
+# that fires is sent to the server (X-Wake-Word) as a hint about who is
+# speaking, e.g. "hey_mycroft" for the nanny; see WAKE_WORD_PROFILES on the server.
+WAKE_WORDS = {
+    WAKE_WORD: {"threshold": 0.6, "cooldown": 2.0},
+    # "hey_mycroft": {"threshold": 0.5, "cooldown": 2.0},
+}
+WAKEWORD_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")  # Checksum-verified ONNX cache
+
+# ONNX Runtime settings for wake word inference (defaults in wakeword_models.DEFAULT_SESSION).
+# Compare settings on the device with tests/benchmark_onnx.py.
+WAKEWORD_ONNX = {
+    "intra_op_threads": 1,
+    "inter_op_threads": 1,
+    "graph_optimization": "all",
+    "execution_mode": "sequential",
+    "spinning": False,
+    "quantized": [],
+}
+
+# Only run the wake word model while the microphone hears something (see wakeword_gate.py).
+# min_rms is in int16 units: keep it above the room's background level, below a quiet voice.
+WAKEWORD_GATE = {
+    "enabled": True,
+    "min_rms": 40.0,
+    "lookback_seconds": 2.0,  # At least the model's ~2 s context, so detection is unchanged
+    "hangover_seconds": 1.0,
+}
 
 # Audio settings
 AUDIO_SETTINGS = {
     "CHUNK": 1024,
+    "WAKEWORD_CHUNK": 1280,  # openWakeWord's native 80 ms frame; other sizes add up to 80 ms of delay
     "FORMAT": 'int16',
     "CHANNELS": 1,
     "RATE": 16000,
@@ -1,11 +1,78 @@
 from .database import get_db, init_db
-from .models import Base, FamilyProfile, DailyContext, ActivityLog
+from .session import ScopedSession, session_scope, read_session
+from .models import (
+    Base,
+    FamilyProfile,
+    DailyContext,
+    ActivityLog,
+    ScheduleEntry,
+    ScheduleChange,
+    DailyRollup,
+    ActivityRollup,
+    SyncState,
+    PendingCommand
+)
+from .activity_ingest import log_activities, backfill_checklist, import_nanny_log
+from .schedule import (
+    ensure_entries,
+    get_activity_time,
+    set_activity_time,
+    next_activity,
+    schedule_as_dict
+)
+from .rollups import apply_rollups, rebuild_rollups, daily_summary, activity_summary
+from .trends import load_activity_arrays, weekly_totals, week_over_week, rolling_average, weekly_trends, describe_trends
+from .schedule_journal import (
+    ScheduleConflict,
+    schedule_version,
+    retry_schedule_write,
+    record_change,
+    current_schedule,
+    undo_last_change,
+    change_history,
+    adjustments_from_journal
+)
 
 __all__ = [
     'get_db',
     'init_db',
+    'ScopedSession',
+    'session_scope',
+    'read_session',
     'Base',
     'FamilyProfile',
     'DailyContext',
-    'ActivityLog'
-] 
\ No newline at end of file
+    'ActivityLog',
+    'ScheduleEntry',
+    'ScheduleChange',
+    'DailyRollup',
+    'ActivityRollup',
+    'SyncState',
+    'PendingCommand',
+    'log_activities',
+    'backfill_checklist',
+    'import_nanny_log',
+    'apply_rollups',
+    'rebuild_rollups',
+    'daily_summary',
+    'activity_summary',
+    'load_activity_arrays',
+    'weekly_totals',
+    'week_over_week',
+    'rolling_average',
+    'weekly_trends',
+    'describe_trends',
+    'ensure_entries',
+    'get_activity_time',
+    'set_activity_time',
+    'next_activity',
+    'schedule_as_dict',
+    'ScheduleConflict',
+    'schedule_version',
+    'retry_schedule_write',
+    'record_change',
+    'current_schedule',
+    'undo_last_change',
+    'change_history',
+    'adjustments_from_journal'
+]
\ No newline at end of file
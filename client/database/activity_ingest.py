@@ -0,0 +1,144 @@
+"""
+Bulk write path for activity logs.
+
+Events are plain dicts (the same shape the client sends as
+``recent_activities``) and are written with a single executemany inside
+one transaction. Every row carries an idempotency key so replaying an
+import or a backfill never creates duplicates. The daily rollups (see
+rollups.py) are updated in the same transaction.
+"""
+import csv
+import hashlib
+import logging
+from datetime import datetime, timedelta, time as dt_time
+
+from .models import ActivityLog
+from .rollups import apply_rollups
+from .schedule import ensure_entries, get_activity_time, parse_time
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps bound parameters per statement (999 on older builds), so
+# key lookups are chunked well below that.
+KEY_LOOKUP_CHUNK = 500
+
+VALID_STATUSES = ("completed", "skipped", "in_progress")
+
+
+def make_idempotency_key(family_id, activity_name, start_time):
+    """Derive a stable key for an activity occurrence."""
+    raw = f"{family_id}|{activity_name.strip().lower()}|{start_time.isoformat()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _parse_datetime(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _event_to_row(event, family_id, daily_context_id, now):
+    start_time = _parse_datetime(event["start_time"])
+    row_family_id = event.get("family_id", family_id)
+    status = event.get("status") or "completed"
+    if status not in VALID_STATUSES:
+        raise ValueError(f"Unknown activity status: {status}")
+
+    return {
+        "family_id": row_family_id,
+        "daily_context_id": event.get("daily_context_id", daily_context_id),
+        "activity_name": event["activity_name"],
+        "start_time": start_time,
+        "end_time": _parse_datetime(event.get("end_time")),
+        "notes": event.get("notes"),
+        "status": status,
+        "idempotency_key": event.get("idempotency_key")
+        or make_idempotency_key(row_family_id, event["activity_name"], start_time),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _existing_keys(db, keys):
+    found = set()
+    for i in range(0, len(keys), KEY_LOOKUP_CHUNK):
+        chunk = keys[i:i + KEY_LOOKUP_CHUNK]
+        rows = db.query(ActivityLog.idempotency_key).filter(
+            ActivityLog.idempotency_key.in_(chunk)
+        ).all()
+        found.update(row[0] for row in rows)
+    return found
+
+
+def log_activities(db, events, family_id=None, daily_context_id=None):
+    """Insert many activity events in one transaction.
+
+    Events whose idempotency key is already stored (or repeated within the
+    batch) are skipped. Returns the number of rows actually inserted.
+    """
+    now = datetime.utcnow()
+    rows = {}
+    for event in events:
+        row = _event_to_row(event, family_id, daily_context_id, now)
+        rows.setdefault(row["idempotency_key"], row)
+
+    if not rows:
+        return 0
+
+    try:
+        existing = _existing_keys(db, list(rows))
+        new_rows = [row for key, row in rows.items() if key not in existing]
+        if new_rows:
+            db.execute(ActivityLog.__table__.insert(), new_rows)
+            apply_rollups(db, new_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"Logged {len(new_rows)} activities ({len(existing)} already present)")
+    return len(new_rows)
+
+
+def backfill_checklist(db, daily_context, checklist):
+    """Log a day's checklist after the fact.
+
+    ``checklist`` maps activity names from the day's schedule to a status
+    ("completed" or "skipped"). Start times come from the schedule, so
+    re-running the backfill for the same day is a no-op.
+    """
+    ensure_entries(db, daily_context)
+    day = datetime.combine(daily_context.date.date(), dt_time(0, 0))
+    events = []
+    for activity_name, status in checklist.items():
+        start = get_activity_time(db, daily_context.id, activity_name)
+        if start is None:
+            logger.warning(f"No scheduled time for {activity_name}, using midnight")
+            start = "00:00"
+        events.append({
+            "activity_name": activity_name,
+            "start_time": day + timedelta(minutes=parse_time(start)),
+            "status": status,
+        })
+    return log_activities(
+        db,
+        events,
+        family_id=daily_context.family_id,
+        daily_context_id=daily_context.id,
+    )
+
+
+def import_nanny_log(db, path, family_id, daily_context_id=None):
+    """Import a nanny log CSV.
+
+    Expected columns: ``activity_name``, ``start_time`` and optionally
+    ``end_time``, ``status`` and ``notes`` (times in ISO 8601).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        events = [
+            {key: (value or None) for key, value in row.items()}
+            for row in csv.DictReader(f)
+        ]
+    return log_activities(db, events, family_id=family_id, daily_context_id=daily_context_id)
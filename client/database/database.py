@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -11,8 +11,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DB_DIR = BASE_DIR / "data"
 DB_DIR.mkdir(exist_ok=True)
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_DIR}/quintilian.db"
+# SQLite database URL (QUINTILIAN_DATABASE_URL points elsewhere, e.g. a benchmark's scratch copy)
+SQLALCHEMY_DATABASE_URL = os.getenv("QUINTILIAN_DATABASE_URL", f"sqlite:///{DB_DIR}/quintilian.db")
 
 # Create SQLAlchemy engine
 engine = create_engine(
@@ -31,6 +31,53 @@ def get_db():
         db.close()
 
 # Create all tables
-def init_db():
+def init_db(bind=None):
     from .models import Base
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    _add_missing_columns(Base, bind)
+    _add_missing_indexes(Base, bind)
+    _backfill_rollups(bind)
+
+def _backfill_rollups(bind):
+    """Fill the rollup tables from activity logs written before they existed."""
+    from .rollups import ensure_rollups
+    db = sessionmaker(bind=bind)()
+    try:
+        ensure_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+
+def _add_missing_columns(base, bind):
+    """Add columns introduced after a table was first created.
+
+    create_all() only creates missing tables, so existing SQLite files would
+    otherwise keep their old column set.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                if column.server_default is not None:
+                    # SQLite only adds a NOT NULL column together with a default
+                    default = column.server_default.arg
+                    default = f"'{default}'" if isinstance(default, str) else str(default)
+                    col_type += f" {'NOT NULL ' if not column.nullable else ''}DEFAULT {default}"
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                if column.index or column.unique:
+                    unique = "UNIQUE " if column.unique else ""
+                    conn.execute(text(
+                        f"CREATE {unique}INDEX IF NOT EXISTS ix_{table.name}_{column.name} "
+                        f"ON {table.name} ({column.name})"
+                    ))
+
+def _add_missing_indexes(base, bind):
+    """Create composite indexes added to a table after it was first created."""
+    for table in base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, JSON, ForeignKey, Text, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -29,15 +29,26 @@ class DailyContext(Base):
     adjustments = Column(JSON, default={})  # Stores any schedule adjustments
     overrides = Column(JSON, default={})  # Stores any schedule overrides
     mood_notes = Column(Text)  # Any notes about the child's mood
+    snapshot_change_id = Column(Integer)  # Last ScheduleChange folded into `schedule`
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped by every schedule write (compare-and-swap)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     family = relationship("FamilyProfile", back_populates="daily_contexts")
     activities = relationship("ActivityLog", back_populates="daily_context")
+    schedule_entries = relationship(
+        "ScheduleEntry", back_populates="daily_context", order_by="ScheduleEntry.start_minute"
+    )
+    schedule_changes = relationship(
+        "ScheduleChange", back_populates="daily_context", order_by="ScheduleChange.id"
+    )
 
 class ActivityLog(Base):
     __tablename__ = "activity_log"
+    __table_args__ = (
+        Index("ix_activity_log_family_start", "family_id", "start_time"),  # Range loads for trends
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     family_id = Column(Integer, ForeignKey("family_profile.id"))
@@ -47,9 +58,118 @@ class ActivityLog(Base):
     end_time = Column(DateTime)
     notes = Column(Text)
     status = Column(String(50), default="completed")  # completed, skipped, in_progress
+    idempotency_key = Column(String(64), unique=True, index=True)  # Dedupes bulk imports
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     family = relationship("FamilyProfile", back_populates="activity_logs")
-    daily_context = relationship("DailyContext", back_populates="activities") 
\ No newline at end of file
+    daily_context = relationship("DailyContext", back_populates="activities") 
+
+class ScheduleEntry(Base):
+    """One activity in a day's schedule, stored as its own row.
+
+    Times are minutes after midnight so "what's next" is an indexed range
+    query and moving one activity is a single-row UPDATE.
+    """
+    __tablename__ = "schedule_entry"
+    __table_args__ = (
+        UniqueConstraint("daily_context_id", "activity_name", name="uq_schedule_entry_activity"),
+        Index("ix_schedule_entry_context_start", "daily_context_id", "start_minute"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    daily_context_id = Column(Integer, ForeignKey("daily_context.id"), nullable=False)
+    activity_name = Column(String(100), nullable=False)
+    start_minute = Column(Integer, nullable=False)  # Minutes after midnight
+    server_seq = Column(Integer)  # The household store's seq for this entry when last synced (see schedule_sync.py)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    daily_context = relationship("DailyContext", back_populates="schedule_entries")
+
+class ScheduleChange(Base):
+    """Append-only journal of schedule changes.
+
+    Rows are never updated or deleted; an undo is a new row pointing at the
+    change it reverts.
+    """
+    __tablename__ = "schedule_change"
+    __table_args__ = (
+        Index("ix_schedule_change_context_id", "daily_context_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    daily_context_id = Column(Integer, ForeignKey("daily_context.id"), nullable=False)
+    activity_name = Column(String(100), nullable=False)
+    old_minute = Column(Integer)  # Minutes after midnight before the change
+    new_minute = Column(Integer, nullable=False)
+    source = Column(String(50), default="voice")  # voice, undo, sync, ...
+    reverts_id = Column(Integer, ForeignKey("schedule_change.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    daily_context = relationship("DailyContext", back_populates="schedule_changes")
+
+class DailyRollup(Base):
+    """Per-day activity totals, kept up to date by log_activities().
+
+    Summary questions and the prompt read this row instead of scanning
+    ``activity_log``; ``rollups.rebuild_rollups()`` recomputes it from the log.
+    """
+    __tablename__ = "daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("family_id", "day", name="uq_daily_rollup_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    family_id = Column(Integer, ForeignKey("family_profile.id"))
+    day = Column(Date, nullable=False)  # Local date of the activities' start times
+    activity_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    in_progress_count = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Float, nullable=False, default=0.0)  # Sum of end - start where end is known
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ActivityRollup(Base):
+    """Per-day totals for one activity (same columns as DailyRollup)."""
+    __tablename__ = "activity_rollup"
+    __table_args__ = (
+        UniqueConstraint("family_id", "day", "activity_name", name="uq_activity_rollup_day_activity"),
+        Index("ix_activity_rollup_family_activity_day", "family_id", "activity_name", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    family_id = Column(Integer, ForeignKey("family_profile.id"))
+    day = Column(Date, nullable=False)
+    activity_name = Column(String(100), nullable=False)
+    activity_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    in_progress_count = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SyncState(Base):
+    """Named counters for syncing with the server (e.g. the schedule sync cursor)."""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False, unique=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PendingCommand(Base):
+    """A request the server couldn't be reached for, replayed in order by the outbox (see outbox.py)."""
+    __tablename__ = "pending_command"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String(100), nullable=False)  # e.g. "/process-audio", "/modify-schedule"
+    payload = Column(JSON, default={})  # JSON body, or the form fields for /process-audio
+    audio = Column(LargeBinary)  # FLAC-compressed recording, for /process-audio
+    wake_word = Column(String(50))
+    attempts = Column(Integer, nullable=False, default=0)  # Failed deliveries the server answered
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
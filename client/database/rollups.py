@@ -0,0 +1,138 @@
+"""
+Materialized daily summaries of the activity log.
+
+``DailyRollup`` holds one row per family and day, ``ActivityRollup`` one
+per family, day and activity: counts by status and total minutes.
+``log_activities()`` folds each batch into them in the same transaction
+as the insert (an UPDATE ... SET count = count + n per touched row, or an
+INSERT for a new day/activity), so "what has the nanny done today?" and
+the prompt read a handful of rows however long the log gets.
+
+Days are the local date of ``start_time``. Minutes only count activities
+with an ``end_time``. Activity rows are never updated after insert; if
+that changes, or the rollups are lost, ``rebuild_rollups()`` recomputes
+them from the log.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, insert, update
+
+from .models import ActivityLog, ActivityRollup, DailyRollup
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("activity_count", "completed_count", "skipped_count", "in_progress_count", "total_minutes")
+
+
+def _minutes(start_time, end_time):
+    if start_time is None or end_time is None:
+        return 0.0
+    return max((end_time - start_time).total_seconds() / 60, 0.0)
+
+
+def _deltas(rows):
+    """Sum activity rows (dicts) into {(model, key columns): counter deltas}."""
+    deltas = {}
+    for row in rows:
+        day = row["start_time"].date()
+        status_counter = f"{row.get('status') or 'completed'}_count"
+        keys = (
+            (DailyRollup, (("family_id", row["family_id"]), ("day", day))),
+            (ActivityRollup, (("family_id", row["family_id"]), ("day", day),
+                              ("activity_name", row["activity_name"]))),
+        )
+        for model, key in keys:
+            totals = deltas.setdefault((model, key), dict.fromkeys(COUNTERS, 0))
+            totals["activity_count"] += 1
+            if status_counter in totals:
+                totals[status_counter] += 1
+            totals["total_minutes"] += _minutes(row["start_time"], row.get("end_time"))
+    return deltas
+
+
+def apply_rollups(db, rows):
+    """Add newly inserted activity rows to the rollups. The caller owns the transaction."""
+    now = datetime.utcnow()
+    for (model, key), totals in _deltas(rows).items():
+        table = model.__table__
+        # "col == None" renders as IS NULL, so rows without a family still match
+        where = [table.c[name] == value for name, value in key]
+        result = db.execute(
+            update(table).where(*where).values(
+                **{name: table.c[name] + delta for name, delta in totals.items()}, updated_at=now
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**dict(key), **totals, updated_at=now))
+    return len(rows)
+
+
+def rebuild_rollups(db, family_id=None):
+    """Recompute the rollups from ``activity_log``. The caller owns the transaction."""
+    for model in (DailyRollup, ActivityRollup):
+        query = db.query(model)
+        if family_id is not None:
+            query = query.filter(model.family_id == family_id)
+        query.delete(synchronize_session=False)
+
+    query = db.query(
+        ActivityLog.family_id, ActivityLog.activity_name, ActivityLog.start_time,
+        ActivityLog.end_time, ActivityLog.status
+    )
+    if family_id is not None:
+        query = query.filter(ActivityLog.family_id == family_id)
+    rows = [row._asdict() for row in query]
+    apply_rollups(db, rows)
+    logger.info(f"Rebuilt activity rollups from {len(rows)} log rows")
+    return len(rows)
+
+
+def ensure_rollups(db):
+    """Backfill the rollups for logs written before they existed."""
+    if db.query(DailyRollup.id).first() is not None or db.query(ActivityLog.id).first() is None:
+        return 0
+    return rebuild_rollups(db)
+
+
+def _totals(row):
+    count = row.activity_count or 0
+    return {
+        "count": count,
+        "completed": row.completed_count or 0,
+        "skipped": row.skipped_count or 0,
+        "in_progress": row.in_progress_count or 0,
+        "total_minutes": round(row.total_minutes or 0.0, 1),
+        "completed_ratio": round((row.completed_count or 0) / count, 3) if count else 0.0,
+        "skipped_ratio": round((row.skipped_count or 0) / count, 3) if count else 0.0,
+    }
+
+
+def daily_summary(db, family_id, day):
+    """Totals for one day plus a breakdown per activity, or None if nothing was logged."""
+    total = db.query(DailyRollup).filter(
+        DailyRollup.family_id == family_id, DailyRollup.day == day
+    ).first()
+    if total is None:
+        return None
+    activities = db.query(ActivityRollup).filter(
+        ActivityRollup.family_id == family_id, ActivityRollup.day == day
+    ).order_by(ActivityRollup.activity_name).all()
+    return {
+        "day": day.isoformat(),
+        **_totals(total),
+        "activities": {row.activity_name: _totals(row) for row in activities},
+    }
+
+
+def activity_summary(db, family_id, start_day, end_day):
+    """Per-activity totals over the days from ``start_day`` to ``end_day`` inclusive."""
+    rows = db.query(
+        ActivityRollup.activity_name,
+        *(func.sum(getattr(ActivityRollup, name)).label(name) for name in COUNTERS)
+    ).filter(
+        ActivityRollup.family_id == family_id,
+        ActivityRollup.day >= start_day,
+        ActivityRollup.day <= end_day,
+    ).group_by(ActivityRollup.activity_name).order_by(ActivityRollup.activity_name).all()
+    return {row.activity_name: _totals(row) for row in rows}
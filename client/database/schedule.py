@@ -0,0 +1,148 @@
+"""
+Row-per-activity access to a day's schedule.
+
+``DailyContext.schedule`` has been written in several shapes over time
+("07:00", {"time": "07:00"}, {"start_time": "07:00"} and period groups like
+{"morning": {"7:00 AM": "Wake up"}}). The first time a day is touched its
+JSON is flattened into ``ScheduleEntry`` rows; after that reads and writes
+go through the rows and the blob is no longer rewritten.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import ScheduleEntry
+
+logger = logging.getLogger(__name__)
+
+# insert() constructs that support ON CONFLICT DO NOTHING, by dialect name
+CONFLICT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+TIME_FORMATS = ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p")
+
+
+def parse_time(value):
+    """Return minutes after midnight for any stored schedule value, or None."""
+    if isinstance(value, dict):
+        value = value.get("start_time") or value.get("time")
+    if not isinstance(value, str):
+        return None
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip().upper(), fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    return None
+
+
+def format_time(minutes):
+    """Format minutes after midnight as 24-hour "HH:MM"."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def flatten_schedule(schedule):
+    """Yield (activity_name, start_minute) pairs from a schedule JSON blob."""
+    for key, value in (schedule or {}).items():
+        minute = parse_time(value)
+        if minute is not None:
+            yield key, minute
+        elif isinstance(value, dict):
+            # Period group: {"7:00 AM": "Wake up", ...}
+            for time_key, activity_name in value.items():
+                minute = parse_time(time_key)
+                if minute is not None and isinstance(activity_name, str):
+                    yield activity_name, minute
+        else:
+            logger.warning(f"Skipping schedule entry with no readable time: {key}")
+
+
+def ensure_entries(db, daily_context):
+    """Create ScheduleEntry rows from the JSON schedule if the day has none yet.
+
+    Returns True if the day had no rows. The caller owns the transaction.
+    """
+    has_rows = db.query(ScheduleEntry.id).filter(
+        ScheduleEntry.daily_context_id == daily_context.id
+    ).first()
+    if has_rows:
+        return False
+
+    rows = {}
+    for activity_name, minute in flatten_schedule(daily_context.schedule):
+        rows.setdefault(activity_name, minute)
+    if rows:
+        # Another thread may be flattening the same day; the first writer wins
+        db.execute(_insert_ignoring_conflicts(db), [
+            {
+                "daily_context_id": daily_context.id,
+                "activity_name": activity_name,
+                "start_minute": minute,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
+            }
+            for activity_name, minute in rows.items()
+        ])
+    return True
+
+
+def get_activity_time(db, daily_context_id, activity_name):
+    """Return the "HH:MM" start time of one activity, or None."""
+    minute = db.query(ScheduleEntry.start_minute).filter(
+        ScheduleEntry.daily_context_id == daily_context_id,
+        ScheduleEntry.activity_name == activity_name,
+    ).scalar()
+    return format_time(minute) if minute is not None else None
+
+
+def set_activity_time(db, daily_context_id, activity_name, new_time):
+    """Move one activity with a single-row UPDATE.
+
+    Returns True if the activity exists. The caller owns the transaction.
+    """
+    minute = parse_time(new_time)
+    if minute is None:
+        raise ValueError(f"Unreadable schedule time: {new_time}")
+    result = db.execute(
+        update(ScheduleEntry)
+        .where(
+            ScheduleEntry.daily_context_id == daily_context_id,
+            ScheduleEntry.activity_name == activity_name,
+        )
+        .values(start_minute=minute, updated_at=datetime.utcnow())
+    )
+    return result.rowcount > 0
+
+
+def next_activity(db, daily_context_id, after=None):
+    """Return (activity_name, "HH:MM") of the next activity at or after ``after``.
+
+    ``after`` is a datetime or time; defaults to now.
+    """
+    after = after or datetime.now()
+    minute = after.hour * 60 + after.minute
+    row = db.query(ScheduleEntry.activity_name, ScheduleEntry.start_minute).filter(
+        ScheduleEntry.daily_context_id == daily_context_id,
+        ScheduleEntry.start_minute >= minute,
+    ).order_by(ScheduleEntry.start_minute).first()
+    if row is None:
+        return None
+    return row.activity_name, format_time(row.start_minute)
+
+
+def schedule_as_dict(db, daily_context_id):
+    """Return the day's schedule as {activity_name: "HH:MM"} in time order."""
+    rows = db.query(ScheduleEntry.activity_name, ScheduleEntry.start_minute).filter(
+        ScheduleEntry.daily_context_id == daily_context_id
+    ).order_by(ScheduleEntry.start_minute).all()
+    return {row.activity_name: format_time(row.start_minute) for row in rows}
+
+
+def _insert_ignoring_conflicts(db):
+    """An INSERT into schedule_entry that skips rows already there."""
+    dialect = db.get_bind().dialect.name
+    if dialect not in CONFLICT_INSERTS:
+        raise NotImplementedError(f"Schedule entries need ON CONFLICT DO NOTHING, which {dialect} lacks here")
+    return CONFLICT_INSERTS[dialect](ScheduleEntry).on_conflict_do_nothing()
@@ -0,0 +1,216 @@
+"""
+Append-only history of schedule changes.
+
+Every change is a small INSERT into ``schedule_change`` (plus the one-row
+``ScheduleEntry`` update). Every ``SNAPSHOT_INTERVAL`` changes the current
+schedule is folded back into ``DailyContext.schedule`` and
+``snapshot_change_id`` records how far the snapshot reaches, so the current
+schedule is always "snapshot + journal tail".
+
+Writers don't lock the day. ``DailyContext.version`` is bumped by every
+change with a compare-and-swap UPDATE (``WHERE version = <version read
+before the change>``) as the change's first write. If another writer got
+there first the swap matches no row, ``ScheduleConflict`` is raised and
+``retry_schedule_write()`` rolls back and runs the change again against
+the new state.
+"""
+import logging
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import func, update
+
+from .models import DailyContext, ScheduleChange
+from .schedule import (
+    ensure_entries,
+    flatten_schedule,
+    format_time,
+    get_activity_time,
+    parse_time,
+    schedule_as_dict,
+    set_activity_time,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = 20
+
+SCHEDULE_WRITE_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 0.01  # Doubled per attempt, with jitter
+
+
+class ScheduleConflict(Exception):
+    """The day's schedule changed between reading it and writing to it."""
+
+
+def schedule_version(db, daily_context_id):
+    """The day's current version, read from the database (not the identity map)."""
+    return db.query(DailyContext.version).filter(DailyContext.id == daily_context_id).scalar() or 0
+
+
+def claim_version(db, daily_context, expected_version):
+    """Compare-and-swap the day's version to ``expected_version + 1``.
+
+    Raises ScheduleConflict if another writer changed the day first.
+    """
+    result = db.execute(
+        update(DailyContext.__table__)
+        .where(DailyContext.id == daily_context.id, DailyContext.version == expected_version)
+        .values(version=expected_version + 1)
+    )
+    if result.rowcount != 1:
+        raise ScheduleConflict(f"Daily context {daily_context.id} is no longer at version {expected_version}")
+    db.expire(daily_context, ["version"])
+    return expected_version + 1
+
+
+def retry_schedule_write(db, write, attempts=None):
+    """Run ``write(db)`` and commit, retrying on ScheduleConflict.
+
+    ``write`` must read whatever it bases the change on itself, since each
+    retry has to see the other writer's result. Returns what it returns.
+    """
+    attempts = attempts or SCHEDULE_WRITE_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            result = write(db)
+            db.commit()
+            return result
+        except ScheduleConflict:
+            db.rollback()
+            if attempt == attempts:
+                raise
+            logger.info(f"Schedule write conflict, retrying (attempt {attempt} of {attempts})")
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+
+def record_change(db, daily_context, activity_name, new_time, source="voice", reverts_id=None,
+                  expected_version=None):
+    """Move an activity and append the change to the journal.
+
+    ``expected_version`` is the day's version when the caller read what the
+    change is based on (e.g. the time being delayed); by default it is read
+    here. Returns the new ScheduleChange, or None if the activity is not in
+    the day's schedule. Raises ScheduleConflict if the day changed since.
+    The caller owns the transaction.
+    """
+    if expected_version is None:
+        expected_version = schedule_version(db, daily_context.id)
+    ensure_entries(db, daily_context)
+    old_time = get_activity_time(db, daily_context.id, activity_name)
+    if old_time is None:
+        return None
+
+    claim_version(db, daily_context, expected_version)
+    set_activity_time(db, daily_context.id, activity_name, new_time)
+    change = ScheduleChange(
+        daily_context_id=daily_context.id,
+        activity_name=activity_name,
+        old_minute=parse_time(old_time),
+        new_minute=parse_time(new_time),
+        source=source,
+        reverts_id=reverts_id,
+        created_at=datetime.utcnow(),
+    )
+    db.add(change)
+    db.flush()
+
+    if _tail_length(db, daily_context) >= SNAPSHOT_INTERVAL:
+        snapshot(db, daily_context)
+    return change
+
+
+def _tail_query(db, daily_context):
+    query = db.query(ScheduleChange).filter(
+        ScheduleChange.daily_context_id == daily_context.id
+    )
+    if daily_context.snapshot_change_id:
+        query = query.filter(ScheduleChange.id > daily_context.snapshot_change_id)
+    return query
+
+
+def _tail_length(db, daily_context):
+    return _tail_query(db, daily_context).with_entities(func.count(ScheduleChange.id)).scalar()
+
+
+def snapshot(db, daily_context):
+    """Fold the journal into ``DailyContext.schedule``."""
+    last_id = db.query(func.max(ScheduleChange.id)).filter(
+        ScheduleChange.daily_context_id == daily_context.id
+    ).scalar()
+    daily_context.schedule = schedule_as_dict(db, daily_context.id)
+    daily_context.snapshot_change_id = last_id
+    logger.info(f"Snapshotted schedule for daily context {daily_context.id} at change {last_id}")
+
+
+def current_schedule(db, daily_context):
+    """Return {activity_name: "HH:MM"} from the snapshot plus the journal tail."""
+    minutes = {}
+    for activity_name, minute in flatten_schedule(daily_context.schedule):
+        minutes.setdefault(activity_name, minute)
+    for change in _tail_query(db, daily_context).order_by(ScheduleChange.id):
+        minutes[change.activity_name] = change.new_minute
+    return {
+        name: format_time(minute)
+        for name, minute in sorted(minutes.items(), key=lambda item: item[1])
+    }
+
+
+def undo_last_change(db, daily_context):
+    """Revert the most recent change that has not been undone yet.
+
+    The revert is appended as its own change. Returns it, or None if there
+    is nothing to undo. The caller owns the transaction.
+    """
+    version = schedule_version(db, daily_context.id)
+    reverted = db.query(ScheduleChange.reverts_id).filter(
+        ScheduleChange.daily_context_id == daily_context.id,
+        ScheduleChange.reverts_id.isnot(None),
+    )
+    last = db.query(ScheduleChange).filter(
+        ScheduleChange.daily_context_id == daily_context.id,
+        ScheduleChange.reverts_id.is_(None),
+        ScheduleChange.id.notin_(reverted),
+    ).order_by(ScheduleChange.id.desc()).first()
+    if last is None or last.old_minute is None:
+        return None
+    return record_change(
+        db, daily_context, last.activity_name, format_time(last.old_minute),
+        source="undo", reverts_id=last.id, expected_version=version,
+    )
+
+
+def change_history(db, daily_context_id, activity_name=None, since=None):
+    """Audit query: the day's changes, oldest first, as plain dicts."""
+    query = db.query(ScheduleChange).filter(ScheduleChange.daily_context_id == daily_context_id)
+    if activity_name:
+        query = query.filter(ScheduleChange.activity_name == activity_name)
+    if since:
+        query = query.filter(ScheduleChange.created_at >= since)
+    return [
+        {
+            "id": change.id,
+            "activity_name": change.activity_name,
+            "original_time": format_time(change.old_minute) if change.old_minute is not None else None,
+            "new_time": format_time(change.new_minute),
+            "source": change.source,
+            "reverts_id": change.reverts_id,
+            "timestamp": change.created_at.isoformat(),
+        }
+        for change in query.order_by(ScheduleChange.id)
+    ]
+
+
+def adjustments_from_journal(db, daily_context_id):
+    """Summarize the journal in the legacy ``adjustments`` shape.
+
+    One entry per activity: the time before its first change today and the
+    time after its latest change.
+    """
+    adjustments = {}
+    for change in change_history(db, daily_context_id):
+        entry = adjustments.setdefault(change["activity_name"], {"original_time": change["original_time"]})
+        entry["new_time"] = change["new_time"]
+        entry["timestamp"] = change["timestamp"]
+    return adjustments
@@ -0,0 +1,49 @@
+"""
+Short-lived, thread-local sessions for code that reads the database and
+hands ORM objects to someone else (the prompt builders).
+
+``ScopedSession`` keeps one session per thread, so the wake word thread,
+the reminder timers and the question threads never share one. Each
+``session_scope()`` is one unit of work: it commits on success, rolls back
+on error and always closes the session, returning the connection to the
+pool. A scope opened inside another on the same thread joins the outer one
+and leaves the commit and close to it.
+
+``read_session()`` is the read-only variant: it never commits, and closing
+ends the read transaction so SQLite's shared lock isn't held between
+questions. Sessions are made with ``expire_on_commit=False`` and objects
+are detached, not expired, when the scope closes. Anything loaded inside the
+scope (eager-load relationships you will need) stays readable afterwards.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from .database import engine
+
+ScopedSession = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+)
+
+
+@contextmanager
+def session_scope(read_only=False):
+    """Yield this thread's session for one unit of work."""
+    owner = not ScopedSession.registry.has()
+    db = ScopedSession()
+    try:
+        yield db
+        if owner and not read_only:
+            db.commit()
+    except Exception:
+        if owner:
+            db.rollback()
+        raise
+    finally:
+        if owner:
+            ScopedSession.remove()
+
+
+def read_session():
+    """A scope for reads only: nothing is committed, the transaction ends on exit."""
+    return session_scope(read_only=True)
@@ -0,0 +1,178 @@
+"""
+Week-by-week activity trends for progress reports ("12% less outdoor time
+this week").
+
+``load_activity_arrays()`` reads a range of ``activity_log`` with one Core
+SELECT into NumPy columns: no ORM objects, and SQLite's ``julianday()``
+does the timestamp parsing, so years of logs for many children load as a
+few flat arrays. Activity names are dictionary-encoded once and everything
+after that is integer indexing:
+
+* ``weekly_totals()``  - minutes and counts as a [family, week, category]
+  array (one ``np.bincount`` over all rows)
+* ``week_over_week()`` - percent change from the previous week
+* ``rolling_average()`` - mean over the last ``window`` weeks
+
+Weeks start on Monday. Until Sunday the current week is partial, so its
+change compares it with the same days of the previous week. As in the rollups, minutes only count activities
+with an ``end_time``. Activities are grouped into ``CATEGORIES`` by name;
+anything unlisted lands in "other".
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from .models import ActivityLog
+
+CATEGORIES = {
+    "sleep": ("nap", "bedtime", "sleep", "quiet_time"),
+    "meals": ("breakfast", "lunch", "dinner", "snack"),
+    "outdoor": ("outdoor_play", "park", "walk", "playground"),
+    "play": ("play", "morning_play", "afternoon_play", "art", "reading"),
+    "care": ("bath_time", "diaper", "potty", "wake_up"),
+}
+OTHER = "other"
+
+_UNIX_EPOCH_JULIAN = 2440587.5  # julianday('1970-01-01')
+
+ActivityArrays = namedtuple("ActivityArrays", ["family_ids", "family", "names", "name", "start", "minutes"])
+
+
+def _unix_seconds(day):
+    return (day - date(1970, 1, 1)).days * 86400
+
+
+def _monday(day):
+    return day - timedelta(days=day.weekday())
+
+
+def load_activity_arrays(db, start_day, end_day, family_ids=None):
+    """Activities starting on ``start_day`` up to (not including) ``end_day`` as NumPy columns.
+
+    ``family`` and ``name`` index into ``family_ids`` and ``names``;
+    ``start`` is in Unix seconds (local time) and ``minutes`` is 0 without an end time.
+    """
+    table = ActivityLog.__table__
+    query = select(
+        table.c.family_id,
+        table.c.activity_name,
+        (func.julianday(table.c.start_time) - _UNIX_EPOCH_JULIAN) * 86400,
+        func.coalesce((func.julianday(table.c.end_time) - func.julianday(table.c.start_time)) * 86400, 0.0),
+    ).where(
+        table.c.start_time >= datetime.combine(start_day, datetime.min.time()),
+        table.c.start_time < datetime.combine(end_day, datetime.min.time()),
+    )
+    if family_ids is not None:
+        query = query.where(table.c.family_id.in_(list(family_ids)))
+    rows = db.execute(query).all()
+
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return ActivityArrays(np.array([], dtype=object), empty, np.array([], dtype=object), empty,
+                              empty, np.array([], dtype=np.float64))
+    families, names, starts, seconds = zip(*rows)
+    family_values, family_index = np.unique(np.array([-1 if f is None else f for f in families]), return_inverse=True)
+    name_values, name_index = np.unique(np.array(names, dtype=object), return_inverse=True)
+    return ActivityArrays(
+        family_values,
+        family_index,
+        name_values,
+        name_index,
+        # julianday() is a float of days; round back to whole seconds
+        np.round(np.array(starts, dtype=np.float64)).astype(np.int64),
+        np.clip(np.round(np.array(seconds, dtype=np.float64)), 0.0, None) / 60,
+    )
+
+
+def _rows(arrays, keep):
+    """``arrays`` with only the rows where ``keep`` is true (the family and name tables stay)."""
+    return arrays._replace(family=arrays.family[keep], name=arrays.name[keep], start=arrays.start[keep],
+                           minutes=arrays.minutes[keep])
+
+
+def category_names(categories=None):
+    return [*(categories or CATEGORIES), OTHER]
+
+
+def weekly_totals(arrays, first_week, weeks, categories=None):
+    """Minutes and counts per [family, week, category] for ``weeks`` weeks from ``first_week``'s Monday."""
+    categories = categories or CATEGORIES
+    labels = category_names(categories)
+    lookup = {name: i for i, members in enumerate(categories.values()) for name in members}
+    # Map each distinct name once, then every row through its name index
+    name_category = np.array([lookup.get(name, len(labels) - 1) for name in arrays.names], dtype=np.int64)
+    category = name_category[arrays.name] if len(arrays.name) else arrays.name
+
+    week = (arrays.start - _unix_seconds(_monday(first_week))) // (7 * 86400)
+    keep = (week >= 0) & (week < weeks)
+    shape = (len(arrays.family_ids), weeks, len(labels))
+    flat = np.ravel_multi_index((arrays.family[keep], week[keep], category[keep]), shape)
+    size = int(np.prod(shape))
+    minutes = np.bincount(flat, weights=arrays.minutes[keep], minlength=size).reshape(shape)
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    return minutes, counts
+
+
+def week_over_week(values):
+    """Percent change from the previous week along axis 1; NaN for the first week or a zero base."""
+    values = np.asarray(values, dtype=np.float64)
+    change = np.full(values.shape, np.nan)
+    previous, current = values[:, :-1], values[:, 1:]
+    np.divide((current - previous) * 100, previous, out=change[:, 1:], where=previous > 0)
+    return change
+
+
+def rolling_average(values, window=4):
+    """Mean of the last ``window`` weeks along axis 1 (fewer at the start)."""
+    values = np.asarray(values, dtype=np.float64)
+    total = np.cumsum(values, axis=1)
+    total[:, window:] = total[:, window:] - total[:, :-window]
+    periods = np.minimum(np.arange(1, values.shape[1] + 1), window)
+    return total / periods[None, :, None] if values.ndim == 3 else total / periods
+
+
+def weekly_trends(db, family_id, weeks=8, today=None, window=4, categories=None):
+    """Per-category minutes, change and rolling average for the last ``weeks`` weeks (the last is this week).
+
+    This week's change is against the same weekdays of last week, up to ``today``.
+    """
+    today = today or date.today()
+    first_week = _monday(today) - timedelta(weeks=weeks - 1)
+    arrays = load_activity_arrays(db, first_week, today + timedelta(days=1), family_ids=[family_id])
+    labels = category_names(categories)
+    minutes, counts = weekly_totals(arrays, first_week, weeks, categories)
+    if not len(arrays.family_ids):
+        minutes, counts = np.zeros((1, weeks, len(labels))), np.zeros((1, weeks, len(labels)), dtype=np.int64)
+    change = week_over_week(minutes)
+    elapsed = today.weekday() + 1  # Days of this week so far, today included
+    if elapsed < 7 and weeks > 1 and len(arrays.family_ids):
+        # A partial week against a full one would always look like a drop
+        same_days = (arrays.start - _unix_seconds(first_week)) // 86400 % 7 < elapsed
+        so_far, _ = weekly_totals(_rows(arrays, same_days), first_week, weeks, categories)
+        change[:, -1] = week_over_week(so_far[:, -2:])[:, -1]
+    average = rolling_average(minutes, window)
+    return {
+        "weeks": [(first_week + timedelta(weeks=w)).isoformat() for w in range(weeks)],
+        "categories": {
+            label: {
+                "minutes": np.round(minutes[0, :, c], 1).tolist(),
+                "counts": counts[0, :, c].tolist(),
+                "change_pct": [None if np.isnan(v) else round(float(v), 1) for v in change[0, :, c]],
+                "rolling_average": np.round(average[0, :, c], 1).tolist(),
+            }
+            for c, label in enumerate(labels)
+        },
+    }
+
+
+def describe_trends(report, min_change=1.0):
+    """Short sentences for this week's notable changes, e.g. "12% less outdoor time this week"."""
+    sentences = []
+    for label, series in report["categories"].items():
+        change = series["change_pct"][-1]
+        if change is None or abs(change) < min_change:
+            continue
+        sentences.append(f"{abs(change):.0f}% {'more' if change > 0 else 'less'} {label} time this week")
+    return sentences
@@ -0,0 +1,182 @@
+"""
+Structured, lazy, sampled logging for the request path.
+
+    log = get_event_logger(__name__)
+    log.info("upload.sent", status=200, context_chars=len(body))
+    log.debug("context", category="payload", context=context_dict)
+    log.debug("audio.level", category="audio", every=10, level=audio_level)
+
+An event is a name plus fields. Nothing is formatted unless a handler is
+going to emit it, so a disabled DEBUG payload costs one level check.
+Field values may be callables; they are only called when the event is
+emitted.
+
+Events with a ``category`` go to the ``quintilian.<category>`` logger.
+Each category gets its own level, set with ``LOG_LEVELS``, e.g.
+``LOG_LEVELS=payload=DEBUG,audio=WARNING``. ``every=N`` keeps one
+event in N for chatty events such as per-chunk audio levels.
+
+Field values are redacted (keys in ``REDACTED_KEYS``) and truncated to
+``LOG_MAX_FIELD_CHARS`` before they are written. ``LOG_FORMAT=json``
+writes one JSON object per line. The default is ``key=value`` text.
+"""
+import itertools
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+
+CATEGORY_ROOT = "quintilian"
+
+# Never written to logs, at any level
+REDACTED_KEYS = {
+    "api_key", "authorization", "x-api-key", "x-household-key", "password", "token", "secret",
+    "child_name", "mood_notes", "notes",
+}
+
+MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+MAX_ITEMS = 20
+
+
+def _parse_levels(value):
+    """Parse "payload=DEBUG,audio=WARNING" into {"payload": 10, "audio": 30}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def redact(value, max_chars=None):
+    """Return a copy of value that is safe and small enough to log."""
+    max_chars = max_chars or MAX_FIELD_CHARS
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {
+            key: "[redacted]" if str(key).lower() in REDACTED_KEYS else redact(item, max_chars)
+            for key, item in items[:MAX_ITEMS]
+        }
+        if len(items) > MAX_ITEMS:
+            result["..."] = f"+{len(items) - MAX_ITEMS} keys"
+        return result
+    if isinstance(value, (list, tuple)):
+        result = [redact(item, max_chars) for item in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            result.append(f"... +{len(value) - MAX_ITEMS} items")
+        return result
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    if len(text) > max_chars:
+        return f"{text[:max_chars]}... (+{len(text) - max_chars} chars)"
+    return text
+
+
+class Event:
+    """A log message that formats its fields only when it is written."""
+
+    def __init__(self, name, fields, max_chars=None):
+        self.name = name
+        self.fields = fields
+        self.max_chars = max_chars
+        self._resolved = None
+
+    def resolved(self):
+        if self._resolved is None:
+            self._resolved = redact(
+                {key: value() if callable(value) else value for key, value in self.fields.items()},
+                self.max_chars
+            )
+        return self._resolved
+
+    def __str__(self):
+        parts = [self.name]
+        for key, value in self.resolved().items():
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, default=str, separators=(",", ":"))
+            elif isinstance(value, str) and (" " in value or not value):
+                value = json.dumps(value)
+            parts.append(f"{key}={value}")
+        return " ".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        event = record.args[0] if isinstance(record.args, tuple) and record.args else None
+        if isinstance(event, Event):
+            entry["event"] = event.name
+            entry.update(event.resolved())
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _Sampler:
+    def __init__(self):
+        self._counters = defaultdict(itertools.count)
+        self._lock = threading.Lock()
+
+    def keep(self, key, every):
+        """True for the 1st, (every+1)th, ... call with this key."""
+        with self._lock:
+            return next(self._counters[key]) % every == 0
+
+
+_sampler = _Sampler()
+
+
+class EventLogger:
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def _target(self, category):
+        return logging.getLogger(f"{CATEGORY_ROOT}.{category}") if category else self.logger
+
+    def log(self, severity, event, category=None, every=None, max_chars=None, exc_info=False, **fields):
+        logger = self._target(category)
+        if not logger.isEnabledFor(severity):
+            return
+        if every and every > 1:
+            if not _sampler.keep((logger.name, event), every):
+                return
+            fields["sampled"] = every
+        logger.log(severity, "%s", Event(event, fields, max_chars), exc_info=exc_info, stacklevel=3)
+
+    def debug(self, event, **kwargs):
+        self.log(logging.DEBUG, event, **kwargs)
+
+    def info(self, event, **kwargs):
+        self.log(logging.INFO, event, **kwargs)
+
+    def warning(self, event, **kwargs):
+        self.log(logging.WARNING, event, **kwargs)
+
+    def error(self, event, **kwargs):
+        self.log(logging.ERROR, event, **kwargs)
+
+
+def get_event_logger(name):
+    return EventLogger(name)
+
+
+def configure_logging(level=None, levels=None, fmt=None):
+    """Set up the root handler plus per-category levels from the environment."""
+    level = level or logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+    handler = logging.StreamHandler()
+    if (fmt or os.getenv("LOG_FORMAT", "text")) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    logging.basicConfig(level=level, handlers=[handler])
+    for category, category_level in {**_parse_levels(os.getenv("LOG_LEVELS")), **(levels or {})}.items():
+        logging.getLogger(f"{CATEGORY_ROOT}.{category}").setLevel(category_level)
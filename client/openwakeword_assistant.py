@@ -1,31 +1,35 @@
 import os
 import wave
 import tempfile
-import requests
-import sounddevice as sd
-import soundfile as sf
 import numpy as np
 import logging
 import threading
 import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-import openwakeword
-from openwakeword.model import Model
-from config import SERVER_URL, AUDIO_SETTINGS
-from prompt_builder import PromptBuilder
-import json
-from sqlalchemy import func
+from config import SERVER_URL, AUDIO_SETTINGS, HOUSEHOLD_ID, HOUSEHOLD_KEY, QUESTION_TIMEOUT, SCHEDULE_SYNC_INTERVAL, WAKE_WORDS, WAKEWORD_MODEL_DIR, WAKEWORD_ONNX, WAKEWORD_GATE
+from audio_io import MicrophoneSource, SpeakerSink
+from eventlog import configure_logging, get_event_logger
+from schedule_engine import ScheduleEngine
+from wakeword_gate import EnergyGate
+from wakeword_models import load_model, model_key
 import traceback
 
+# requests, soundfile, SQLAlchemy and the database are only needed once a
+# question comes in, so they load in warm_up(), off the path to listening
+
 print("Starting OpenWakeWord Assistant...")  # Test print statement
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()  # LOG_LEVEL, LOG_LEVELS=audio=DEBUG,payload=DEBUG, LOG_FORMAT=json
 logger = logging.getLogger(__name__)
+log = get_event_logger(__name__)
 
 class OpenVoiceAssistant:
-    def __init__(self):
-        self.server_url = SERVER_URL
+    def __init__(self, audio_source=None, audio_sink=None, server_url=None):
+        self.server_url = server_url or SERVER_URL
+        self.server_headers = {"X-Household-ID": HOUSEHOLD_ID, **({"X-Household-Key": HOUSEHOLD_KEY} if HOUSEHOLD_KEY else {})}
         self.is_recording = False
         self.processing_thread = None
         self.processing_lock = threading.Lock()
@@ -33,27 +37,40 @@ class OpenVoiceAssistant:
         self.silence_duration = 1.0
         self.max_recording_duration = 30.0
         self.should_stop_recording = False
-        self.last_wake_word_time = 0
-        self.wake_word_cooldown = 2.0
-        self.prompt_builder = PromptBuilder()
+        self.wake_words = WAKE_WORDS
+        self.last_detection = {}  # Wake word -> time it last fired, for per-model cooldowns
+        self.schedule_engine = ScheduleEngine(on_reminder=self.play_reminder, on_new_day=self.start_new_day)
         
         # Create audio directory if it doesn't exist
         self.audio_dir = os.path.join(os.path.dirname(__file__), "audio")
         os.makedirs(self.audio_dir, exist_ok=True)
         
+        # Set up by warm_up()
+        self.prompt_builder = None
+        self.reminder_audio = None
+        self.schedule_sync = None
+        self.outbox = None
+        self.warm_up_lock = threading.Lock()
+        
         # Audio parameters
         self.CHUNK = AUDIO_SETTINGS["CHUNK"]
+        self.WAKEWORD_CHUNK = AUDIO_SETTINGS["WAKEWORD_CHUNK"]
         self.FORMAT = AUDIO_SETTINGS["FORMAT"]
         self.CHANNELS = AUDIO_SETTINGS["CHANNELS"]
         self.RATE = AUDIO_SETTINGS["RATE"]
         self.RECORD_SECONDS = AUDIO_SETTINGS["RECORD_SECONDS"]
         
-        # Initialize openWakeWord
-        openwakeword.utils.download_models()
-        self.model = Model(
-            wakeword_models=["hey_jarvis"],  # Using hey_jarvis as wake word
-            inference_framework="onnx"  # Using ONNX for better Windows compatibility
-        )
+        # Microphone and speaker by default; recorded fixtures in the replay benchmark
+        self.audio_source = audio_source or MicrophoneSource(self.RATE, self.CHANNELS, self.FORMAT)
+        self.audio_sink = audio_sink or SpeakerSink()
+        
+        # Per-stage durations of the question being handled, in seconds
+        self.timings = {}
+        self.recording_finished_at = None
+        
+        # openWakeWord is loaded on first use (see the model property)
+        self._model = None
+        self.wake_word_keys = {}  # openWakeWord prediction key -> wake word
         
         # Generate feedback tones
         self.wake_tone = self.generate_tone(1000, 0.5)  # 1kHz for 0.5 seconds
@@ -61,6 +78,64 @@ class OpenVoiceAssistant:
         self.processing_tone = self.generate_tone(600, 0.3)
         self.stop_tone = self.generate_tone(400, 0.2)  # 400Hz for 0.2 seconds
         
+    @property
+    def model(self):
+        if self._model is None:
+            # ONNX models from the local checksum-verified cache (see wakeword_models.py)
+            # All wake words share one feature pipeline, so predict() scores them together
+            self._model = load_model(list(self.wake_words), WAKEWORD_MODEL_DIR, session=WAKEWORD_ONNX)
+            self.wake_word_keys = {model_key(wake_word): wake_word for wake_word in self.wake_words}
+        return self._model
+        
+    def warm_up(self):
+        """Load what answering a question needs: the database, HTTP and audio file support."""
+        with self.warm_up_lock:
+            if self.prompt_builder is not None:
+                return
+            import requests  # noqa: F401 - imported now so the first question doesn't pay for it
+            import soundfile  # noqa: F401
+            from database import init_db
+            from prompt_builder import PromptBuilder
+            from reminder_audio import ReminderAudioCache
+            from outbox import Outbox
+            from schedule_sync import ScheduleSync
+            from wire import ACCEPT
+            
+            init_db()  # Creates tables/columns added since the local database was made
+            self.server_headers = {**self.server_headers, **ACCEPT}  # MessagePack answers, if enabled
+            # Reminder clips are rendered ahead of time so they play instantly
+            self.reminder_audio = ReminderAudioCache(
+                self.server_url,
+                os.path.join(self.audio_dir, "reminders"),
+                headers=self.server_headers,
+                phrases_source=lambda: [r.text for r in self.schedule_engine.upcoming_reminders()]
+            )
+            # Changes made on the household's other devices arrive through the server
+            self.schedule_sync = ScheduleSync(
+                self.server_url, headers=self.server_headers, on_change=self.on_synced_change
+            )
+            # Questions and schedule changes wait here while the server can't be reached
+            self.outbox = Outbox(
+                self.server_url, headers=self.server_headers, timeout=QUESTION_TIMEOUT,
+                on_response=self.on_replayed_response
+            )
+            self.prompt_builder = PromptBuilder()
+        
+    def question_headers(self, wake_word=None):
+        """Headers for a question; the wake word tells the server who is probably asking."""
+        if not wake_word:
+            return self.server_headers
+        return {**self.server_headers, "X-Wake-Word": wake_word}
+        
+    @contextmanager
+    def timed(self, stage):
+        """Add the time spent in the block to self.timings[stage]."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - started
+        
     def generate_tone(self, frequency, duration):
         """Generate a simple sine wave tone."""
         t = np.linspace(0, duration, int(self.RATE * duration), False)
@@ -68,39 +143,77 @@ class OpenVoiceAssistant:
         return tone
         
     def play_tone(self, tone):
-        """Play a tone through the default audio device."""
-        sd.play(tone, self.RATE)
-        sd.wait()
+        """Play a tone through the audio sink."""
+        self.audio_sink.play(tone, self.RATE)
+        
+    def make_wake_word_gate(self):
+        """An EnergyGate from config.WAKEWORD_GATE, or None to run the model on every frame."""
+        settings = dict(WAKEWORD_GATE)
+        if not settings.pop("enabled", True):
+            return None
+        return EnergyGate(self.WAKEWORD_CHUNK, self.RATE, **settings)
+        
+    def detect_wake_word(self, scores, now):
+        """The wake word that fired in {prediction key: score}, or None.
+
+        Each wake word has its own threshold and cooldown. If several fire on
+        the same frame, the one furthest above its threshold wins.
+        """
+        best, best_margin = None, 0.0
+        for key, score in scores.items():
+            wake_word = self.wake_word_keys.get(key)
+            if wake_word is None:
+                continue
+            settings = self.wake_words[wake_word]
+            margin = score - settings["threshold"]
+            if margin <= 0 or now - self.last_detection.get(wake_word, 0) <= settings["cooldown"]:
+                continue
+            if best is None or margin > best_margin:
+                best, best_margin = wake_word, margin
+        if best is not None:
+            self.last_detection[best] = now
+        return best
         
     def listen_for_wake_word(self):
         """Continuously listen for wake word."""
         logger.info("Listening for wake word...")
-        stream = sd.InputStream(
-            samplerate=self.RATE,
-            channels=self.CHANNELS,
-            dtype=self.FORMAT
-        )
+        model = self.model
+        gate = self.make_wake_word_gate()
+        stream = self.audio_source.open()
         
         with stream:
             while not self.should_stop_recording:
-                data, overflowed = stream.read(self.CHUNK)
+                data, overflowed = stream.read(self.WAKEWORD_CHUNK)
                 if overflowed:
                     logger.warning("Audio buffer overflow")
                 
-                # Get prediction from openWakeWord
-                prediction = self.model.predict(data.flatten())
+                # Skip the model while the room is quiet
+                frames = [data.flatten()]
+                if gate is not None:
+                    frames = gate.process(frames[0])
+                    if not frames:
+                        continue
+                    log.debug("wakeword.gate", category="audio", every=50,
+                              duty_cycle=round(gate.duty_cycle, 3), frames=gate.frames)
+                
+                # Score every wake word at once (frame by frame, so replayed lookback is scored too)
+                scores = {}
+                for frame in frames:
+                    for key, score in model.predict(frame).items():
+                        scores[key] = max(score, scores.get(key, 0.0))
                 
-                # Check if wake word was detected with higher threshold and cooldown
-                current_time = time.time()
-                if (prediction["hey_jarvis"] > 0.6 and
-                    current_time - self.last_wake_word_time > self.wake_word_cooldown):
-                    logger.info("Wake word detected! Recording your question...")
-                    self.last_wake_word_time = current_time
+                # Check each wake word against its own threshold and cooldown
+                wake_word = self.detect_wake_word(scores, time.time())
+                if wake_word:
+                    log.info("wake_word.detected", wake_word=wake_word,
+                             scores={self.wake_word_keys.get(k, k): round(float(v), 3) for k, v in scores.items()})
                     self.play_tone(self.wake_tone)
                     with self.processing_lock:
                         if self.processing_thread is None or not self.processing_thread.is_alive():
                             self.should_stop_recording = False
-                            self.processing_thread = threading.Thread(target=self.record_and_process_question)
+                            self.processing_thread = threading.Thread(
+                                target=self.record_and_process_question, args=(wake_word,)
+                            )
                             self.processing_thread.start()
                         else:
                             logger.info("Already processing a question, ignoring wake word")
@@ -117,11 +230,7 @@ class OpenVoiceAssistant:
         last_speech_time = time.time()
         
         try:
-            stream = sd.InputStream(
-                samplerate=self.RATE,
-                channels=self.CHANNELS,
-                dtype=self.FORMAT
-            )
+            stream = self.audio_source.open()
             
             with stream:
                 while not self.should_stop_recording:
@@ -136,8 +245,8 @@ class OpenVoiceAssistant:
                     
                     audio_level = np.abs(data).mean()
                     
-                    if len(frames) % 5 == 0:
-                        logger.info(f"Audio level: {audio_level:.6f}, Silence counter: {silence_counter:.2f}s")
+                    log.debug("audio.level", category="audio", every=5,
+                              level=round(float(audio_level), 1), silence=round(silence_counter, 2))
                     
                     if audio_level > self.silence_threshold:
                         is_speaking = True
@@ -171,83 +280,89 @@ class OpenVoiceAssistant:
             logger.warning("No audio recorded")
             return np.array([])
         
-    def record_and_process_question(self):
+    def record_and_process_question(self, wake_word=None):
+        import requests
+        import soundfile as sf
+        from outbox import RETRY_STATUSES
+        from wire import context_fields, decode
+        
+        self.timings = {}
+        self.warm_up()
         try:
-            logger.info("Wake word detected! Recording your question...")
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
             temp_file.close()  # Close the file so it can be used by sounddevice
             
-            logger.info("Starting continuous recording...")
-            recording = self.record_until_silence()
-            logger.info(f"Recording finished, duration: {len(recording)/self.RATE:.2f} seconds")
+            with self.timed("record"):
+                recording = self.record_until_silence()
+            self.recording_finished_at = time.perf_counter()
             
-            logger.info(f"Saving recording to temporary file: {temp_file.name}")
-            sf.write(temp_file.name, recording, self.RATE)
+            with self.timed("encode"):
+                sf.write(temp_file.name, recording, self.RATE)
             
             # Get context from database
-            context = self.prompt_builder.get_current_context()
-            logger.info(f"Got context from database: {context}")
+            with self.timed("context"):
+                context = self.prompt_builder.get_current_context()
             
             # Convert context to dictionary format
-            context_dict = {
-                "family": {
-                    "child_name": context["family"].child_name,
-                    "child_age": context["family"].child_age,
-                    "preferences": context["family"].preferences
-                },
-                "daily_context": {
-                    "schedule": context["daily_context"].schedule,
-                    "adjustments": context["daily_context"].adjustments,
-                    "mood_notes": context["daily_context"].mood_notes
-                },
-                "recent_activities": [
-                    {
-                        "activity_name": activity.activity_name,
-                        "start_time": activity.start_time.isoformat(),
-                        "end_time": activity.end_time.isoformat() if activity.end_time else None,
-                        "status": activity.status,
-                        "notes": activity.notes
-                    }
-                    for activity in context["recent_activities"]
-                ]
-            }
-            logger.info(f"Converted context to dictionary: {json.dumps(context_dict, indent=2)}")
+            with self.timed("serialize"):
+                context_dict = self.context_to_dict(context)
+                context_files, context_data = context_fields(context_dict)  # MessagePack or JSON (see wire.py)
+            context_bytes = len(context_files["packed_context"][1] if context_files else context_data["context"])
+            log.debug("context", category="payload", context=context_dict)
             
             # Prepare the request
             files = {
-                'audio_file': ('audio.wav', open(temp_file.name, 'rb'), 'audio/wav')
+                'audio_file': ('audio.wav', open(temp_file.name, 'rb'), 'audio/wav'),
+                **context_files
             }
             data = {
-                'context': json.dumps(context_dict),
+                **context_data,
                 'transcript': None
             }
             
-            logger.info("Request details:")
-            logger.info(f"Files: {files}")
-            logger.info(f"Data: {data}")
+            # Questions asked while offline go first, so the server sees them in order
+            if self.outbox.pending():
+                with self.timed("outbox"):
+                    self.outbox.drain(force=True)
             
-            # Send the request
-            logger.info(f"Sending audio to server at {self.server_url}/process-audio")
-            logger.info(f"Sending request with data: {json.dumps(data, indent=2)}")
-            response = requests.post(
-                f"{self.server_url}/process-audio",
-                files=files,
-                data=data
-            )
+            # Send the request. The key lets the server recognize it if it has to be sent again
+            idempotency_key = uuid.uuid4().hex
+            log.info("upload.start", url=f"{self.server_url}/process-audio",
+                     audio_bytes=os.path.getsize(temp_file.name), context_bytes=context_bytes)
+            try:
+                with self.timed("upload"):
+                    response = requests.post(
+                        f"{self.server_url}/process-audio",
+                        files=files,
+                        data=data,
+                        headers={**self.question_headers(wake_word), "Idempotency-Key": idempotency_key},
+                        timeout=QUESTION_TIMEOUT
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Unreachable, or too slow to answer: it may have been handled, so the
+                # outbox resends it with the same key and the server answers it only once
+                response = None
+                log.warning("upload.unreachable", error=str(e), timeout=isinstance(e, requests.Timeout))
+            finally:
+                # Close the file handle
+                files['audio_file'][1].close()
             
-            # Close the file handle
-            files['audio_file'][1].close()
+            if response is None or response.status_code in RETRY_STATUSES:
+                # Keep the question until the server is back (see outbox.py)
+                self.outbox.add_audio(temp_file.name, context_dict, wake_word, idempotency_key=idempotency_key)
+                self.play_tone(self.processing_tone)
+                return
             
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response content: {response.text}")
+            log.info("upload.done", status=response.status_code, ms=round(self.timings["upload"] * 1000))
+            log.debug("upload.response", category="payload", body=response.text)
             
             if response.status_code == 200:
-                response_data = response.json()
+                response_data = decode(response)
                 
                 # Check if there's an action in the response
                 if response_data.get('action'):
                     action = response_data['action']
-                    logger.info(f"Action detected: {json.dumps(action, indent=2)}")
+                    log.info("action", action=action)
                     
                     if action['type'] == 'update_schedule':
                         # Update the schedule in the database
@@ -262,26 +377,60 @@ class OpenVoiceAssistant:
                     logger.info(f"Playing audio response from: {audio_url}")
                     self.download_and_play_audio(audio_url)
             else:
-                logger.error(f"Server returned error: {response.status_code}")
-                logger.error(f"Server response content: {response.text}")
+                log.error("upload.failed", status=response.status_code, body=response.text)
                 
         except Exception as e:
             logger.error(f"Error in record_and_process_question: {str(e)}")
             logger.error(traceback.format_exc())
         finally:
+            log.info("question.timings", category="timing",
+                     **{stage: round(seconds * 1000) for stage, seconds in self.timings.items()})
             # Try to clean up the temporary file, but don't fail if we can't
             try:
                 if 'temp_file' in locals():
                     os.unlink(temp_file.name)
-                    logger.info("Temporary file cleaned up")
             except Exception as e:
                 logger.warning(f"Could not clean up temporary file: {str(e)}")
                 
+    def context_to_dict(self, context):
+        """Convert the prompt builder's context to the JSON the server expects.
+
+        Once the server holds today's schedule it answers from its own copy,
+        so the schedule is left out.
+        """
+        schedule_on_server = self.schedule_sync is not None and self.schedule_sync.has_day(datetime.now().date())
+        return {
+            "local_time": datetime.now().isoformat(timespec="minutes"),  # The server's clock may be in another zone
+            "family": {
+                "child_name": context["family"].child_name,
+                "child_age": context["family"].child_age,
+                "preferences": context["family"].preferences
+            },
+            "daily_context": {
+                **({} if schedule_on_server else {"schedule": context["schedule"]}),
+                "adjustments": context["adjustments"],
+                "mood_notes": context["daily_context"].mood_notes
+            },
+            "recent_activities": [
+                {
+                    "activity_name": activity.activity_name,
+                    "start_time": activity.start_time.isoformat(),
+                    "end_time": activity.end_time.isoformat() if activity.end_time else None,
+                    "status": activity.status,
+                    "notes": activity.notes
+                }
+                for activity in context["recent_activities"]
+            ],
+            "today_summary": context.get("today_summary")  # Rollup totals; recent_activities is only the newest rows
+        }
+                
     def update_schedule(self, modification):
         """Update the schedule in the database based on server response."""
         try:
-            from database import get_db, DailyContext
+            from database import get_db, DailyContext, record_change, retry_schedule_write
+            from database.schedule import format_time
             from datetime import datetime
+            from sqlalchemy import func
             
             db = next(get_db())
             today = datetime.now().date()
@@ -295,40 +444,24 @@ class OpenVoiceAssistant:
                 logger.error("No daily context found for today")
                 return False
                 
-            # Update the schedule
-            schedule = daily_context.schedule or {}
             activity_name = modification["activity_name"]
             new_time = modification["new_time"]
-            logger.info(f"Schedule before update: {schedule}")
             
-            if activity_name in schedule:
-                # Store original time before updating
-                original_time = schedule[activity_name]
-                
-                # Update the schedule
-                schedule[activity_name] = new_time
-                
-                # Add to adjustments
-                adjustments = daily_context.adjustments or {}
-                if activity_name not in adjustments:
-                    adjustments[activity_name] = {}
-                    
-                adjustments[activity_name] = {
-                    "original_time": original_time,
-                    "new_time": new_time,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                # Update the database
-                daily_context.schedule = schedule
-                daily_context.adjustments = adjustments
-                logger.info(f"Schedule after update: {daily_context.schedule}")
-                db.commit()
-                logger.info(f"Successfully updated schedule for {activity_name}")
-                return True
-            else:
+            # Move the activity and append the change to the schedule journal; if another
+            # writer changed the day meanwhile, retry against the new state
+            change = retry_schedule_write(
+                db, lambda session: record_change(session, daily_context, activity_name, new_time)
+            )
+            if change is None:
                 logger.error(f"Activity {activity_name} not found in schedule")
                 return False
+            
+            logger.info(f"Successfully updated schedule for {activity_name} (change {change.id})")
+            
+            # Re-arm only the reminders this change affects, then render their new clips
+            self.schedule_engine.update_activity(activity_name, format_time(change.new_minute))
+            self.reminder_audio.request_refresh()
+            return True
                 
         except Exception as e:
             logger.error(f"Error updating schedule: {e}")
@@ -338,93 +471,28 @@ class OpenVoiceAssistant:
         finally:
             db.close()
 
-    def process_gpt_response(self, response_text):
-        """Process GPT response for schedule modifications."""
-        try:
-            # Check if the response indicates a schedule modification
-            if "delay" in response_text.lower() and "minutes" in response_text.lower():
-                # Extract modification details from the response
-                import re
-                
-                # Look for patterns like "delay X minutes" or "postpone by X minutes"
-                delay_match = re.search(r'(?:delay|postpone).*?(\d+).*?minutes', response_text.lower())
-                if delay_match:
-                    delay_minutes = int(delay_match.group(1))
-                    
-                    # Look for activity name (this is a simple implementation)
-                    activity_match = re.search(r'(?:delay|postpone)\s+(\w+)', response_text.lower())
-                    if activity_match:
-                        activity_name = activity_match.group(1)
-                        
-                        # Get current schedule to find original time
-                        from database import get_db, DailyContext
-                        from datetime import datetime
-                        
-                        db = next(get_db())
-                        today = datetime.now().date()
-                        daily_context = db.query(DailyContext).filter(
-                            func.date(DailyContext.date) == today
-                        ).first()
-                        
-                        if daily_context and daily_context.schedule:
-                            schedule = daily_context.schedule
-                            if activity_name in schedule:
-                                original_time = schedule[activity_name]["time"]
-                                
-                                # Calculate new time
-                                from datetime import datetime, timedelta
-                                original_dt = datetime.strptime(original_time, "%H:%M")
-                                new_dt = original_dt + timedelta(minutes=delay_minutes)
-                                new_time = new_dt.strftime("%H:%M")
-                                
-                                # Log the modification details
-                                logger.info(f"Modifying schedule: {activity_name} from {original_time} to {new_time} (delay: {delay_minutes} minutes)")
-                                
-                                # Send modification to server
-                                modification = {
-                                    "activity_name": activity_name,
-                                    "delay_minutes": delay_minutes,
-                                    "original_time": original_time,
-                                    "new_time": new_time
-                                }
-                                
-                                response = requests.post(
-                                    f"{self.server_url}/modify-schedule",
-                                    json=modification
-                                )
-                                
-                                if response.status_code == 200:
-                                    # Update local database
-                                    success = self.update_schedule(modification)
-                                    if success:
-                                        logger.info("Schedule updated successfully in local database.")
-                                    else:
-                                        logger.error("Failed to update schedule in local database.")
-                                    return success
-                                else:
-                                    logger.error(f"Server returned status code {response.status_code} for schedule modification.")
-                        else:
-                            logger.error("No daily context or schedule found for today.")
-            return False
-        except Exception as e:
-            logger.error(f"Error processing GPT response: {e}")
-            return False
-            
     def download_and_play_audio(self, audio_url):
         """Download and play audio response."""
+        import requests
+        import soundfile as sf
+        
         try:
             # Download and play the audio
-            response = requests.get(f"{self.server_url}{audio_url}")
+            with self.timed("download"):
+                response = requests.get(f"{self.server_url}{audio_url}")
             if response.status_code == 200:
-                audio_data = response.content
-                audio_file = os.path.join(self.audio_dir, "response.wav")
-                with open(audio_file, "wb") as f:
-                    f.write(audio_data)
+                with self.timed("decode"):
+                    audio_data = response.content
+                    audio_file = os.path.join(self.audio_dir, "response.wav")
+                    with open(audio_file, "wb") as f:
+                        f.write(audio_data)
+                    data, samplerate = sf.read(audio_file)
                 
                 # Play the audio
-                data, samplerate = sf.read(audio_file)
-                sd.play(data, samplerate)
-                sd.wait()
+                if self.recording_finished_at is not None:
+                    self.timings["time_to_first_audio"] = time.perf_counter() - self.recording_finished_at
+                with self.timed("playback"):
+                    self.audio_sink.play(data, samplerate)
                 
                 # Clean up
                 os.remove(audio_file)
@@ -433,16 +501,85 @@ class OpenVoiceAssistant:
         except Exception as e:
             logger.error(f"Error playing audio: {e}")
 
+    def play_reminder(self, reminder):
+        """Play a reminder from the pre-rendered clip cache."""
+        import soundfile as sf
+        
+        logger.info(f"Reminder: {reminder.text}")
+        try:
+            audio_file = self.reminder_audio.get(reminder.text)
+            if audio_file is None:
+                logger.warning("Reminder clip not cached yet, rendering it now")
+                audio_file = self.reminder_audio.render(reminder.text)
+            data, samplerate = sf.read(audio_file)
+            self.audio_sink.play(data, samplerate)
+        except Exception as e:
+            logger.error(f"Error playing reminder: {e}")
+
+    def load_schedule(self):
+        """Load today's schedule into the reminder engine."""
+        context = self.prompt_builder.get_current_context()
+        if context and context["schedule"]:
+            self.schedule_engine.load(context["schedule"])
+            logger.info(f"Loaded {len(context['schedule'])} scheduled activities for reminders")
+        else:
+            self.schedule_engine.load({})  # Not yesterday's reminders, e.g. after midnight
+            logger.warning("No schedule for today, reminders are idle")
+
+    def start_new_day(self, day):
+        """At midnight, load the new day's schedule (if it has one) and render its reminders."""
+        self.load_schedule()
+        if self.reminder_audio:
+            self.reminder_audio.request_refresh()
+
+    def on_replayed_response(self, path, payload, result):
+        """Apply the schedule action in the answer to a question asked while the server was unreachable."""
+        action = result.get("action") if path == "/process-audio" else None
+        if action and action["type"] == "update_schedule":
+            log.info("action", action=action, replayed=True)
+            self.update_schedule({
+                "activity_name": action['activity'],
+                "new_time": action['new_start_time']
+            })
+
+    def on_synced_change(self, activity_name, new_time):
+        """Re-arm reminders for a change that came from another device."""
+        self.schedule_engine.update_activity(activity_name, new_time)
+        if self.reminder_audio:
+            self.reminder_audio.request_refresh()
+
     def start(self):
         """Start the voice assistant."""
         logger.info("Starting OpenVoice Assistant...")
         self.should_stop_recording = False
+        self.model  # The wake word model is all listening needs
+        threading.Thread(target=self.start_background_services, daemon=True).start()
         self.listen_for_wake_word()
         
+    def start_background_services(self):
+        """Warm up, then arm reminders, while the wake word listener is already running."""
+        try:
+            self.warm_up()
+            self.load_schedule()
+            self.schedule_engine.start()
+            self.reminder_audio.start()
+            self.schedule_sync.start(SCHEDULE_SYNC_INTERVAL)
+            self.outbox.start()
+        except Exception as e:
+            logger.error(f"Error starting background services: {e}")
+            logger.error(traceback.format_exc())
+        
     def stop(self):
         """Stop the voice assistant."""
         logger.info("Stopping OpenVoice Assistant...")
         self.should_stop_recording = True
+        self.schedule_engine.stop()
+        if self.reminder_audio:
+            self.reminder_audio.stop()
+        if self.schedule_sync:
+            self.schedule_sync.stop()
+        if self.outbox:
+            self.outbox.stop()
         if self.processing_thread and self.processing_thread.is_alive():
             self.processing_thread.join()
 
@@ -0,0 +1,261 @@
+"""
+Commands waiting for the server.
+
+When the server couldn't be reached, a question used to be logged and
+lost. Now it goes into the ``pending_command`` table and is sent later:
+
+* ``add_audio()``   - a recorded question with the context it was asked in
+  (and a transcript, if there is one). The recording is stored as FLAC,
+  lossless and about half the size of the WAV, and turned back into a WAV
+  when it is sent, so the server trims and transcribes it as before
+* ``add_request()`` - a JSON request, e.g. a ``/modify-schedule`` whose
+  change was already applied locally
+* ``send()``        - a JSON request sent now if the server answers and
+  nothing older is waiting, queued otherwise
+
+Commands go out oldest first, ``batch_size`` per round over one HTTP
+session. Questions carry an ``Idempotency-Key``: one whose first try timed
+out may have been handled, and the server then returns that answer
+instead of acting twice. A round stops at the first command that fails. If the server
+couldn't be reached (or answered 409/429/502/503/504) the next round waits
+``backoff_seconds``, doubled per failed round with jitter so a house full
+of devices doesn't come back at once. Other server errors count against
+the command, which is dropped after ``max_attempts``; a 4xx drops it at
+once, since sending it again won't change the answer.
+
+Answers to replayed questions go to ``on_response`` (the assistant applies
+their schedule actions). Their speech isn't played: it would answer a
+question asked minutes ago.
+"""
+import io
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+import soundfile as sf
+
+from config import OUTBOX_SETTINGS
+from database import session_scope, read_session, PendingCommand
+from wire import ACCEPT, context_fields, decode
+
+logger = logging.getLogger(__name__)
+
+# The server or its proxy is busy or down, or (409) still handling an earlier try of
+# the same question: wait, then send again
+RETRY_STATUSES = (409, 429, 502, 503, 504)
+CONNECT_TIMEOUT = 5  # Seconds; an unreachable server should be noticed quickly
+
+
+class Unreachable(Exception):
+    """The server couldn't be reached or asked us to wait; later commands wait too."""
+
+
+def compress_audio(path):
+    """FLAC bytes for the WAV at ``path``."""
+    data, rate = sf.read(path, dtype="int16")
+    buffer = io.BytesIO()
+    sf.write(buffer, data, rate, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def decompress_audio(flac):
+    """16-bit PCM WAV bytes for FLAC made by compress_audio()."""
+    data, rate = sf.read(io.BytesIO(flac), dtype="int16")
+    buffer = io.BytesIO()
+    sf.write(buffer, data, rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+class Outbox:
+    def __init__(self, server_url, headers=None, timeout=60, settings=None, on_response=None):
+        self.server_url = server_url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.settings = {**OUTBOX_SETTINGS, **(settings or {})}
+        self.on_response = on_response  # Called with (path, payload, response JSON) for each replayed command
+        self.http = requests.Session()  # Keeps one connection open for a whole batch
+        self.failures = 0  # Rounds in a row that couldn't reach the server
+        self.retry_at = 0.0  # time.monotonic() before which rounds are skipped
+        self._lock = threading.Lock()  # One round at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pending(self):
+        with read_session() as db:
+            return db.query(PendingCommand).count()
+
+    def add_audio(self, wav_path, context_dict, wake_word=None, transcript=None, idempotency_key=None):
+        """Queue a recorded question for /process-audio. Returns the command id.
+
+        Pass the ``idempotency_key`` a first attempt was sent with, so the
+        server answers it only once if that attempt got through after all.
+        """
+        payload = {"context": context_dict, "transcript": transcript,
+                   "idempotency_key": idempotency_key or uuid.uuid4().hex}
+        return self._add("/process-audio", payload, audio=compress_audio(wav_path), wake_word=wake_word)
+
+    def add_request(self, path, payload):
+        """Queue a JSON POST. Returns the command id."""
+        return self._add(path, payload)
+
+    def _add(self, path, payload, audio=None, wake_word=None):
+        with session_scope() as db:
+            command = PendingCommand(path=path, payload=payload, audio=audio, wake_word=wake_word)
+            db.add(command)
+            db.flush()
+            command_id = command.id
+        logger.info(f"Queued {path} as command {command_id} until the server can be reached")
+        return command_id
+
+    def send(self, path, payload):
+        """POST ``payload`` now, or queue it if older commands are waiting or the server can't take it.
+
+        Returns the response JSON, or None if it was queued or rejected.
+        """
+        if self.pending():
+            self.drain(force=True)
+        if not self.pending():
+            try:
+                result = self._post(path, payload)
+                self._reachable()
+                return result
+            except Unreachable as e:
+                self._unreachable(e)
+            except requests.RequestException as e:
+                if _rejected(e):
+                    logger.error(f"Server rejected {path}: {e}")
+                    return None
+                logger.warning(f"Server failed {path}, queueing it: {e}")
+        self.add_request(path, payload)
+        return None
+
+    def _post(self, path, payload, audio=None, wake_word=None):
+        headers = {**self.headers, **ACCEPT, **({"X-Wake-Word": wake_word} if wake_word else {})}
+        if audio is not None and payload.get("idempotency_key"):
+            headers["Idempotency-Key"] = payload["idempotency_key"]
+        timeout = (CONNECT_TIMEOUT, self.timeout)
+        try:
+            if audio is None:
+                response = self.http.post(f"{self.server_url}{path}", json=payload, headers=headers, timeout=timeout)
+            else:
+                context = payload["context"]
+                if isinstance(context, str):
+                    context = json.loads(context)  # Queued before the context was kept as an object
+                context_files, context_data = context_fields(context)
+                files = {"audio_file": ("audio.wav", decompress_audio(audio), "audio/wav"), **context_files}
+                data = {**context_data, **({"transcript": payload["transcript"]} if payload.get("transcript") else {})}
+                response = self.http.post(
+                    f"{self.server_url}{path}", files=files, data=data, headers=headers, timeout=timeout
+                )
+        except requests.ConnectionError as e:
+            raise Unreachable(str(e)) from e
+        if response.status_code in RETRY_STATUSES:
+            raise Unreachable(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return decode(response)
+
+    def flush(self, force=False):
+        """Send one batch, oldest first. Returns how many were delivered.
+
+        Does nothing while backing off, unless ``force`` (a live question is
+        about to try the server anyway).
+        """
+        with self._lock:
+            if not force and time.monotonic() < self.retry_at:
+                return 0
+            with read_session() as db:
+                commands = db.query(PendingCommand).order_by(PendingCommand.id).limit(
+                    self.settings["batch_size"]
+                ).all()
+            delivered = 0
+            for command in commands:
+                try:
+                    result = self._post(command.path, command.payload, command.audio, command.wake_word)
+                except Unreachable as e:
+                    self._unreachable(e)
+                    break
+                except requests.RequestException as e:
+                    self._failed(command, e, drop=_rejected(e))
+                    if _rejected(e):
+                        continue
+                    break
+                self._delete(command.id)
+                self._reachable()
+                delivered += 1
+                logger.info(f"Delivered queued {command.path} (command {command.id}, queued {command.created_at})")
+                if self.on_response:
+                    try:
+                        self.on_response(command.path, command.payload, result)
+                    except Exception as e:
+                        logger.error(f"Error handling the answer to command {command.id}: {e}")
+            return delivered
+
+    def drain(self, force=False):
+        """Send batches until the outbox is empty or a round fails. Returns how many were delivered."""
+        delivered = 0
+        while True:
+            sent = self.flush(force=force)
+            delivered += sent
+            if sent < self.settings["batch_size"]:
+                return delivered
+
+    def _delete(self, command_id):
+        with session_scope() as db:
+            db.query(PendingCommand).filter(PendingCommand.id == command_id).delete()
+
+    def _failed(self, command, error, drop=False):
+        with session_scope() as db:
+            stored = db.get(PendingCommand, command.id)
+            if stored is None:
+                return
+            stored.attempts += 1
+            stored.last_error = str(error)[:500]
+            if drop or stored.attempts >= self.settings["max_attempts"]:
+                logger.error(f"Dropping queued {command.path} (command {command.id}) "
+                             f"after {stored.attempts} attempt(s): {error}")
+                db.delete(stored)
+            else:
+                logger.warning(f"Queued {command.path} (command {command.id}) failed, will retry: {error}")
+
+    def _unreachable(self, error):
+        self.failures += 1
+        delay = min(
+            self.settings["max_backoff_seconds"], self.settings["backoff_seconds"] * 2 ** (self.failures - 1)
+        ) * random.uniform(0.5, 1.0)
+        self.retry_at = time.monotonic() + delay
+        logger.warning(f"Server unreachable ({error}); retrying queued commands in {delay:.0f}s")
+
+    def _reachable(self):
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"Error delivering queued commands: {e}")
+            self._stop.wait(self.settings["interval"])
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+def _rejected(error):
+    """True for a 4xx: the server understood the command and won't take it."""
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500
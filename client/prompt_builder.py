@@ -1,53 +1,73 @@
-from database import get_db, FamilyProfile, DailyContext, ActivityLog
+from database import session_scope, FamilyProfile, DailyContext, ActivityLog, ensure_entries, schedule_as_dict, adjustments_from_journal, daily_summary
 from datetime import datetime, timedelta
 import json
 import logging
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from eventlog import get_event_logger
 
 logger = logging.getLogger(__name__)
+log = get_event_logger(__name__)
+
+# Raw rows sent with each question; today's totals come from the rollups
+RECENT_ACTIVITY_LIMIT = 10
 
 class PromptBuilder:
     def __init__(self):
         pass
         
     def get_current_context(self):
-        """Get current context from database"""
+        """Get current context from database.
+
+        Runs as one short unit of work on this thread's session. The objects
+        returned are detached but fully loaded, so callers can read them
+        after the session is closed.
+        """
         try:
-            db = next(get_db())
-            logger.info("Getting family profile from database")
-            family = db.query(FamilyProfile).first()
-            logger.info(f"Found family profile: {family}")
-            
-            if not family:
-                logger.warning("No family profile found in database")
-                return None
-            
-            logger.info("Getting today's context from database")
-            today = datetime.now().date()
-            daily_context = db.query(DailyContext).filter(
-                func.date(DailyContext.date) == today,
-                DailyContext.family_id == family.id
-            ).first()
-            logger.info(f"Found daily context: {daily_context}")
-            
-            logger.info("Getting recent activities from database")
-            recent_activities = db.query(ActivityLog).filter(
-                ActivityLog.start_time >= datetime.now() - timedelta(hours=24)
-            ).order_by(ActivityLog.start_time.desc()).all()
-            logger.info(f"Found {len(recent_activities)} recent activities")
+            # Not read-only: ensure_entries() creates a new day's schedule rows
+            with session_scope() as db:
+                family = db.query(FamilyProfile).first()
+                
+                if not family:
+                    logger.warning("No family profile found in database")
+                    return None
+                
+                today = datetime.now().date()
+                daily_context = db.query(DailyContext).options(joinedload(DailyContext.family)).filter(
+                    func.date(DailyContext.date) == today,
+                    DailyContext.family_id == family.id
+                ).first()
+                
+                schedule = {}
+                adjustments = {}
+                if daily_context:
+                    ensure_entries(db, daily_context)
+                    schedule = schedule_as_dict(db, daily_context.id)
+                    adjustments = {
+                        **(daily_context.adjustments or {}),
+                        **adjustments_from_journal(db, daily_context.id)
+                    }
+                
+                recent_activities = db.query(ActivityLog).filter(
+                    ActivityLog.start_time >= datetime.now() - timedelta(hours=24)
+                ).order_by(ActivityLog.start_time.desc()).limit(RECENT_ACTIVITY_LIMIT).all()
+                today_summary = daily_summary(db, family.id, today)
             
             context = {
                 "family": family,
                 "daily_context": daily_context,
-                "recent_activities": recent_activities
+                "schedule": schedule,
+                "adjustments": adjustments,
+                "recent_activities": recent_activities,
+                "today_summary": today_summary
             }
-            logger.info(f"Returning context: {context}")
+            log.debug("context.loaded", family_id=family.id,
+                      daily_context_id=daily_context.id if daily_context else None,
+                      schedule_entries=len(schedule), recent_activities=len(recent_activities))
             return context
         except Exception as e:
             logger.error(f"Error getting context from database: {e}")
             return None
-        finally:
-            db.close()
             
     def build_prompt(self, user_input):
         """Build a context-aware prompt for GPT-4."""
@@ -63,11 +83,14 @@ class PromptBuilder:
         context_str = f"""You are Quintilian, a helpful and friendly AI assistant for {family.child_name} (age {family.child_age}).
 
 Current Schedule:
-{json.dumps(daily_context.schedule, indent=2) if daily_context and daily_context.schedule else "No schedule set for today."}
+{json.dumps(context["schedule"], indent=2) if context["schedule"] else "No schedule set for today."}
 
 Recent Activities:
 {self._format_activities(recent_activities) if recent_activities else "No recent activities."}
 
+Today So Far:
+{self._format_summary(context.get("today_summary"))}
+
 Child's Preferences:
 {json.dumps(family.preferences, indent=2) if family.preferences else "No preferences set."}
 
@@ -91,4 +114,14 @@ Please respond in a way that:
             status = "✅" if activity.status == "completed" else "⏳" if activity.status == "in_progress" else "❌"
             formatted.append(f"{status} {activity.activity_name} ({activity.start_time.strftime('%I:%M %p')})")
             
-        return "\n".join(formatted) 
\ No newline at end of file
+        return "\n".join(formatted)
+
+    def _format_summary(self, summary):
+        """Format today's rollup for the prompt."""
+        if not summary:
+            return "Nothing logged yet today."
+        return (
+            f"{summary['count']} activities ({summary['completed']} completed, {summary['skipped']} skipped), "
+            f"{summary['total_minutes']:.0f} minutes: "
+            + ", ".join(f"{name} x{totals['count']}" for name, totals in summary["activities"].items())
+        )
@@ -0,0 +1,121 @@
+"""
+Reminder audio rendered ahead of time.
+
+Clips are synthesized by the server's /synthesize endpoint and stored on
+disk under a hash of the phrase, so a reminder plays instantly (and
+offline) when it fires. A schedule change only produces new phrases for
+the reminders it moved; every unchanged phrase is already cached.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".part"  # A clip still being written by render()
+STALE_PART_SECONDS = 3600  # Older than this, a .part file was left by a crash
+
+
+class ReminderAudioCache:
+    def __init__(self, server_url, cache_dir, phrases_source=None, headers=None, timeout=15):
+        self.server_url = server_url
+        self.headers = headers or {}
+        self.cache_dir = cache_dir
+        self.phrases_source = phrases_source  # Callable returning the phrases to keep ready
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._refresh = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def clip_path(self, text):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def get(self, text):
+        """Return the cached clip path for ``text``, or None if not rendered yet."""
+        path = self.clip_path(text)
+        return path if os.path.exists(path) else None
+
+    def render(self, text):
+        """Synthesize ``text`` into the cache unless it is already there."""
+        path = self.clip_path(text)
+        if os.path.exists(path):
+            return path
+        response = requests.post(
+            f"{self.server_url}/synthesize",
+            json={"text": text},
+            headers=self.headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        # Write then rename so a crash never leaves a truncated clip behind
+        tmp_path = f"{path}{PART_SUFFIX}"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, path)
+        logger.info(f"Rendered reminder audio: {text!r}")
+        return path
+
+    def sync(self, phrases):
+        """Render missing clips for ``phrases`` and drop clips nobody needs.
+
+        Returns the number of clips rendered.
+        """
+        wanted = {self.clip_path(text): text for text in phrases}
+        rendered = 0
+        for path, text in wanted.items():
+            if os.path.exists(path):
+                continue
+            try:
+                self.render(text)
+                rendered += 1
+            except Exception as e:
+                logger.warning(f"Could not render reminder audio {text!r}: {e}")
+
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if path in wanted:
+                continue
+            try:
+                # render() may be writing this one right now (a reminder played before it was cached)
+                if name.endswith(PART_SUFFIX) and time.time() - os.path.getmtime(path) < STALE_PART_SECONDS:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Renamed into place (or removed) since it was listed
+        return rendered
+
+    def request_refresh(self):
+        """Ask the background job to bring the cache in line with the schedule."""
+        self._refresh.set()
+
+    def _run(self):
+        while True:
+            self._refresh.wait()
+            self._refresh.clear()
+            if not self._running:
+                return
+            try:
+                self.sync(self.phrases_source())
+            except Exception as e:
+                logger.error(f"Error refreshing reminder audio: {e}")
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="reminder-audio", daemon=True)
+        self._thread.start()
+        self.request_refresh()
+
+    def stop(self):
+        self._running = False
+        self._refresh.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
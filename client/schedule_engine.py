@@ -0,0 +1,239 @@
+"""
+In-memory timeline of today's schedule with reminder timers.
+
+The timeline is a sorted list searched with bisect, so "what's next" is
+O(log n). Reminders sit in a heap and a single worker thread sleeps on a
+condition variable until the earliest one is due (or the schedule
+changes), so nothing polls while the day is quiet.
+
+At midnight the worker wakes up, re-arms the same timeline for the new
+day and calls ``on_new_day(day)``, where the assistant loads that day's
+own schedule, or an empty one if the day has none.
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+Reminder = namedtuple("Reminder", ["fire_at", "kind", "activity_name", "text"])
+
+
+def _parse_minute(value):
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _label(activity_name):
+    return activity_name.replace("_", " ")
+
+
+class ScheduleEngine:
+    def __init__(self, on_reminder=None, reminder_lead_minutes=5, now=datetime.now, on_new_day=None):
+        self.on_reminder = on_reminder or self._log_reminder
+        self.on_new_day = on_new_day  # Called with the date once reminders are re-armed after midnight
+        self.reminder_lead_minutes = reminder_lead_minutes
+        self._now = now
+        self._day = None
+        self._timeline = []  # Sorted (minute, activity_name)
+        self._minutes = {}  # activity_name -> minute
+        self._heap = []  # (fire_at, seq, key, version, reminder)
+        self._versions = {}  # (kind, activity_name) -> version of the live timer
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    # Timeline
+
+    def load(self, schedule, day=None):
+        """Replace the timeline with ``schedule`` ({activity_name: "HH:MM"})."""
+        with self._cond:
+            self._minutes = {name: _parse_minute(value) for name, value in schedule.items()}
+            self._timeline = sorted((minute, name) for name, minute in self._minutes.items())
+            self._arm(day or self._now().date())
+
+    def _arm(self, day):
+        """Set every reminder for the timeline on ``day``, dropping any others."""
+        self._day = day
+        self._heap = []
+        self._versions = {}
+        for _, name in self._timeline:
+            self._schedule_reminders(name)
+        self._cond.notify()
+
+    def update_activity(self, activity_name, new_time):
+        """Move one activity and re-arm only the reminders it affects."""
+        with self._cond:
+            if self._day is None:
+                self._day = self._now().date()
+            affected = {activity_name}
+            old_minute = self._minutes.get(activity_name)
+            if old_minute is not None:
+                index = bisect.bisect_left(self._timeline, (old_minute, activity_name))
+                if index > 0:
+                    affected.add(self._timeline[index - 1][1])
+                del self._timeline[index]
+
+            new_minute = _parse_minute(new_time)
+            self._minutes[activity_name] = new_minute
+            index = bisect.bisect_left(self._timeline, (new_minute, activity_name))
+            self._timeline.insert(index, (new_minute, activity_name))
+            if index > 0:
+                affected.add(self._timeline[index - 1][1])
+
+            for name in affected:
+                self._schedule_reminders(name)
+            self._cond.notify()
+
+    def next_activity(self, at=None):
+        """Return (activity_name, "HH:MM") of the next activity at or after ``at``."""
+        at = at or self._now()
+        with self._cond:
+            index = bisect.bisect_left(self._timeline, (at.hour * 60 + at.minute, ""))
+            if index == len(self._timeline):
+                return None
+            minute, name = self._timeline[index]
+            return name, _format_minute(minute)
+
+    def current_activity(self, at=None):
+        """Return (activity_name, "HH:MM") of the activity in progress at ``at``."""
+        at = at or self._now()
+        with self._cond:
+            index = bisect.bisect_right(self._timeline, (at.hour * 60 + at.minute + 1, ""))
+            if index == 0:
+                return None
+            minute, name = self._timeline[index - 1]
+            return name, _format_minute(minute)
+
+    def upcoming_reminders(self):
+        """Return the live, not yet fired reminders in firing order."""
+        with self._cond:
+            return [
+                entry[4] for entry in sorted(self._heap)
+                if self._versions.get(entry[2]) == entry[3]
+            ]
+
+    # Reminders
+
+    def _successor(self, activity_name):
+        minute = self._minutes[activity_name]
+        index = bisect.bisect_right(self._timeline, (minute, activity_name))
+        return self._timeline[index] if index < len(self._timeline) else None
+
+    def _schedule_reminders(self, activity_name):
+        start = datetime.combine(self._day, datetime.min.time())
+        minute = self._minutes[activity_name]
+        label = _label(activity_name)
+        self._push(Reminder(
+            start + timedelta(minutes=minute), "start", activity_name, f"It's time for {label}!"
+        ))
+
+        successor = self._successor(activity_name)
+        if successor is None:
+            self._cancel(("ending", activity_name))
+            return
+        ends_at = start + timedelta(minutes=successor[0])
+        lead = min(self.reminder_lead_minutes, successor[0] - minute)
+        if lead <= 0:
+            self._cancel(("ending", activity_name))
+            return
+        self._push(Reminder(
+            ends_at - timedelta(minutes=lead),
+            "ending",
+            activity_name,
+            f"{label.capitalize()} is over in {lead} minutes, let's clean up!",
+        ))
+
+    def _push(self, reminder):
+        key = (reminder.kind, reminder.activity_name)
+        version = self._versions.get(key, 0) + 1
+        self._versions[key] = version
+        if reminder.fire_at < self._now():
+            return  # Already past; the version bump cancels any older timer
+        heapq.heappush(self._heap, (reminder.fire_at, next(self._seq), key, version, reminder))
+
+    def _cancel(self, key):
+        if key in self._versions:
+            self._versions[key] += 1
+
+    def _until_midnight(self):
+        if self._day is None:
+            return None
+        midnight = datetime.combine(self._day + timedelta(days=1), datetime.min.time())
+        return max(0.0, (midnight - self._now()).total_seconds())
+
+    def _roll_over(self):
+        """Re-arm the timeline if the date has changed; returns the new day or None."""
+        today = self._now().date()
+        if self._day is None or today == self._day:
+            return None
+        logger.info(f"New day {today}: re-arming {len(self._timeline)} activities")
+        self._arm(today)
+        return today
+
+    def _pop_due(self):
+        """Wait until a live reminder is due and pop it (or a new day starts); None once stopped."""
+        while self._running:
+            new_day = self._roll_over()
+            if new_day:
+                return new_day
+            while self._heap and self._versions.get(self._heap[0][2]) != self._heap[0][3]:
+                heapq.heappop(self._heap)  # Superseded by a schedule change
+            if not self._heap:
+                self._cond.wait(self._until_midnight())
+                continue
+            delay = (self._heap[0][0] - self._now()).total_seconds()
+            if delay > 0:
+                until_midnight = self._until_midnight()
+                self._cond.wait(delay if until_midnight is None else min(delay, until_midnight))
+                continue
+            entry = heapq.heappop(self._heap)
+            self._cancel(entry[2])  # Fired; drop it from upcoming_reminders()
+            return entry[4]
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                reminder = self._pop_due()
+            if reminder is None:
+                return
+            if not isinstance(reminder, Reminder):  # Midnight passed
+                if self.on_new_day:
+                    try:
+                        self.on_new_day(reminder)
+                    except Exception as e:
+                        logger.error(f"Error loading the schedule for {reminder}: {e}")
+                continue
+            try:
+                self.on_reminder(reminder)
+            except Exception as e:
+                logger.error(f"Error handling reminder {reminder.text!r}: {e}")
+
+    def _log_reminder(self, reminder):
+        logger.info(f"Reminder: {reminder.text}")
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="schedule-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,206 @@
+"""
+Keeps this device's schedule in step with the household's copy on the server.
+
+The server stores each household's schedule (server/schedule_store.py).
+Voice commands change it there, and every device pulls what changed since
+its cursor with ``GET /schedule/sync``, one row per changed activity, and
+replays it into the local journal with ``source="sync"``. Changes made
+only on this device (undo, scripts) are pushed with ``POST
+/schedule/changes``. The same request returns anything this device missed.
+
+Each entry keeps the server's ``seq`` from when this device last saw it,
+and a pushed change carries it as ``base_seq``. If another device changed
+the entry since, the server reports a conflict instead of applying it, and
+the server's time is kept here too.
+
+The cursor and the last pushed journal id live in ``sync_state``. Once a
+pull has shown the server holds today's schedule, ``has_day()`` is true
+and the client stops uploading it with every question.
+"""
+import logging
+import threading
+from datetime import datetime
+
+import requests
+from sqlalchemy import and_, func
+
+from database import (
+    session_scope, DailyContext, ScheduleChange, ScheduleEntry, SyncState,
+    record_change, retry_schedule_write, ensure_entries, get_activity_time
+)
+from database.schedule import parse_time
+from wire import decode
+
+logger = logging.getLogger(__name__)
+
+CURSOR = "schedule_cursor"
+PUSHED_CHANGE = "schedule_pushed_change_id"
+LOCAL_SOURCES = ("undo", "manual")  # Journal sources the server hasn't seen yet
+
+
+def _get_state(db, name):
+    state = db.query(SyncState).filter(SyncState.name == name).first()
+    return state.value if state else 0
+
+
+def _set_state(db, name, value):
+    state = db.query(SyncState).filter(SyncState.name == name).first()
+    if state is None:
+        db.add(SyncState(name=name, value=value))
+    else:
+        state.value = value
+
+
+def _saw(db, daily_context_id, activity_name, seq):
+    """Remember the server's seq for an entry, to send back as ``base_seq``."""
+    if seq is not None:
+        db.query(ScheduleEntry).filter(
+            ScheduleEntry.daily_context_id == daily_context_id, ScheduleEntry.activity_name == activity_name
+        ).update({"server_seq": seq}, synchronize_session=False)
+
+
+class ScheduleSync:
+    def __init__(self, server_url, headers=None, timeout=10, on_change=None):
+        self.server_url = server_url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.on_change = on_change  # Called with (activity_name, "HH:MM") for today's applied changes
+        self.server_days = set()
+        self._lock = threading.Lock()  # One sync at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def has_day(self, day):
+        """True once the server is known to hold ``day``'s schedule."""
+        return day.isoformat() in self.server_days
+
+    def apply_changes(self, changes):
+        """Replay the server's changes into the local schedule. Returns how many changed it."""
+        applied = 0
+        today = datetime.now().date().isoformat()
+        with session_scope() as db:
+            for change in changes:
+                self.server_days.add(change["day"])
+                if change["time"] is None:
+                    logger.info(f"Server removed {change['activity_name']} on {change['day']}; keeping it locally")
+                    continue
+                daily_context = db.query(DailyContext).filter(func.date(DailyContext.date) == change["day"]).first()
+                if daily_context is None:
+                    continue  # Not a day this device has
+                if self._apply(db, daily_context, change["activity_name"], change["time"], change.get("seq")):
+                    applied += 1
+                    if change["day"] == today and self.on_change:
+                        self.on_change(change["activity_name"], change["time"])
+        return applied
+
+    def _apply(self, db, daily_context, activity_name, new_time, seq=None):
+        def write(session):
+            ensure_entries(session, daily_context)
+            _saw(session, daily_context.id, activity_name, seq)  # Committed (or retried) with the change
+            if get_activity_time(session, daily_context.id, activity_name) == new_time:
+                return False
+            if record_change(session, daily_context, activity_name, new_time, source="sync") is None:
+                # New on the server: add it to this device's day
+                session.add(ScheduleEntry(daily_context_id=daily_context.id, activity_name=activity_name,
+                                          start_minute=parse_time(new_time), server_seq=seq))
+            return True
+        return retry_schedule_write(db, write)
+
+    def pull(self):
+        """Fetch and apply everything after the stored cursor. Returns the number of local changes."""
+        with self._lock:
+            with session_scope() as db:
+                cursor = _get_state(db, CURSOR)
+            applied = 0
+            while True:
+                today = datetime.now().date().isoformat()
+                response = requests.get(
+                    f"{self.server_url}/schedule/sync", params={"since": cursor, "day": today},
+                    headers=self.headers, timeout=self.timeout
+                )
+                response.raise_for_status()
+                page = decode(response)
+                if page.get("reset"):
+                    logger.warning("Server schedule store was reset; resyncing from the start")
+                    self.server_days.clear()
+                if page.get("has_day"):
+                    self.server_days.add(today)
+                applied += self.apply_changes(page["changes"])
+                cursor = page["cursor"]
+                with session_scope() as db:
+                    _set_state(db, CURSOR, cursor)
+                if not page.get("more"):
+                    return applied
+
+    def push(self):
+        """Send journal changes made only on this device. Returns the number the server applied."""
+        with self._lock:
+            with session_scope() as db:
+                pushed = _get_state(db, PUSHED_CHANGE)
+                cursor = _get_state(db, CURSOR)
+                rows = db.query(
+                    ScheduleChange, DailyContext.date, ScheduleEntry.server_seq
+                ).select_from(ScheduleChange).join(
+                    DailyContext, ScheduleChange.daily_context_id == DailyContext.id
+                ).outerjoin(
+                    ScheduleEntry, and_(ScheduleEntry.daily_context_id == ScheduleChange.daily_context_id,
+                                        ScheduleEntry.activity_name == ScheduleChange.activity_name)
+                ).filter(
+                    ScheduleChange.id > pushed, ScheduleChange.source.in_(LOCAL_SOURCES)
+                ).order_by(ScheduleChange.id).all()
+            if not rows:
+                return 0
+            # Only what was read: a change committed since waits for the next push
+            last_id = max(change.id for change, _, _ in rows)
+            # The latest change per entry; earlier ones would conflict with it on the server
+            latest = {}
+            for change, day, base_seq in rows:
+                latest[(day.date().isoformat(), change.activity_name)] = (change, base_seq)
+            changes = [
+                {"day": day, "activity_name": name,
+                 "time": f"{change.new_minute // 60:02d}:{change.new_minute % 60:02d}", "source": change.source,
+                 "base_seq": base_seq}
+                for (day, name), (change, base_seq) in latest.items()
+            ]
+            response = requests.post(
+                f"{self.server_url}/schedule/changes", json={"changes": changes, "since": cursor},
+                headers=self.headers, timeout=self.timeout
+            )
+            response.raise_for_status()
+            result = decode(response)
+            for conflict in result["conflicts"]:
+                logger.warning(f"{conflict['activity_name']} on {conflict['day']} was changed on another device; "
+                               f"keeping its time {conflict['time']}")
+            # The server's time wins a conflict; what was applied comes back with its new seq
+            self.apply_changes(result["conflicts"] + result["applied"] + result["sync"]["changes"])
+            with session_scope() as db:
+                _set_state(db, PUSHED_CHANGE, last_id)
+                _set_state(db, CURSOR, result["sync"]["cursor"])
+            return len(result["applied"])
+
+    def sync(self):
+        try:
+            self.push()
+            self.pull()
+        except requests.RequestException as e:
+            logger.warning(f"Schedule sync failed, will retry: {e}")
+        except Exception as e:
+            logger.error(f"Error syncing schedule: {e}")
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(interval)
+
+    def start(self, interval):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="schedule-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -15,23 +15,42 @@ def check_current_schedule():
         
         today = datetime.now().date()
         cursor.execute("""
-            SELECT schedule, adjustments, updated_at 
+            SELECT id, schedule, adjustments, updated_at, snapshot_change_id 
             FROM daily_context 
             WHERE date(date) = date(?)
         """, (today.isoformat(),))
         
         result = cursor.fetchone()
         if result:
-            schedule = json.loads(result[0])
-            adjustments = json.loads(result[1])
-            updated_at = result[2]
+            daily_context_id = result[0]
+            schedule = json.loads(result[1])
+            adjustments = json.loads(result[2])
+            updated_at = result[3]
+            snapshot_change_id = result[4] or 0
             
-            logger.info(f"Current Schedule (last updated: {updated_at}):")
+            logger.info(f"Schedule snapshot (last updated: {updated_at}):")
             logger.info(json.dumps(schedule, indent=2))
             
             if adjustments:
                 logger.info("\nRecent Adjustments:")
                 logger.info(json.dumps(adjustments, indent=2))
+            
+            # Changes made since the snapshot live in the schedule journal
+            cursor.execute("""
+                SELECT activity_name, old_minute, new_minute, source, created_at 
+                FROM schedule_change 
+                WHERE daily_context_id = ? AND id > ? 
+                ORDER BY id
+            """, (daily_context_id, snapshot_change_id))
+            changes = cursor.fetchall()
+            if changes:
+                logger.info("\nChanges since snapshot:")
+                for activity_name, old_minute, new_minute, source, created_at in changes:
+                    logger.info(
+                        f"{created_at} {activity_name}: "
+                        f"{old_minute // 60:02d}:{old_minute % 60:02d} -> "
+                        f"{new_minute // 60:02d}:{new_minute % 60:02d} ({source})"
+                    )
         else:
             logger.error("No schedule found for today")
             
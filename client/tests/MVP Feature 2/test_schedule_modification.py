@@ -9,7 +9,8 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SERVER_URL = "http://13.57.89.95:8000"
+# Set SERVER_URL=http://127.0.0.1:8000 to run against a local server
+SERVER_URL = os.getenv("SERVER_URL", "http://13.57.89.95:8000")
 DB_PATH = "../../quintilian.db"  # Path to the client's SQLite database
 
 def get_current_schedule():
@@ -1,11 +1,13 @@
 import requests
 import json
 import logging
+import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SERVER_URL = "http://13.57.89.95:8000"
+# Set SERVER_URL=http://127.0.0.1:8000 to run against a local server
+SERVER_URL = os.getenv("SERVER_URL", "http://13.57.89.95:8000")
 
 def test_process_text():
     # Sample context (mimicking the context sent by the audio flow)
@@ -0,0 +1,80 @@
+"""
+Rows/sec for activity logging: one ORM add+commit per row vs. log_activities().
+
+Run from the client directory:
+    python tests/benchmark_activity_ingest.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import init_db, FamilyProfile, ActivityLog, log_activities
+
+
+def _make_session(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    init_db(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    family = FamilyProfile(child_name="Bench", child_age=3)
+    db.add(family)
+    db.commit()
+    return engine, db, family.id
+
+
+def _events(count):
+    start = datetime(2025, 1, 1, 7, 0)
+    return [
+        {
+            "activity_name": f"activity_{i % 12}",
+            "start_time": start + timedelta(minutes=15 * i),
+            "end_time": start + timedelta(minutes=15 * i + 10),
+            "status": "completed" if i % 5 else "skipped",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_one_at_a_time(path, events):
+    engine, db, family_id = _make_session(path)
+    started = time.perf_counter()
+    for event in events:
+        db.add(ActivityLog(family_id=family_id, **event))
+        db.commit()
+    elapsed = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+    return elapsed
+
+
+def bench_bulk(path, events):
+    engine, db, family_id = _make_session(path)
+    started = time.perf_counter()
+    log_activities(db, events, family_id=family_id)
+    elapsed = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    events = _events(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        single = bench_one_at_a_time(os.path.join(tmp, "single.db"), events)
+        bulk = bench_bulk(os.path.join(tmp, "bulk.db"), events)
+
+    print(f"Rows: {count}")
+    print(f"One at a time: {count / single:10.0f} rows/sec ({single:.3f}s)")
+    print(f"Bulk insert:   {count / bulk:10.0f} rows/sec ({bulk:.3f}s)")
+    print(f"Speedup:       {single / bulk:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Per-frame wake word inference cost for different ONNX Runtime settings.
+
+Every combination of the options given is loaded through
+wakeword_models.load_model() and fed the same audio, one microphone chunk
+at a time. For each one it reports:
+
+* per-frame latency (p50/p95) of Model.predict()
+* busy CPU %: process CPU time / wall time while predicting flat out
+  (over 100% means more than one core)
+* listening CPU %: CPU time per second of audio, i.e. the cost of the
+  always-on loop on one core
+* drift: the largest score difference from the first configuration, to
+  catch int8 variants that change what the detector hears
+
+With --gate each configuration also runs behind the energy gate
+(wakeword_gate.py, settings from config.WAKEWORD_GATE); skipped frames
+score 0 and ``model %`` is the share of frames the model ran on.
+
+Run from the client directory:
+    python tests/benchmark_onnx.py
+    python tests/benchmark_onnx.py --threads 1,2,4 --graph basic,all --modes sequential --quantized none,embedding,all
+    python tests/benchmark_onnx.py --threads 1 --quantized none --gate
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from itertools import product
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import AUDIO_SETTINGS, WAKE_WORD, WAKEWORD_GATE, WAKEWORD_MODEL_DIR
+from wakeword_gate import EnergyGate
+from wakeword_models import DEFAULT_SESSION, QUANTIZABLE, load_model, model_key
+
+
+def _audio(seconds, rate, seed=0):
+    """A quiet room with a louder, voiced stretch every 10 seconds."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    voiced = ((t % 10) < 1.5) * 3000 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (voiced + 15 * rng.standard_normal(len(t))).astype(np.int16)
+
+
+def bench(settings, audio, chunk, rate, warmup=25, gated=False):
+    model = load_model([WAKE_WORD], WAKEWORD_MODEL_DIR, session=settings)
+    key = model_key(WAKE_WORD)
+    frames = [audio[i:i + chunk] for i in range(0, len(audio) - chunk + 1, chunk)]
+    for frame in frames[:warmup]:
+        model.predict(frame)
+    model.reset()
+    gate_settings = {k: v for k, v in WAKEWORD_GATE.items() if k != "enabled"}
+    gate = EnergyGate(chunk, rate, **gate_settings) if gated else None
+
+    latencies = []
+    scores = []
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for frame in frames:
+        started = time.perf_counter()
+        heard = gate.process(frame) if gate else [frame]
+        scores.append(max((model.predict(f)[key] for f in heard), default=0.0))
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    audio_seconds = len(frames) * chunk / rate
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "busy_cpu_pct": 100 * cpu / wall,
+        "listening_cpu_pct": 100 * cpu / audio_seconds,
+        "model_pct": 100 * (gate.duty_cycle if gate else 1.0),
+        "scores": np.array(scores),
+    }
+
+
+def _names(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _quantized(value):
+    if value == "none":
+        return []
+    if value == "all":
+        return sorted(QUANTIZABLE)
+    return value.split("+")
+
+
+def _label(quantized):
+    if set(quantized) == QUANTIZABLE:
+        return "all"
+    return "+".join(quantized) or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2", help="intra-op thread counts")
+    parser.add_argument("--graph", default="all", help="graph optimization levels: disable, basic, extended, all")
+    parser.add_argument("--modes", default="sequential", help="execution modes: sequential, parallel")
+    parser.add_argument("--quantized", default="none,all",
+                        help="int8 variants: none, all, or models joined by + (e.g. embedding+wakeword)")
+    parser.add_argument("--spinning", action="store_true", help="Also try with thread spinning enabled")
+    parser.add_argument("--gate", action="store_true", help="Also run each configuration behind the energy gate")
+    parser.add_argument("--seconds", type=float, default=30, help="Seconds of audio per configuration")
+    parser.add_argument("--chunk", type=int, default=AUDIO_SETTINGS["WAKEWORD_CHUNK"], help="Samples per frame")
+    args = parser.parse_args()
+
+    rate = AUDIO_SETTINGS["RATE"]
+    audio = _audio(args.seconds, rate)
+    configs = [
+        {**DEFAULT_SESSION, "intra_op_threads": int(threads), "graph_optimization": graph,
+         "execution_mode": mode, "quantized": _quantized(quantized), "spinning": spinning}
+        for threads, graph, mode, quantized, spinning in product(
+            _names(args.threads), _names(args.graph), _names(args.modes), _names(args.quantized),
+            [False, True] if args.spinning else [False],
+        )
+    ]
+
+    print(f"{len(configs)} configurations, {args.seconds:.0f}s of audio in {args.chunk}-sample frames\n")
+    print(f"{'threads':>7} {'graph':<9}{'mode':<11}{'int8':<28}{'spin':<6}{'gate':<6}"
+          f"{'p50 ms':>8}{'p95 ms':>8}{'busy %':>8}{'listen %':>10}{'model %':>9}{'drift':>8}")
+    baseline = None
+    for settings in configs:
+        for gated in ([False, True] if args.gate else [False]):
+            result = bench(settings, audio, args.chunk, rate, gated=gated)
+            if baseline is None:
+                baseline = result["scores"]
+            drift = float(np.max(np.abs(result["scores"] - baseline)))
+            print(f"{settings['intra_op_threads']:>7} {settings['graph_optimization']:<9}{settings['execution_mode']:<11}"
+                  f"{_label(settings['quantized']):<28}{'yes' if settings['spinning'] else 'no':<6}"
+                  f"{'yes' if gated else 'no':<6}"
+                  f"{result['p50_ms']:>8.2f}{result['p95_ms']:>8.2f}{result['busy_cpu_pct']:>8.0f}"
+                  f"{result['listening_cpu_pct']:>10.1f}{result['model_pct']:>9.0f}{drift:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+End-to-end client latency from recorded audio, without a microphone.
+
+Replays a WAV fixture into OpenVoiceAssistant in real time, the way the
+microphone would deliver it, against a local fake server, and reports:
+
+* per-stage timings: record, encode, context, serialize, upload,
+  download, decode, playback, and time-to-first-audio (end of speech to
+  the first sample of the answer)
+* a CPU profile (process time, so waiting on audio does not count) for
+  wake-word inference, the silence detector and context serialization
+* peak traced memory and the largest allocation sites
+
+By default a synthetic question (speech-like bursts, then silence) is
+replayed straight into the recorder. With --wake-word the fixture goes
+through the wake-word listener first, so it should be a recording of
+"hey jarvis, ..." and the openWakeWord models must be downloadable.
+
+Run from the client directory:
+    python tests/benchmark_replay.py --runs 5
+    python tests/benchmark_replay.py --fixture hey_jarvis_delay_nap.wav --wake-word
+    python tests/benchmark_replay.py --runs 5 --json replay.json --max-ttfa-ms 800
+
+The database is a scratch copy unless QUINTILIAN_DATABASE_URL is set.
+"""
+import argparse
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from audio_io import WavFileSource, write_wav
+
+RATE = 16000
+
+# Profile entries reported by name: (label, file suffix, function)
+PROFILED = [
+    ("wake_word", os.path.join("openwakeword", "model.py"), "predict"),
+    ("vad", "openwakeword_assistant.py", "record_until_silence"),
+    ("context", "prompt_builder.py", "get_current_context"),
+    ("serialize", "openwakeword_assistant.py", "context_to_dict"),
+    ("json_dumps", os.path.join("json", "__init__.py"), "dumps"),
+]
+
+
+def speech_fixture(rate=RATE, lead=0.3, speech=1.0, tail=1.5, seed=0):
+    """Silence, a burst of syllable-like noise loud enough to count as speech, then silence."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech * rate)) / rate
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)  # ~4 syllables a second
+    voiced = 3000 * envelope * (np.sin(2 * np.pi * 180 * t) + 0.3 * rng.standard_normal(len(t)))
+    return np.concatenate([
+        np.zeros(int(lead * rate)),
+        voiced,
+        np.zeros(int(tail * rate)),
+    ]).astype(np.int16)
+
+
+def _reply_wav(seconds=1.0, rate=22050):
+    t = np.arange(int(seconds * rate)) / rate
+    buffer = io.BytesIO()
+    write_wav(buffer, (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16), rate)
+    return buffer.getvalue()
+
+
+class FakeServer:
+    """Answers /process-audio with a fixed reply and serves the reply clip."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.uploads = []
+        self.reply = _reply_wav()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != "/process-audio":
+                    return self._send(404, b"{}")
+                server.uploads.append({"bytes": len(body), "household": self.headers.get("X-Household-ID"), "body": body})
+                time.sleep(server.latency)
+                self._send(200, json.dumps({
+                    "text": "Okay, nap is now at 13:30.",
+                    "audio_url": "/audio/reply.wav",
+                    "transcript": "Delay nap 30 minutes",
+                }).encode("utf-8"))
+
+            def do_GET(self):
+                if self.path == "/audio/reply.wav":
+                    return self._send(200, server.reply, "audio/wav")
+                self._send(404, b"{}")
+
+            def _send(self, status, body, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReplaySink:
+    """Records what would have been played instead of playing it."""
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, data, samplerate):
+        self.played.append((time.perf_counter(), len(data) / samplerate))
+
+
+def seed_database():
+    """Give the scratch database a family, today's schedule and some history."""
+    from database import get_db, init_db, FamilyProfile, DailyContext, log_activities
+
+    init_db()
+    db = next(get_db())
+    try:
+        if db.query(FamilyProfile).first():
+            return
+        family = FamilyProfile(
+            child_name="Emma", child_age=2,
+            preferences={"favorite_activities": ["art", "outdoor_play"]}
+        )
+        db.add(family)
+        db.flush()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        daily_context = DailyContext(
+            family_id=family.id, date=today, mood_notes="Happy this morning",
+            schedule={
+                "wake_up": "07:00", "breakfast": "07:30", "morning_play": "08:00", "snack": "10:00",
+                "lunch": "12:00", "nap": "13:00", "afternoon_play": "15:00", "dinner": "18:00",
+                "bedtime": "19:30",
+            },
+        )
+        db.add(daily_context)
+        db.commit()
+        now = datetime.now()
+        log_activities(db, [
+            {"activity_name": name, "start_time": now - timedelta(hours=hours), "status": "completed"}
+            for name, hours in [("wake_up", 6), ("breakfast", 5), ("morning_play", 4), ("snack", 2)]
+        ], family_id=family.id, daily_context_id=daily_context.id)
+    finally:
+        db.close()
+
+
+def _profile_in_thread(function, profiles):
+    """Wrap function so calls on other threads are profiled too (cProfile is per thread)."""
+    def wrapper(*args, **kwargs):
+        profile = cProfile.Profile(time.process_time)
+        profiles.append(profile)
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+    return wrapper
+
+
+def _profile_entries(stats):
+    entries = {}
+    for (filename, _, function), (_, calls, _, cumulative, _) in stats.stats.items():
+        for label, suffix, name in PROFILED:
+            if function == name and filename.endswith(suffix):
+                entry = entries.setdefault(label, {"calls": 0, "cpu_ms": 0.0})
+                entry["calls"] += calls
+                entry["cpu_ms"] += cumulative * 1000
+    return entries
+
+
+def _replay_once(assistant, samples, wake_word, timeout, profiles=None):
+    """Replay one fixture; returns (stage timings, seconds into the fixture the wake word fired)."""
+    from openwakeword_assistant import OpenVoiceAssistant
+
+    def profiled(function):
+        return _profile_in_thread(function, profiles) if profiles is not None else function
+
+    source = WavFileSource(samples, RATE)
+    assistant.audio_source = source
+    assistant.should_stop_recording = False
+    assistant.timings = {}
+    process = profiled(OpenVoiceAssistant.record_and_process_question)
+    if not wake_word:
+        process(assistant)
+        return dict(assistant.timings), None
+
+    detected = []
+
+    def on_wake_word(wake_word=None):
+        detected.append(source.position() / RATE)
+        process(assistant, wake_word)
+
+    assistant.record_and_process_question = on_wake_word
+    listener = threading.Thread(target=profiled(assistant.listen_for_wake_word))
+    listener.start()
+    deadline = time.time() + source.duration + timeout
+    while time.time() < deadline:
+        busy = assistant.processing_thread is not None and assistant.processing_thread.is_alive()
+        if source.finished and not busy:
+            break
+        time.sleep(0.05)
+    assistant.should_stop_recording = True
+    listener.join()
+    if assistant.processing_thread:
+        assistant.processing_thread.join()
+    assistant.processing_thread = None
+    del assistant.record_and_process_question
+    if not detected:
+        logging.getLogger(__name__).warning("Wake word not detected in fixture")
+        return None, None
+    return dict(assistant.timings), detected[0]
+
+
+def run_replay(samples, server_url, runs=1, wake_word=False, profile=True, top=15, timeout=60.0):
+    """Replay samples through the assistant; returns a report dict.
+
+    Timings come from ``runs`` plain runs. The profile comes from one
+    extra run, since cProfile and tracemalloc slow everything down.
+    """
+    from openwakeword_assistant import OpenVoiceAssistant
+
+    seed_database()
+    sink = ReplaySink()
+    assistant = OpenVoiceAssistant(audio_sink=sink, server_url=server_url)
+    if wake_word:
+        assistant.model  # Load before the clock starts, as the assistant does at startup
+
+    runs_timings = []
+    detections = []
+    for _ in range(runs):
+        timings, detected_at = _replay_once(assistant, samples, wake_word, timeout)
+        if timings is not None:
+            runs_timings.append(timings)
+        if detected_at is not None:
+            detections.append(detected_at)
+
+    report = {
+        "runs": runs_timings,
+        "stages": {
+            stage: statistics.median(t[stage] for t in runs_timings if stage in t)
+            for stage in dict.fromkeys(s for t in runs_timings for s in t)
+        },
+        "wake_word_detected_at": detections,
+        "played": len(sink.played),
+    }
+    if not profile:
+        return report
+
+    profiles = []
+    tracemalloc.start()
+    try:
+        _replay_once(assistant, samples, wake_word, timeout, profiles)
+        _, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics("lineno")[:5]
+    finally:
+        tracemalloc.stop()
+
+    stats = pstats.Stats(profiles[0])
+    for extra in profiles[1:]:
+        stats.add(extra)
+    top_output = io.StringIO()
+    stats.stream = top_output
+    stats.sort_stats("cumulative").print_stats(top)
+    report.update({
+        "cpu": _profile_entries(stats),
+        "cpu_top": top_output.getvalue(),
+        "memory": {
+            "peak_bytes": peak,
+            "top_allocations": [f"{stat.traceback[0]}: {stat.size / 1024:.1f} KiB" for stat in allocations],
+        },
+    })
+    return report
+
+
+def print_report(report):
+    print(f"\nReplay: {len(report['runs'])} run(s)")
+    print(f"  {'stage':<22}{'median ms':>10}")
+    for stage, seconds in report["stages"].items():
+        print(f"  {stage:<22}{seconds * 1000:>10.1f}")
+    if report["wake_word_detected_at"]:
+        print(f"  wake word detected at {', '.join(f'{s:.2f}s' for s in report['wake_word_detected_at'])} into the fixture")
+    if "cpu" not in report:
+        return
+    print(f"\n  {'cpu':<22}{'calls':>8}{'total ms':>10}{'per call ms':>13}")
+    for label, entry in report["cpu"].items():
+        print(f"  {label:<22}{entry['calls']:>8}{entry['cpu_ms']:>10.1f}{entry['cpu_ms'] / entry['calls']:>13.3f}")
+    print(f"\n  peak traced memory: {report['memory']['peak_bytes'] / 1024 / 1024:.1f} MiB")
+    for line in report["memory"]["top_allocations"]:
+        print(f"    {line}")
+    print(report["cpu_top"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", help="16 kHz mono 16-bit WAV to replay (default: synthetic question)")
+    parser.add_argument("--wake-word", action="store_true", help="Go through the wake-word listener first")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--server-url", help="Use a running server instead of the built-in fake")
+    parser.add_argument("--server-latency", type=float, default=0, help="Fake server latency in ms")
+    parser.add_argument("--no-profile", action="store_true", help="Skip the profiled run")
+    parser.add_argument("--top", type=int, default=15, help="Functions to list from the CPU profile")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--max-ttfa-ms", type=float, help="Exit non-zero if median time-to-first-audio is above this")
+    parser.add_argument("--verbose", action="store_true", help="Keep the assistant's INFO logging")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.setdefault("QUINTILIAN_DATABASE_URL", f"sqlite:///{os.path.join(scratch, 'replay.db')}")
+        import openwakeword_assistant  # noqa: F401 - configures logging on import
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+
+        samples = WavFileSource.from_file(args.fixture, RATE).samples if args.fixture else speech_fixture()
+        server = None if args.server_url else FakeServer(args.server_latency / 1000.0).start()
+        try:
+            report = run_replay(
+                samples, args.server_url or server.url, args.runs, args.wake_word, not args.no_profile, args.top
+            )
+        finally:
+            if server:
+                server.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({k: v for k, v in report.items() if k != "cpu_top"}, f, indent=2)
+    ttfa = report["stages"].get("time_to_first_audio")
+    if ttfa is None:
+        print("No answer was played", file=sys.stderr)
+        sys.exit(1)
+    if args.max_ttfa_ms is not None and ttfa * 1000 > args.max_ttfa_ms:
+        print(f"Time-to-first-audio {ttfa * 1000:.0f} ms is over the {args.max_ttfa_ms:.0f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Time from launch to listening for the wake word.
+
+Each run starts a fresh interpreter that imports the assistant, builds
+it and calls start() with an audio source that only notes when the
+listener first reads from it. Reported per phase (median over runs,
+milliseconds since the process was spawned):
+
+* import     - ``import openwakeword_assistant``
+* init       - ``OpenVoiceAssistant()``
+* model      - wake word model loaded from the local cache
+* listening  - the listener's first read from the microphone
+* warm       - database, prompt builder and reminders ready (background)
+
+Run from the client directory (the first run fills the model cache):
+    python tests/benchmark_startup.py --runs 5
+    python tests/benchmark_startup.py --imports   # slowest imports (assistant + openWakeWord)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CLIENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, sys, time
+import numpy as np
+spawned = float(sys.argv[1])
+marks = {}
+def mark(name):
+    marks.setdefault(name, (time.time() - spawned) * 1000)
+
+import openwakeword_assistant
+mark("import")
+
+class FirstReadSource:
+    def open(self):
+        return self
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def read(self, frames):
+        mark("listening")
+        assistant.should_stop_recording = True
+        return np.zeros((frames, 1), dtype=np.int16), False
+
+class SilentSink:
+    def play(self, data, samplerate):
+        pass
+
+assistant = openwakeword_assistant.OpenVoiceAssistant(audio_source=FirstReadSource(), audio_sink=SilentSink())
+mark("init")
+try:
+    assistant.model
+    mark("model")
+    assistant.start()
+    deadline = time.time() + 30
+    while assistant.prompt_builder is None and time.time() < deadline:
+        time.sleep(0.005)
+    mark("warm")
+except Exception as e:
+    marks["error"] = f"{type(e).__name__}: {e}"
+finally:
+    assistant.stop()
+print("STARTUP " + json.dumps(marks))
+"""
+
+
+def run_once(env):
+    spawned = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, repr(spawned)],
+        cwd=CLIENT_DIR, env=env, capture_output=True, text=True, timeout=300
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):])
+    return {"error": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+
+
+def slowest_imports(env, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import openwakeword_assistant, openwakeword.model"],
+        cwd=CLIENT_DIR, env=env, capture_output=True, text=True, timeout=300
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", action="store_true", help="List the slowest imports instead")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ)
+        env.setdefault("QUINTILIAN_DATABASE_URL", f"sqlite:///{os.path.join(scratch, 'startup.db')}")
+        env.setdefault("LOG_LEVEL", "WARNING")
+
+        if args.imports:
+            for cumulative, name in slowest_imports(env, args.top):
+                print(f"{cumulative / 1000:>10.1f} ms  {name}")
+            return
+
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    errors = [run["error"] for run in runs if "error" in run]
+    if errors:
+        print(f"{len(errors)} of {len(runs)} runs failed: {errors[0]}", file=sys.stderr)
+    print(f"\nStartup over {len(runs)} run(s), ms since spawn")
+    print(f"  {'phase':<12}{'median':>10}{'min':>10}{'max':>10}")
+    for phase in ("import", "init", "model", "listening", "warm"):
+        samples = [run[phase] for run in runs if phase in run]
+        if samples:
+            print(f"  {phase:<12}{statistics.median(samples):>10.0f}{min(samples):>10.0f}{max(samples):>10.0f}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Weekly trends over a large history: ORM rows summed in Python vs. the
+NumPy path in database/trends.py.
+
+Run from the client directory:
+    python tests/benchmark_trends.py [families] [years]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import init_db, FamilyProfile, ActivityLog, load_activity_arrays, weekly_totals
+from database.trends import CATEGORIES, OTHER
+
+DAY = ["wake_up", "breakfast", "morning_play", "park", "snack", "lunch", "nap", "afternoon_play", "dinner",
+       "bath_time", "bedtime"]
+
+
+def _fill(db, families, years):
+    start = datetime(2025, 1, 1)
+    ids = []
+    for f in range(families):
+        family = FamilyProfile(child_name=f"Child {f}", child_age=3)
+        db.add(family)
+        db.flush()
+        ids.append(family.id)
+    table = ActivityLog.__table__
+    for family_id in ids:
+        rows = []
+        for d in range(365 * years):
+            for i, name in enumerate(DAY):
+                begin = start + timedelta(days=d, hours=7 + i, minutes=(d * 7 + i) % 30)
+                rows.append({"family_id": family_id, "activity_name": name, "start_time": begin,
+                             "end_time": begin + timedelta(minutes=20 + (d + i) % 40), "status": "completed"})
+        db.execute(table.insert(), rows)
+    db.commit()
+    return start.date(), ids
+
+
+def bench_orm(db, first_week, weeks):
+    started = time.perf_counter()
+    lookup = {name: label for label, members in CATEGORIES.items() for name in members}
+    end = datetime.combine(first_week + timedelta(weeks=weeks), datetime.min.time())
+    totals = defaultdict(float)
+    for activity in db.query(ActivityLog).filter(ActivityLog.start_time < end):
+        week = (activity.start_time.date() - first_week).days // 7
+        if activity.end_time:
+            minutes = (activity.end_time - activity.start_time).total_seconds() / 60
+            totals[(activity.family_id, week, lookup.get(activity.activity_name, OTHER))] += minutes
+    return time.perf_counter() - started, totals
+
+
+def bench_numpy(db, first_week, weeks):
+    started = time.perf_counter()
+    arrays = load_activity_arrays(db, first_week, first_week + timedelta(weeks=weeks))
+    minutes, _ = weekly_totals(arrays, first_week, weeks)
+    return time.perf_counter() - started, minutes
+
+
+def main():
+    families = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'trends.db')}")
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        first_day, _ = _fill(db, families, years)
+        first_week = first_day - timedelta(days=first_day.weekday())
+        weeks = 52 * years + 1
+        rows = db.query(ActivityLog).count()
+
+        orm_seconds, orm_totals = bench_orm(db, first_week, weeks)
+        db.expunge_all()
+        numpy_seconds, minutes = bench_numpy(db, first_week, weeks)
+        db.close()
+        engine.dispose()
+
+    assert abs(sum(orm_totals.values()) - minutes.sum()) < 1e-6 * minutes.sum()
+    print(f"Rows: {rows} ({families} families, {years} years)")
+    print(f"ORM rows:  {orm_seconds:7.3f}s")
+    print(f"NumPy:     {numpy_seconds:7.3f}s")
+    print(f"Speedup:   {orm_seconds / numpy_seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Tests import client modules the same way the assistant does (``from database import ...``)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import init_db, ScopedSession
+from database.database import engine
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """A throwaway SQLite database so tests never touch data/quintilian.db."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def scoped(db_engine):
+    """Point the thread-local sessions (session_scope) at the test database."""
+    ScopedSession.remove()
+    ScopedSession.session_factory.configure(bind=db_engine)
+    yield
+    ScopedSession.remove()
+    ScopedSession.session_factory.configure(bind=engine)
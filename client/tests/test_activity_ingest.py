@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from database import FamilyProfile, DailyContext, ActivityLog
+from database import log_activities, backfill_checklist, import_nanny_log
+
+
+def _family(db):
+    family = FamilyProfile(child_name="Emma", child_age=3)
+    db.add(family)
+    db.commit()
+    return family
+
+
+def test_log_activities_is_idempotent(db):
+    family = _family(db)
+    events = [
+        {"activity_name": "breakfast", "start_time": "2025-05-16T07:30:00", "end_time": "2025-05-16T08:00:00"},
+        {"activity_name": "wake_up", "start_time": datetime(2025, 5, 16, 7, 0), "status": "completed"},
+        # Same occurrence twice in one batch
+        {"activity_name": "breakfast", "start_time": "2025-05-16T07:30:00"},
+    ]
+
+    assert log_activities(db, events, family_id=family.id) == 2
+    assert log_activities(db, events, family_id=family.id) == 0
+    assert db.query(ActivityLog).count() == 2
+
+    breakfast = db.query(ActivityLog).filter_by(activity_name="breakfast").one()
+    assert breakfast.end_time == datetime(2025, 5, 16, 8, 0)
+    assert breakfast.created_at is not None
+
+
+def test_backfill_checklist_uses_schedule_times(db):
+    family = _family(db)
+    daily_context = DailyContext(
+        family_id=family.id,
+        date=datetime(2025, 5, 16),
+        schedule={"breakfast": "07:30", "nap": {"start_time": "13:00"}, "art": {"time": "15:00"}},
+    )
+    db.add(daily_context)
+    db.commit()
+
+    checklist = {"breakfast": "completed", "nap": "skipped", "art": "completed"}
+    assert backfill_checklist(db, daily_context, checklist) == 3
+    assert backfill_checklist(db, daily_context, checklist) == 0
+
+    nap = db.query(ActivityLog).filter_by(activity_name="nap").one()
+    assert nap.start_time == datetime(2025, 5, 16, 13, 0)
+    assert nap.status == "skipped"
+    assert nap.daily_context_id == daily_context.id
+
+
+def test_import_nanny_log(db, tmp_path):
+    family = _family(db)
+    log_file = tmp_path / "nanny.csv"
+    log_file.write_text(
+        "activity_name,start_time,end_time,status,notes\n"
+        "lunch,2025-05-16T12:00:00,2025-05-16T12:30:00,completed,Ate pasta\n"
+        "outdoor_play,2025-05-16T15:00:00,,skipped,\n"
+    )
+
+    assert import_nanny_log(db, log_file, family.id) == 2
+    assert import_nanny_log(db, log_file, family.id) == 0
+    outdoor = db.query(ActivityLog).filter_by(activity_name="outdoor_play").one()
+    assert outdoor.end_time is None
+    assert outdoor.notes is None
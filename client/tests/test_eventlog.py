@@ -0,0 +1,48 @@
+import logging
+import os
+
+import pytest
+
+import eventlog
+from eventlog import get_event_logger
+
+SERVER_COPY = os.path.join(os.path.dirname(__file__), "..", "..", "server", "eventlog.py")
+
+
+@pytest.fixture
+def audio_logger():
+    logger = logging.getLogger("quintilian.audio")
+    yield logger
+    logger.setLevel(logging.NOTSET)
+
+
+def test_audio_levels_are_off_until_their_category_is_turned_up(caplog, audio_logger):
+    caplog.set_level(logging.INFO)
+    caplog.handler.setLevel(logging.NOTSET)
+    log = get_event_logger("openwakeword_assistant")
+
+    for level in range(10):
+        log.debug("audio.level", category="audio", every=5, level=level, threshold=500)
+    assert not caplog.records
+
+    audio_logger.setLevel(logging.DEBUG)  # What LOG_LEVELS=audio=DEBUG does
+    for level in range(10):
+        log.debug("audio.level", category="audio", every=5, level=level, threshold=500)
+    assert len(caplog.records) == 2 and all(r.name == "quintilian.audio" for r in caplog.records)
+    assert "sampled=5" in caplog.records[0].getMessage()
+
+    # Other events keep their own logger and level
+    log.info("upload.unreachable", error="Connection refused", headers={"X-Household-Key": "s3cret"})
+    assert caplog.records[-1].name == "openwakeword_assistant"
+    assert "s3cret" not in caplog.records[-1].getMessage()
+
+
+def test_log_levels_setting_is_parsed():
+    assert eventlog._parse_levels("audio=DEBUG, payload=warning") == {"audio": logging.DEBUG, "payload": logging.WARNING}
+
+
+@pytest.mark.skipif(not os.path.exists(SERVER_COPY), reason="Server sources not checked out")
+def test_same_as_the_server_copy():
+    # The client and server deploy separately, so each carries eventlog.py; keep them identical
+    with open(eventlog.__file__, "rb") as client, open(SERVER_COPY, "rb") as server:
+        assert client.read() == server.read()
@@ -0,0 +1,138 @@
+import io
+import json
+
+import msgpack
+import numpy as np
+import requests
+import soundfile as sf
+
+from database import PendingCommand, session_scope
+from outbox import Outbox, compress_audio
+
+SETTINGS = {"batch_size": 2, "backoff_seconds": 0.0, "max_attempts": 2}
+
+
+class FakeResponse:
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def json(self):
+        return self.body
+
+
+def _form_context(data):
+    return json.loads(data["context"])
+
+
+class FakeServer:
+    """Answers POSTs with ``status`` (or refuses the connection when it's None) and records what arrived."""
+
+    def __init__(self):
+        self.status = None
+        self.received = []
+
+    def post(self, url, json=None, files=None, data=None, headers=None, timeout=None):
+        if self.status is None:
+            raise requests.ConnectionError("Connection refused")
+        if self.status == 200:
+            audio = files["audio_file"][1] if files else None
+            if files and "packed_context" in files:  # The context as MessagePack (see wire.py)
+                data = {**data, "context": msgpack.unpackb(files["packed_context"][1])}
+            elif files:  # Or as a JSON form field
+                data = {**data, "context": _form_context(data)}
+            self.received.append((url.rsplit("/", 1)[-1], json or data, audio))
+        return FakeResponse(self.status, {"action": None, "n": len(self.received)})
+
+
+def _recording(tmp_path):
+    rate = 16000
+    t = np.arange(rate) / rate
+    samples = (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    path = tmp_path / "question.wav"
+    sf.write(path, samples, rate, subtype="PCM_16")
+    return path, samples
+
+
+def _outbox(server, **kwargs):
+    outbox = Outbox("http://server", settings=SETTINGS, **kwargs)
+    outbox.http = server
+    return outbox
+
+
+def test_questions_wait_while_offline_and_replay_in_order(scoped, db, tmp_path):
+    path, samples = _recording(tmp_path)
+    assert len(compress_audio(path)) < path.stat().st_size
+    server = FakeServer()
+    answers = []
+    outbox = _outbox(server, on_response=lambda path, payload, result: answers.append((path, result["n"])))
+
+    context = {"local_time": "2026-01-01T09:00"}
+    outbox.add_audio(path, context, wake_word="hey_jarvis")
+    outbox.add_request("/modify-schedule", {"activity_name": "nap", "new_time": "13:30"})
+    outbox.add_audio(path, context)
+
+    assert outbox.drain() == 0  # Server down: nothing lost, back off
+    assert outbox.failures == 1 and outbox.pending() == 3
+    assert db.query(PendingCommand).filter(PendingCommand.attempts > 0).count() == 0
+
+    server.status = 200
+    assert outbox.drain() == 3  # Two batches of at most two
+    assert outbox.pending() == 0 and outbox.failures == 0
+    assert [name for name, _, _ in server.received] == ["process-audio", "modify-schedule", "process-audio"]
+    assert answers == [("/process-audio", 1), ("/modify-schedule", 2), ("/process-audio", 3)]
+    # The server gets back exactly the WAV that was recorded
+    replayed, rate = sf.read(io.BytesIO(server.received[0][2]), dtype="int16")
+    assert rate == 16000 and np.array_equal(replayed, samples)
+    assert server.received[0][1] == {"context": context}
+
+
+def test_send_goes_straight_through_when_online(scoped, db):
+    server = FakeServer()
+    server.status = 200
+    outbox = _outbox(server)
+
+    assert outbox.send("/modify-schedule", {"activity_name": "nap"}) == {"action": None, "n": 1}
+    assert outbox.pending() == 0
+
+    server.status = None
+    assert outbox.send("/modify-schedule", {"activity_name": "lunch"}) is None
+    assert outbox.pending() == 1
+
+
+def test_failing_commands_are_dropped(scoped, db):
+    server = FakeServer()
+    outbox = _outbox(server)
+    outbox.add_request("/modify-schedule", {"activity_name": "bad"})
+    outbox.add_request("/modify-schedule", {"activity_name": "nap"})
+
+    server.status = 500  # Counts against the first command and ends the round
+    assert outbox.flush() == 0
+    assert [c.attempts for c in db.query(PendingCommand).order_by(PendingCommand.id)] == [1, 0]
+    assert outbox.flush() == 0  # Second failure: dropped
+    assert outbox.pending() == 1
+
+    server.status = 422  # Rejected: dropped at once
+    assert outbox.flush() == 0
+    assert outbox.pending() == 0
+
+
+def test_contexts_queued_as_json_strings_go_up_as_objects(scoped, db, tmp_path):
+    path, _ = _recording(tmp_path)
+    server = FakeServer()
+    server.status = 200
+    outbox = _outbox(server)
+    context = {"local_time": "2026-01-01T09:00"}
+    command_id = outbox.add_audio(path, context)
+    with session_scope() as session:  # As older versions stored it
+        session.get(PendingCommand, command_id).payload = {"context": json.dumps(context), "transcript": None}
+
+    assert outbox.drain() == 1
+    # An object, not a string inside the MessagePack part (or JSON inside JSON)
+    assert server.received[0][1]["context"] == context
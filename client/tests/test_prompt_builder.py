@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from database import FamilyProfile, DailyContext, ScopedSession, session_scope, read_session, log_activities
+from prompt_builder import PromptBuilder
+
+
+@pytest.fixture
+def family(db):
+    family = FamilyProfile(child_name="Emma", child_age=3, preferences={"foods": ["pasta"]})
+    db.add(family)
+    db.commit()
+    db.add(DailyContext(family_id=family.id, date=datetime.now(), schedule={"nap": "13:00", "bedtime": "19:30"}))
+    db.commit()
+    log_activities(db, [{"activity_name": "breakfast", "start_time": datetime.now().replace(microsecond=0)}],
+                   family_id=family.id)
+    return family
+
+
+def test_context_is_readable_after_each_call(scoped, family):
+    builder = PromptBuilder()
+    for _ in range(3):  # Every call gets a fresh session, not a closed one
+        context = builder.get_current_context()
+        assert context["daily_context"].family.child_name == "Emma"
+        assert context["schedule"] == {"nap": "13:00", "bedtime": "19:30"}
+        assert [a.activity_name for a in context["recent_activities"]] == ["breakfast"]
+        assert "Emma" in builder.build_prompt("When is nap?")
+    assert not ScopedSession.registry.has()
+
+
+def test_threads_get_their_own_sessions(scoped, family):
+    builder = PromptBuilder()
+    barrier = threading.Barrier(4)
+
+    def ask(_):
+        with read_session() as db:
+            barrier.wait(timeout=5)  # All four scopes are open at once
+            session = db
+        return session, builder.get_current_context()["family"].child_name
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(ask, range(4)))
+    assert len({id(session) for session, _ in results}) == 4
+    assert {name for _, name in results} == {"Emma"}
+
+
+def test_nested_scopes_share_one_unit_of_work(scoped, family):
+    with pytest.raises(RuntimeError):
+        with session_scope() as outer:
+            with read_session() as inner:
+                assert inner is outer
+            outer.add(FamilyProfile(child_name="Leo", child_age=1))
+            outer.flush()
+            raise RuntimeError("roll back the whole scope")
+    with read_session() as db:
+        assert db.query(FamilyProfile).count() == 1
@@ -0,0 +1,72 @@
+import os
+import time
+
+import reminder_audio
+from reminder_audio import ReminderAudioCache
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def _fake_server(monkeypatch):
+    calls = []
+
+    def post(url, json, headers, timeout):
+        calls.append(json["text"])
+        return FakeResponse(json["text"].encode("utf-8"))
+
+    monkeypatch.setattr(reminder_audio.requests, "post", post)
+    return calls
+
+
+def test_sync_renders_only_new_phrases(monkeypatch, tmp_path):
+    calls = _fake_server(monkeypatch)
+    cache = ReminderAudioCache("http://server", str(tmp_path / "reminders"))
+
+    phrases = ["It's time for art!", "Art is over in 5 minutes, let's clean up!"]
+    assert cache.sync(phrases) == 2
+    assert cache.sync(phrases) == 0
+
+    # Moving nap changes one phrase: one render, and the stale clip is dropped
+    moved = ["It's time for art!", "Art is over in 3 minutes, let's clean up!"]
+    assert cache.sync(moved) == 1
+    assert calls == phrases + [moved[1]]
+    assert cache.get(phrases[1]) is None
+    with open(cache.get(moved[1]), "rb") as f:
+        assert f.read() == moved[1].encode("utf-8")
+    assert len(os.listdir(tmp_path / "reminders")) == 2
+
+
+def test_background_refresh(monkeypatch, tmp_path):
+    _fake_server(monkeypatch)
+    phrases = ["It's time for lunch!"]
+    cache = ReminderAudioCache("http://server", str(tmp_path / "reminders"), phrases_source=lambda: phrases)
+    cache.start()
+    try:
+        deadline = time.time() + 2
+        while cache.get("It's time for lunch!") is None and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        cache.stop()
+    assert cache.get("It's time for lunch!") is not None
+
+
+def test_sync_leaves_clips_being_written(monkeypatch, tmp_path):
+    _fake_server(monkeypatch)
+    cache = ReminderAudioCache("http://server", str(tmp_path / "reminders"))
+    writing = cache.clip_path("Nap is over!") + reminder_audio.PART_SUFFIX  # render() is mid-write
+    left_over = cache.clip_path("Old phrase") + reminder_audio.PART_SUFFIX  # From a crash long ago
+    for path in (writing, left_over):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - reminder_audio.STALE_PART_SECONDS - 60
+    os.utime(left_over, (old, old))
+
+    cache.sync(["It's time for art!"])
+    assert os.path.exists(writing)
+    assert not os.path.exists(left_over)
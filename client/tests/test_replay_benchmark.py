@@ -0,0 +1,47 @@
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+import database.database
+from audio_io import WavFileSource, write_wav
+from benchmark_replay import FakeServer, run_replay, speech_fixture
+
+
+def test_wav_source_reads_like_a_microphone(tmp_path):
+    path = str(tmp_path / "fixture.wav")
+    write_wav(path, speech_fixture(lead=0.0, speech=0.1, tail=0.0), 16000)
+    source = WavFileSource.from_file(path, 16000)
+
+    with source.open() as stream:
+        data, overflowed = stream.read(1024)
+        assert data.shape == (1024, 1) and not overflowed
+        # Past the end of the recording a stream reads silence
+        stream.read(1024)
+        tail, _ = stream.read(1024)
+    assert not tail.any()
+    assert source.finished
+
+
+def test_replay_reports_stages_and_profile(db_engine, scoped, monkeypatch):
+    monkeypatch.setattr(database.database, "engine", db_engine)
+    monkeypatch.setattr(
+        database.database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    )
+    server = FakeServer().start()
+    try:
+        report = run_replay(speech_fixture(lead=0.1, speech=0.5), server.url, runs=1)
+    finally:
+        server.stop()
+
+    for stage in ("record", "context", "serialize", "upload", "download", "playback", "time_to_first_audio"):
+        assert stage in report["stages"]
+    assert report["stages"]["time_to_first_audio"] < report["stages"]["record"]
+    assert report["cpu"]["vad"]["calls"] == 1
+    assert report["cpu"]["serialize"]["calls"] == 1
+    assert report["memory"]["peak_bytes"] > 0
+
+    # One timed run plus the profiled run, each uploading the seeded context
+    assert len(server.uploads) == 2
+    body = server.uploads[0]["body"].decode("utf-8", "replace")
+    assert json.dumps("Emma")[1:-1] in body
+    assert server.uploads[0]["household"] == "default"
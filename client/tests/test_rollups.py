@@ -0,0 +1,58 @@
+from datetime import date, datetime
+
+from database import FamilyProfile, ActivityLog, ActivityRollup, DailyRollup
+from database import log_activities, rebuild_rollups, daily_summary, activity_summary
+
+
+def _family(db):
+    family = FamilyProfile(child_name="Emma", child_age=3)
+    db.add(family)
+    db.commit()
+    return family
+
+
+def test_rollups_follow_each_insert(db):
+    family = _family(db)
+    log_activities(db, [
+        {"activity_name": "nap", "start_time": "2025-05-16T13:00:00", "end_time": "2025-05-16T14:30:00"},
+        {"activity_name": "snack", "start_time": "2025-05-16T10:00:00", "end_time": "2025-05-16T10:15:00"},
+        {"activity_name": "snack", "start_time": "2025-05-16T15:30:00", "status": "skipped"},
+        {"activity_name": "snack", "start_time": "2025-05-17T10:00:00"},
+    ], family_id=family.id)
+    # A replay inserts nothing and must not count twice
+    log_activities(db, [
+        {"activity_name": "nap", "start_time": "2025-05-16T13:00:00", "end_time": "2025-05-16T14:30:00"},
+        {"activity_name": "walk", "start_time": "2025-05-16T16:00:00", "status": "in_progress"},
+    ], family_id=family.id)
+
+    summary = daily_summary(db, family.id, date(2025, 5, 16))
+    assert (summary["count"], summary["completed"], summary["skipped"], summary["in_progress"]) == (4, 2, 1, 1)
+    assert summary["total_minutes"] == 105.0
+    assert summary["completed_ratio"] == 0.5
+    assert summary["activities"]["snack"]["count"] == 2
+    assert summary["activities"]["snack"]["skipped_ratio"] == 0.5
+    assert daily_summary(db, family.id, date(2025, 5, 18)) is None
+
+    week = activity_summary(db, family.id, date(2025, 5, 12), date(2025, 5, 18))
+    assert week["snack"]["count"] == 3
+    assert week["nap"]["total_minutes"] == 90.0
+
+
+def test_rebuild_matches_incremental_rollups(db):
+    family = _family(db)
+    log_activities(db, [
+        {"activity_name": name, "start_time": datetime(2025, 5, day, hour), "status": status}
+        for day in (14, 15, 16)
+        for hour, name, status in ((7, "breakfast", "completed"), (13, "nap", "skipped"), (19, "bath", "completed"))
+    ], family_id=family.id)
+
+    def snapshot():
+        return sorted(
+            (row.day, row.activity_name, row.activity_count, row.completed_count, row.skipped_count)
+            for row in db.query(ActivityRollup)
+        ), sorted((row.day, row.activity_count) for row in db.query(DailyRollup))
+
+    incremental = snapshot()
+    assert rebuild_rollups(db) == db.query(ActivityLog).count() == 9
+    db.commit()
+    assert snapshot() == incremental
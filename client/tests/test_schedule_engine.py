@@ -0,0 +1,108 @@
+import threading
+from datetime import date, datetime, timedelta
+
+from schedule_engine import ScheduleEngine
+
+DAY = date(2025, 5, 16)
+SCHEDULE = {"lunch": "12:00", "art": "13:00", "nap": "13:30", "snack": "15:00"}
+
+
+def _engine(now, **kwargs):
+    engine = ScheduleEngine(now=lambda: now, **kwargs)
+    engine.load(SCHEDULE, day=DAY)
+    return engine
+
+
+def test_next_and_current_activity():
+    engine = _engine(datetime(2025, 5, 16, 7, 0))
+    at = datetime(2025, 5, 16, 13, 10)
+    assert engine.next_activity(at) == ("nap", "13:30")
+    assert engine.current_activity(at) == ("art", "13:00")
+    assert engine.next_activity(datetime(2025, 5, 16, 13, 0)) == ("art", "13:00")
+    assert engine.next_activity(datetime(2025, 5, 16, 16, 0)) is None
+
+
+def test_reminders_follow_the_timeline():
+    engine = _engine(datetime(2025, 5, 16, 12, 30))
+    texts = [(r.fire_at.strftime("%H:%M"), r.text) for r in engine.upcoming_reminders()]
+    assert ("12:55", "Lunch is over in 5 minutes, let's clean up!") in texts
+    assert ("13:25", "Art is over in 5 minutes, let's clean up!") in texts
+    assert ("13:00", "It's time for art!") in texts
+    # Reminders already in the past are not armed
+    assert all(r.fire_at >= datetime(2025, 5, 16, 12, 30) for r in engine.upcoming_reminders())
+
+
+def test_update_activity_rearms_affected_reminders():
+    engine = _engine(datetime(2025, 5, 16, 7, 0))
+    engine.update_activity("nap", "14:00")
+
+    assert engine.next_activity(datetime(2025, 5, 16, 13, 10)) == ("nap", "14:00")
+    reminders = {(r.kind, r.activity_name): r.fire_at.strftime("%H:%M") for r in engine.upcoming_reminders()}
+    assert reminders[("ending", "art")] == "13:55"
+    assert reminders[("start", "nap")] == "14:00"
+    assert len(engine.upcoming_reminders()) == 7
+
+
+def test_due_reminder_fires_without_polling():
+    # Shift the clock so the 13:00 "time for art" reminder is 50ms away
+    offset = datetime(2025, 5, 16, 13, 0) - timedelta(milliseconds=50) - datetime.now()
+    fired = []
+    done = threading.Event()
+
+    def on_reminder(reminder):
+        fired.append(reminder)
+        done.set()
+
+    engine = ScheduleEngine(on_reminder=on_reminder, now=lambda: datetime.now() + offset)
+    engine.load({"art": "13:00"}, day=DAY)
+    engine.start()
+    try:
+        assert done.wait(2)
+    finally:
+        engine.stop()
+    assert fired[0].text == "It's time for art!"
+    assert engine.upcoming_reminders() == []
+
+
+def test_reminders_roll_over_at_midnight():
+    # The clock is 50ms before midnight, so the worker must wake up on its own
+    offset = datetime(2025, 5, 17, 0, 0) - timedelta(milliseconds=50) - datetime.now()
+    new_days = []
+    done = threading.Event()
+
+    def on_new_day(day):
+        new_days.append(day)
+        done.set()
+
+    engine = ScheduleEngine(now=lambda: datetime.now() + offset, on_new_day=on_new_day)
+    engine.load(SCHEDULE, day=DAY)
+    assert engine.upcoming_reminders() == []  # The day is over
+    engine.start()
+    try:
+        assert done.wait(2)
+    finally:
+        engine.stop()
+    assert new_days == [date(2025, 5, 17)]
+    reminders = engine.upcoming_reminders()
+    assert len(reminders) == 7
+    assert {r.fire_at.date() for r in reminders} == {date(2025, 5, 17)}
+
+
+def test_rollover_to_a_day_without_a_schedule_stays_quiet():
+    offset = datetime(2025, 5, 17, 0, 0) - timedelta(milliseconds=50) - datetime.now()
+    done = threading.Event()
+
+    def on_new_day(day):
+        engine.load({}, day=day)  # What the assistant does when the day has no schedule
+        done.set()
+
+    engine = ScheduleEngine(now=lambda: datetime.now() + offset, on_new_day=on_new_day)
+    engine.load(SCHEDULE, day=DAY)
+    engine.start()
+    try:
+        assert done.wait(2)
+    finally:
+        engine.stop()
+    # Yesterday's timeline is not left armed for today
+    assert engine.upcoming_reminders() == []
+    assert engine.next_activity(datetime(2025, 5, 17, 11, 0)) is None
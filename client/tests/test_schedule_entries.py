@@ -0,0 +1,57 @@
+from datetime import datetime, time
+
+from database import FamilyProfile, DailyContext, ScheduleEntry
+from database import ensure_entries, get_activity_time, set_activity_time, next_activity, schedule_as_dict
+
+
+def _daily_context(db, schedule):
+    family = FamilyProfile(child_name="Emma", child_age=3)
+    db.add(family)
+    db.commit()
+    daily_context = DailyContext(family_id=family.id, date=datetime(2025, 5, 16), schedule=schedule)
+    db.add(daily_context)
+    db.commit()
+    return daily_context
+
+
+def test_ensure_entries_reads_every_schedule_shape(db):
+    daily_context = _daily_context(db, {
+        "wake_up": "07:00",
+        "nap": {"start_time": "13:00"},
+        "art": {"time": "15:00"},
+        "evening": {"5:30 PM": "Dinner", "7:30 PM": "Bedtime routine"},
+    })
+
+    assert ensure_entries(db, daily_context) is True
+    assert ensure_entries(db, daily_context) is False
+    assert schedule_as_dict(db, daily_context.id) == {
+        "wake_up": "07:00",
+        "nap": "13:00",
+        "art": "15:00",
+        "Dinner": "17:30",
+        "Bedtime routine": "19:30",
+    }
+
+
+def test_set_activity_time_updates_one_row(db):
+    daily_context = _daily_context(db, {"lunch": "12:00", "nap": "13:00"})
+    ensure_entries(db, daily_context)
+
+    assert set_activity_time(db, daily_context.id, "nap", "13:30") is True
+    assert set_activity_time(db, daily_context.id, "bath", "18:00") is False
+    db.commit()
+
+    assert get_activity_time(db, daily_context.id, "nap") == "13:30"
+    assert get_activity_time(db, daily_context.id, "lunch") == "12:00"
+    # The JSON blob is left alone
+    assert daily_context.schedule == {"lunch": "12:00", "nap": "13:00"}
+    assert db.query(ScheduleEntry).count() == 2
+
+
+def test_next_activity(db):
+    daily_context = _daily_context(db, {"breakfast": "07:30", "lunch": "12:00", "nap": "13:00"})
+    ensure_entries(db, daily_context)
+
+    assert next_activity(db, daily_context.id, time(11, 0)) == ("lunch", "12:00")
+    assert next_activity(db, daily_context.id, time(12, 0)) == ("lunch", "12:00")
+    assert next_activity(db, daily_context.id, time(13, 1)) is None
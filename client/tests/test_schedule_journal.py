@@ -0,0 +1,134 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import FamilyProfile, DailyContext, ScheduleChange
+from database import (
+    record_change,
+    current_schedule,
+    undo_last_change,
+    change_history,
+    adjustments_from_journal,
+    schedule_as_dict,
+    get_activity_time,
+    ensure_entries,
+    schedule_version,
+    retry_schedule_write,
+    ScheduleConflict,
+)
+from database.schedule import format_time, parse_time
+from database import schedule_journal
+
+
+def _daily_context(db, schedule):
+    family = FamilyProfile(child_name="Emma", child_age=3)
+    db.add(family)
+    db.commit()
+    daily_context = DailyContext(family_id=family.id, date=datetime(2025, 5, 16), schedule=schedule)
+    db.add(daily_context)
+    db.commit()
+    return daily_context
+
+
+def test_changes_are_appended_not_overwritten(db):
+    daily_context = _daily_context(db, {"lunch": "12:00", "nap": "13:00"})
+
+    record_change(db, daily_context, "nap", "13:30")
+    record_change(db, daily_context, "nap", "14:00")
+    assert record_change(db, daily_context, "bath", "18:00") is None
+    db.commit()
+
+    history = change_history(db, daily_context.id, "nap")
+    assert [(c["original_time"], c["new_time"]) for c in history] == [("13:00", "13:30"), ("13:30", "14:00")]
+    assert adjustments_from_journal(db, daily_context.id)["nap"]["original_time"] == "13:00"
+    # No snapshot yet: the blob is untouched and the tail carries the changes
+    assert daily_context.schedule == {"lunch": "12:00", "nap": "13:00"}
+    assert current_schedule(db, daily_context) == {"lunch": "12:00", "nap": "14:00"}
+
+
+def test_undo_last_change(db):
+    daily_context = _daily_context(db, {"lunch": "12:00", "nap": "13:00"})
+    record_change(db, daily_context, "lunch", "12:15")
+    record_change(db, daily_context, "nap", "13:30")
+    db.commit()
+
+    undo = undo_last_change(db, daily_context)
+    assert undo.source == "undo"
+    assert current_schedule(db, daily_context)["nap"] == "13:00"
+
+    # The next undo skips the already reverted change
+    undo_last_change(db, daily_context)
+    assert current_schedule(db, daily_context) == {"lunch": "12:00", "nap": "13:00"}
+    assert undo_last_change(db, daily_context) is None
+    assert db.query(ScheduleChange).count() == 4
+
+
+def test_snapshot_folds_journal_into_schedule(db, monkeypatch):
+    monkeypatch.setattr(schedule_journal, "SNAPSHOT_INTERVAL", 3)
+    daily_context = _daily_context(db, {"nap": {"start_time": "13:00"}})
+
+    for new_time in ("13:10", "13:20", "13:30"):
+        record_change(db, daily_context, "nap", new_time)
+    db.commit()
+    assert daily_context.schedule == {"nap": "13:30"}
+    assert daily_context.snapshot_change_id == db.query(ScheduleChange).order_by(ScheduleChange.id.desc()).first().id
+
+    record_change(db, daily_context, "nap", "13:40")
+    db.commit()
+    assert current_schedule(db, daily_context) == schedule_as_dict(db, daily_context.id) == {"nap": "13:40"}
+
+
+def test_stale_version_is_a_conflict(db):
+    daily_context = _daily_context(db, {"nap": "13:00"})
+    version = schedule_version(db, daily_context.id)
+    record_change(db, daily_context, "nap", "13:30")
+    db.commit()
+    assert schedule_version(db, daily_context.id) == version + 1
+
+    with pytest.raises(ScheduleConflict):
+        record_change(db, daily_context, "nap", "14:00", expected_version=version)
+    db.rollback()
+    assert current_schedule(db, daily_context) == {"nap": "13:30"}
+
+
+def test_concurrent_delays_are_not_lost(db, db_engine, monkeypatch):
+    monkeypatch.setattr(schedule_journal, "SCHEDULE_WRITE_ATTEMPTS", 50)
+    daily_context = _daily_context(db, {"nap": "13:00"})
+    ensure_entries(db, daily_context)
+    db.commit()
+    daily_context_id = daily_context.id
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    start = threading.Barrier(6)
+    errors = []
+
+    def delay_nap():
+        session = make_session()
+        try:
+            daily_context = session.get(DailyContext, daily_context_id)
+            start.wait(timeout=5)
+
+            def write(db):
+                # Read-modify-write: the new time depends on the current one
+                version = schedule_version(db, daily_context_id)
+                minute = parse_time(get_activity_time(db, daily_context_id, "nap"))
+                return record_change(db, daily_context, "nap", format_time(minute + 5), expected_version=version)
+
+            for _ in range(3):
+                retry_schedule_write(session, write)
+        except Exception as e:  # Surface failures from the worker threads
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=delay_nap) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert get_activity_time(db, daily_context_id, "nap") == "14:30"  # 18 delays of 5 minutes
+    assert schedule_version(db, daily_context_id) == 18
+    assert db.query(ScheduleChange).count() == 18
@@ -0,0 +1,156 @@
+from datetime import datetime
+
+import schedule_sync
+from database import FamilyProfile, DailyContext, ScheduleChange, ScheduleEntry, session_scope, undo_last_change, record_change
+from database import ScheduleConflict
+from database import current_schedule
+from schedule_sync import ScheduleSync
+
+TODAY = datetime.now().date().isoformat()
+
+
+class FakeResponse:
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeServer:
+    """The household store's sync API over a list of (seq, change)."""
+
+    def __init__(self):
+        self.log = []
+        self.pushed = []
+
+    def add(self, day, activity_name, time):
+        self.log.append({"day": day, "activity_name": activity_name, "time": time, "seq": len(self.log) + 1})
+
+    def sync(self, since):
+        changes = [change for change in self.log if change["seq"] > since]
+        return {"changes": changes, "cursor": changes[-1]["seq"] if changes else since, "more": False}
+
+    def get(self, url, params, headers, timeout):
+        assert url.endswith("/schedule/sync")
+        return FakeResponse({**self.sync(params["since"]), "has_day": any(c["day"] == params["day"] for c in self.log)})
+
+    def latest(self, day, activity_name):
+        return next((c for c in reversed(self.log) if (c["day"], c["activity_name"]) == (day, activity_name)), None)
+
+    def post(self, url, json, headers, timeout):
+        assert url.endswith("/schedule/changes")
+        self.pushed.extend(json["changes"])
+        applied, conflicts = [], []
+        for change in json["changes"]:
+            latest = self.latest(change["day"], change["activity_name"])
+            if change.get("base_seq") is not None and latest and latest["seq"] > change["base_seq"]:
+                conflicts.append(latest)
+                continue
+            self.add(change["day"], change["activity_name"], change["time"])
+            applied.append(self.log[-1])
+        return FakeResponse({"applied": applied, "conflicts": conflicts, "cursor": len(self.log),
+                             "sync": self.sync(json["since"])})
+
+
+def _today(db):
+    family = FamilyProfile(child_name="Emma", child_age=3)
+    db.add(family)
+    db.commit()
+    daily_context = DailyContext(family_id=family.id, date=datetime.now(), schedule={"lunch": "12:00", "nap": "13:00"})
+    db.add(daily_context)
+    db.commit()
+    return daily_context
+
+
+def _fake_server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(schedule_sync.requests, "get", server.get)
+    monkeypatch.setattr(schedule_sync.requests, "post", server.post)
+    return server
+
+
+def test_pull_replays_other_devices_changes(scoped, db, monkeypatch):
+    daily_context = _today(db)
+    server = _fake_server(monkeypatch)
+    server.add(TODAY, "lunch", "12:00")  # Seeded from this device: nothing to do
+    server.add(TODAY, "nap", "13:30")
+    server.add(TODAY, "swim", "16:00")  # Added on another device
+    server.add("2020-01-01", "nap", "14:00")  # A day this device doesn't have
+    changed = []
+    sync = ScheduleSync("http://server", on_change=lambda name, time: changed.append((name, time)))
+
+    assert not sync.has_day(datetime.now().date())
+    assert sync.pull() == 2
+    assert changed == [("nap", "13:30"), ("swim", "16:00")]
+    assert sync.has_day(datetime.now().date())
+    db.expire_all()
+    assert current_schedule(db, daily_context)["nap"] == "13:30"
+    assert db.query(ScheduleChange).filter_by(source="sync").count() == 1
+
+    # The cursor is stored, so the next pull gets nothing
+    assert ScheduleSync("http://server").pull() == 0
+
+
+def test_push_sends_only_local_changes(scoped, db, monkeypatch):
+    daily_context = _today(db)
+    server = _fake_server(monkeypatch)
+    sync = ScheduleSync("http://server")
+
+    with session_scope() as session:
+        context = session.get(DailyContext, daily_context.id)
+        record_change(session, context, "nap", "13:45")  # From a voice command: already on the server
+        session.commit()
+        undo_last_change(session, context)
+
+    assert sync.push() == 1
+    assert server.pushed == [{"day": TODAY, "activity_name": "nap", "time": "13:00", "source": "undo", "base_seq": None}]
+    assert sync.push() == 0
+
+
+def test_push_keeps_the_server_time_on_conflict(scoped, db, monkeypatch):
+    daily_context = _today(db)
+    server = _fake_server(monkeypatch)
+    server.add(TODAY, "nap", "13:00")
+    sync = ScheduleSync("http://server")
+    assert sync.pull() == 0  # This device has seen nap at seq 1
+
+    server.add(TODAY, "nap", "14:00")  # Another device moves it; this one hasn't pulled yet
+    with session_scope() as session:
+        context = session.get(DailyContext, daily_context.id)
+        record_change(session, context, "nap", "13:15", source="manual")
+        record_change(session, context, "lunch", "12:30", source="manual")
+        session.commit()
+
+    assert sync.push() == 1  # Lunch; nap conflicts
+    assert [(c["activity_name"], c["base_seq"]) for c in server.pushed] == [("nap", 1), ("lunch", None)]
+    db.expire_all()
+    assert current_schedule(db, daily_context)["nap"] == "14:00"
+    assert current_schedule(db, daily_context)["lunch"] == "12:30"
+    assert sync.push() == 0
+
+
+def test_seen_seqs_survive_a_write_conflict_in_the_same_batch(scoped, db, monkeypatch):
+    daily_context = _today(db)
+    server = _fake_server(monkeypatch)
+    server.add(TODAY, "lunch", "12:15")
+    server.add(TODAY, "nap", "13:30")
+    conflicts = []
+
+    def record_change_once_conflicting(session, context, activity_name, *args, **kwargs):
+        if activity_name == "nap" and not conflicts:  # Another writer got to the day first
+            conflicts.append(activity_name)
+            raise ScheduleConflict("changed meanwhile")
+        return record_change(session, context, activity_name, *args, **kwargs)
+
+    monkeypatch.setattr(schedule_sync, "record_change", record_change_once_conflicting)
+    assert ScheduleSync("http://server").pull() == 2
+    assert conflicts == ["nap"]
+    db.expire_all()
+    seqs = {entry.activity_name: entry.server_seq for entry in db.query(ScheduleEntry)}
+    assert seqs == {"lunch": 1, "nap": 2}
@@ -1,4 +1,4 @@
-from database import init_db, get_db, FamilyProfile, DailyContext, ActivityLog
+from database import init_db, get_db, FamilyProfile, DailyContext, ActivityLog, log_activities
 from datetime import datetime, timedelta
 import json
 
@@ -60,38 +60,30 @@ def setup_test_data():
 
         # Create some activity logs
         activities = [
-            ActivityLog(
-                family_id=family.id,
-                daily_context_id=daily_context.id,
-                activity_name="Breakfast",
-                start_time=today.replace(hour=7, minute=30),
-                end_time=today.replace(hour=8, minute=0),
-                notes="Ate cereal and fruit, drank milk",
-                status="completed"
-            ),
-            ActivityLog(
-                family_id=family.id,
-                daily_context_id=daily_context.id,
-                activity_name="Learning activities",
-                start_time=today.replace(hour=8, minute=30),
-                end_time=today.replace(hour=9, minute=30),
-                notes="Practiced counting and colors",
-                status="completed"
-            ),
-            ActivityLog(
-                family_id=family.id,
-                daily_context_id=daily_context.id,
-                activity_name="Creative play",
-                start_time=today.replace(hour=3, minute=0),
-                end_time=None,
-                notes="Started painting with purple paint",
-                status="in_progress"
-            )
+            {
+                "activity_name": "Breakfast",
+                "start_time": today.replace(hour=7, minute=30),
+                "end_time": today.replace(hour=8, minute=0),
+                "notes": "Ate cereal and fruit, drank milk",
+                "status": "completed"
+            },
+            {
+                "activity_name": "Learning activities",
+                "start_time": today.replace(hour=8, minute=30),
+                "end_time": today.replace(hour=9, minute=30),
+                "notes": "Practiced counting and colors",
+                "status": "completed"
+            },
+            {
+                "activity_name": "Creative play",
+                "start_time": today.replace(hour=3, minute=0),
+                "end_time": None,
+                "notes": "Started painting with purple paint",
+                "status": "in_progress"
+            }
         ]
         
-        for activity in activities:
-            db.add(activity)
-        db.commit()
+        log_activities(db, activities, family_id=family.id, daily_context_id=daily_context.id)
         print("✅ Activity logs created")
 
         # Verify the data
@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from database import FamilyProfile, log_activities
+from database import load_activity_arrays, weekly_totals, week_over_week, rolling_average
+from database import weekly_trends, describe_trends
+
+
+def _family(db, name="Emma"):
+    family = FamilyProfile(child_name=name, child_age=3)
+    db.add(family)
+    db.commit()
+    return family
+
+
+def _outdoor(day, minutes):
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=10)
+    return {"activity_name": "park", "start_time": start, "end_time": start + timedelta(minutes=minutes)}
+
+
+def test_weekly_totals_per_family_and_category(db):
+    emma, leo = _family(db), _family(db, "Leo")
+    monday = date(2025, 5, 5)
+    log_activities(db, [
+        _outdoor(monday, 60),
+        _outdoor(monday + timedelta(days=8), 30),
+        {"activity_name": "nap", "start_time": datetime(2025, 5, 6, 13), "end_time": datetime(2025, 5, 6, 14, 30)},
+        {"activity_name": "violin", "start_time": datetime(2025, 5, 7, 16), "status": "skipped"},
+    ], family_id=emma.id)
+    log_activities(db, [_outdoor(monday + timedelta(days=1), 45)], family_id=leo.id)
+
+    arrays = load_activity_arrays(db, monday, monday + timedelta(weeks=2))
+    assert list(arrays.family_ids) == [emma.id, leo.id]
+    minutes, counts = weekly_totals(arrays, monday + timedelta(days=3), weeks=2)  # Any day picks its Monday
+    # Categories: sleep, meals, outdoor, play, care, other
+    assert minutes[0, :, 2].tolist() == [60.0, 30.0]
+    assert minutes[0, 0, 0] == 90.0
+    assert counts[0, 0, 5] == 1 and minutes[0, 0, 5] == 0.0
+    assert minutes[1, :, 2].tolist() == [45.0, 0.0]
+
+
+def test_change_and_rolling_average():
+    values = np.array([[[100.0], [50.0], [0.0], [60.0]]])
+    change = week_over_week(values)
+    assert np.isnan(change[0, 0, 0]) and np.isnan(change[0, 3, 0])  # No previous week, or a zero one
+    assert change[0, 1:3, 0].tolist() == [-50.0, -100.0]
+    assert rolling_average(values, window=2)[0, :, 0].tolist() == [100.0, 75.0, 25.0, 30.0]
+
+
+def test_weekly_trends_report(db):
+    family = _family(db)
+    today = date(2025, 5, 14)
+    log_activities(db, [_outdoor(date(2025, 5, 6), 100), _outdoor(date(2025, 5, 9), 60), _outdoor(date(2025, 5, 13), 88)],
+                   family_id=family.id)
+
+    # Wednesday: Monday to Wednesday against the same days of last week, not its Friday too
+    report = weekly_trends(db, family.id, weeks=3, today=today)
+    assert report["weeks"] == ["2025-04-28", "2025-05-05", "2025-05-12"]
+    assert report["categories"]["outdoor"]["minutes"] == [0.0, 160.0, 88.0]
+    assert report["categories"]["outdoor"]["change_pct"] == [None, None, -12.0]
+    assert describe_trends(report) == ["12% less outdoor time this week"]
+
+    # On Sunday the week is complete
+    sunday = weekly_trends(db, family.id, weeks=3, today=date(2025, 5, 18))
+    assert sunday["categories"]["outdoor"]["change_pct"] == [None, None, -45.0]
+
+    assert weekly_trends(db, family.id + 1, weeks=2, today=today)["categories"]["outdoor"]["minutes"] == [0.0, 0.0]
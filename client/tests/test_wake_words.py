@@ -0,0 +1,36 @@
+from openwakeword_assistant import OpenVoiceAssistant
+
+
+class SilentSink:
+    def play(self, data, samplerate):
+        pass
+
+
+def assistant_with(wake_words):
+    assistant = OpenVoiceAssistant(audio_source=object(), audio_sink=SilentSink())
+    assistant.wake_words = wake_words
+    assistant.wake_word_keys = {f"{name}_v0.1": name for name in wake_words}
+    return assistant
+
+
+def test_each_wake_word_has_its_own_threshold_and_cooldown():
+    assistant = assistant_with({
+        "hey_jarvis": {"threshold": 0.6, "cooldown": 2.0},
+        "hey_mycroft": {"threshold": 0.3, "cooldown": 5.0},
+    })
+
+    assert assistant.detect_wake_word({"hey_jarvis_v0.1": 0.5, "hey_mycroft_v0.1": 0.2}, now=100.0) is None
+    # Both fire: the one further above its own threshold wins
+    assert assistant.detect_wake_word({"hey_jarvis_v0.1": 0.7, "hey_mycroft_v0.1": 0.9}, now=100.0) == "hey_mycroft"
+    # hey_mycroft is cooling down, hey_jarvis is not
+    assert assistant.detect_wake_word({"hey_jarvis_v0.1": 0.7, "hey_mycroft_v0.1": 0.9}, now=101.0) == "hey_jarvis"
+    assert assistant.detect_wake_word({"hey_jarvis_v0.1": 0.7, "hey_mycroft_v0.1": 0.9}, now=102.0) is None
+    assert assistant.detect_wake_word({"hey_mycroft_v0.1": 0.9}, now=105.5) == "hey_mycroft"
+
+
+def test_detected_wake_word_is_sent_as_a_speaker_hint():
+    assistant = assistant_with({"hey_jarvis": {"threshold": 0.6, "cooldown": 2.0}})
+    assert "X-Wake-Word" not in assistant.question_headers()
+    headers = assistant.question_headers("hey_jarvis")
+    assert headers["X-Wake-Word"] == "hey_jarvis"
+    assert headers["X-Household-ID"] == assistant.server_headers["X-Household-ID"]
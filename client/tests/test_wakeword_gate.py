@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from wakeword_gate import EnergyGate
+
+FRAME = 1280
+RATE = 16000
+
+
+def frame(level, seed=0):
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal(FRAME)).astype(np.int16)
+
+
+def test_quiet_frames_are_skipped_and_replayed_when_sound_starts():
+    gate = EnergyGate(FRAME, RATE, min_rms=40, lookback_seconds=0.24, hangover_seconds=0.16)
+    quiet = [frame(5, seed) for seed in range(5)]
+    assert all(gate.process(f) == [] for f in quiet)
+
+    loud = frame(1000, 99)
+    # The last 0.24 s (3 frames) of quiet come first, then the loud frame
+    assert gate.process(loud) == [*quiet[-3:], loud]
+
+    # Open for the hangover after the last loud frame, then closed again
+    assert gate.process(quiet[0]) == [quiet[0]]
+    assert gate.process(quiet[1]) == [quiet[1]]
+    assert gate.process(quiet[2]) == []
+    assert gate.inferred == 6 and gate.frames == 9
+
+
+def test_gated_model_scores_match_ungated_once_open():
+    pytest.importorskip("openwakeword")
+    from config import WAKE_WORD, WAKEWORD_MODEL_DIR
+    from wakeword_models import load_model, model_key
+
+    try:
+        gated_model = load_model([WAKE_WORD], WAKEWORD_MODEL_DIR)
+        always_model = load_model([WAKE_WORD], WAKEWORD_MODEL_DIR)
+    except Exception as e:  # No cached models and no network
+        pytest.skip(f"wake word models unavailable: {e}")
+    key = model_key(WAKE_WORD)
+
+    t = np.arange(FRAME * 60) / RATE
+    audio = 10 * np.random.default_rng(1).standard_normal(len(t))
+    audio[FRAME * 30:] += 4000 * np.sin(2 * np.pi * 220 * t[FRAME * 30:]) * np.sin(2 * np.pi * 3 * t[FRAME * 30:])
+    frames = [audio[i:i + FRAME].astype(np.int16) for i in range(0, len(audio), FRAME)]
+
+    gate = EnergyGate(FRAME, RATE, min_rms=40, lookback_seconds=2.0)
+    for i, f in enumerate(frames):
+        expected = always_model.predict(f)[key]
+        heard = gate.process(f)
+        if heard:
+            assert i >= 30
+            assert [gated_model.predict(h)[key] for h in heard][-1] == expected
+            # The classifier sees exactly the features it would have without the gate
+            assert np.array_equal(gated_model.preprocessor.get_features(16), always_model.preprocessor.get_features(16))
+    assert gate.inferred < len(frames)
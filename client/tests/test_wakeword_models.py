@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import wakeword_models
+from wakeword_models import ModelCache, load_model, session_options
+
+FILES = {
+    "melspectrogram.onnx": "https://models.test/melspectrogram.onnx",
+    "quintilian_test_wakeword.onnx": "https://models.test/quintilian_test_wakeword.onnx",
+}
+# What the fake downloads serve by default
+CHECKSUMS = {filename: hashlib.sha256(url.encode("utf-8")).hexdigest() for filename, url in FILES.items()}
+
+
+@pytest.fixture(autouse=True)
+def no_installed_copies(monkeypatch):
+    monkeypatch.setattr(wakeword_models, "_installed_copy", lambda filename: None)
+
+
+class FakeDownloads:
+    def __init__(self):
+        self.calls = []
+        self.content = {}
+
+    def __call__(self, url, directory):
+        self.calls.append(url)
+        path = os.path.join(directory, ".download-test")
+        with open(path, "wb") as f:
+            f.write(self.content.get(url, url.encode("utf-8")))
+        return path
+
+
+def test_intact_cache_never_downloads(tmp_path):
+    download = FakeDownloads()
+    cache = ModelCache(str(tmp_path), download=download, checksums=CHECKSUMS)
+
+    paths = cache.ensure(FILES)
+    assert sorted(download.calls) == sorted(FILES.values())
+    assert all(os.path.exists(path) for path in paths.values())
+    with open(tmp_path / "manifest.json") as f:
+        assert set(json.load(f)) == set(FILES)
+
+    assert cache.ensure(FILES) == paths
+    assert len(download.calls) == len(FILES)
+
+
+def test_corrupted_file_is_fetched_again_and_verified(tmp_path):
+    download = FakeDownloads()
+    cache = ModelCache(str(tmp_path), download=download, checksums=CHECKSUMS)
+    cache.ensure(FILES)
+
+    (tmp_path / "melspectrogram.onnx").write_bytes(b"truncated")
+    cache.ensure(FILES)
+    assert download.calls[-1] == FILES["melspectrogram.onnx"]
+    assert (tmp_path / "melspectrogram.onnx").read_bytes() == FILES["melspectrogram.onnx"].encode("utf-8")
+
+    # A replacement that doesn't match the recorded checksum is refused
+    (tmp_path / "melspectrogram.onnx").write_bytes(b"truncated")
+    download.content[FILES["melspectrogram.onnx"]] = b"something else"
+    with pytest.raises(ValueError):
+        cache.ensure(FILES)
+    assert not (tmp_path / "melspectrogram.onnx").exists()
+
+
+def test_downloads_must_match_the_shipped_checksums(tmp_path):
+    download = FakeDownloads()
+    download.content[FILES["melspectrogram.onnx"]] = b"tampered"
+    cache = ModelCache(str(tmp_path), download=download, checksums=CHECKSUMS)
+    with pytest.raises(ValueError, match="expected checksum"):
+        cache.ensure(FILES)  # Even on a fresh cache
+    assert not (tmp_path / "melspectrogram.onnx").exists()
+
+    # Nothing to check a model against: not downloaded, unless placed by hand
+    unknown = {"custom.onnx": "https://models.test/custom.onnx"}
+    with pytest.raises(ValueError, match="No known checksum"):
+        cache.ensure(unknown)
+    assert download.calls == [FILES["melspectrogram.onnx"]]
+    (tmp_path / "custom.onnx").write_bytes(b"trained at home")
+    assert cache.ensure(unknown) == {"custom.onnx": str(tmp_path / "custom.onnx")}
+
+
+def test_shipped_checksums_cover_the_configured_wake_words():
+    pytest.importorskip("openwakeword")
+    from config import WAKE_WORDS
+
+    assert set(wakeword_models.model_urls(WAKE_WORDS)) <= set(wakeword_models.MODEL_CHECKSUMS)
+
+
+def test_session_options_follow_settings():
+    ort = pytest.importorskip("onnxruntime")
+    options = session_options({"intra_op_threads": 2, "graph_optimization": "basic", "spinning": True})
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 1
+    assert options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert options.execution_mode == ort.ExecutionMode.ORT_SEQUENTIAL
+    assert options.get_session_config_entry("session.intra_op.allow_spinning") == "1"
+
+    with pytest.raises(ValueError):
+        session_options({"graph_optimization": "fast"})
+    with pytest.raises(ValueError):
+        load_model([], "unused", session={"quantized": ["classifier"]})
+
+
+def test_quantized_copy_is_made_once_per_source(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    ort = pytest.importorskip("onnxruntime")
+    import numpy as np
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = numpy_helper.from_array(np.random.default_rng(0).standard_normal((64, 8)).astype(np.float32), "w")
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "w"], ["y"])], "tiny",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1, 64])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [1, 8])],
+        [weights],
+    )
+    source = tmp_path / "tiny.onnx"
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(source))
+    cache = ModelCache(str(tmp_path), download=FakeDownloads())
+    cache.ensure({"tiny.onnx": "https://models.test/tiny.onnx"})
+
+    path = cache.quantized("tiny.onnx")
+    assert os.path.basename(path).startswith("tiny.int8-")
+    assert cache.quantized("tiny.onnx") == path
+    x = np.ones((1, 64), dtype=np.float32)
+    full = ort.InferenceSession(str(source), providers=["CPUExecutionProvider"]).run(None, {"x": x})[0]
+    int8 = ort.InferenceSession(path, providers=["CPUExecutionProvider"]).run(None, {"x": x})[0]
+    assert np.allclose(full, int8, atol=0.5)
+
+
+def test_assistant_import_defers_question_time_dependencies():
+    client_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "import sys, openwakeword_assistant; "
+        "print(sorted(m for m in ('openwakeword', 'requests', 'soundfile', 'sqlalchemy') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=client_dir, capture_output=True, text=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_load_model_tunes_the_sessions(tmp_path, monkeypatch):
+    ort = pytest.importorskip("onnxruntime")
+    pytest.importorskip("openwakeword")
+    import numpy as np
+
+    monkeypatch.undo()  # Copy the models from the openWakeWord install; no network
+    if not wakeword_models._installed_copy("melspectrogram.onnx"):
+        pytest.skip("openWakeWord's models are not installed")
+    settings = {"intra_op_threads": 2, "graph_optimization": "basic"}
+
+    model = load_model(["hey_jarvis"], str(tmp_path), session=settings)
+    features = model.preprocessor.melspec_model.get_session_options()
+    assert features.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert features.intra_op_num_threads == 2
+    assert set(model.predict(np.zeros(1280, dtype=np.int16))) == {"hey_jarvis_v0.1"}
+
+    # An openWakeWord release the patch wasn't written for keeps its own sessions
+    monkeypatch.setattr(wakeword_models, "PATCHED_VERSIONS", ())
+    model = load_model(["hey_jarvis"], str(tmp_path), session=settings)
+    features = model.preprocessor.melspec_model.get_session_options()
+    assert features.graph_optimization_level != ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert features.intra_op_num_threads == 2  # Passed to the constructor as ncpu
+    assert set(model.predict(np.zeros(1280, dtype=np.int16))) == {"hey_jarvis_v0.1"}
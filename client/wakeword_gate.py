@@ -0,0 +1,64 @@
+"""
+Energy gate in front of the wake word model.
+
+Most of the day the microphone hears a quiet room, and running openWakeWord
+on every frame of it keeps a core busy for nothing. ``EnergyGate`` checks
+each frame's RMS level, which is far cheaper than the model, and only lets
+audio through while there is sound.
+
+Detection is unchanged because of the lookback buffer. While the gate is
+closed it keeps the last ``lookback_seconds`` of frames. When a frame
+crosses the threshold, the gate hands back the lookback frames followed by
+the new one. Feed them to the model one at a time; a single concatenated
+call computes slightly different melspectrograms. With a lookback at least
+as long as the model's context (about 2 s for the pre-trained models:
+melspectrogram window plus 16 embeddings), the model's buffers then hold
+exactly what they would have held if it had run all along. The gate stays open for ``hangover_seconds`` after the last loud
+frame, so the model also hears the quiet tail of a phrase.
+"""
+from collections import deque
+
+import numpy as np
+
+
+def rms(frame):
+    """Root-mean-square level of a frame of int16 samples."""
+    samples = np.asarray(frame, dtype=np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class EnergyGate:
+    def __init__(self, frame_samples, rate, min_rms=40.0, lookback_seconds=2.0, hangover_seconds=1.0):
+        self.min_rms = min_rms
+        frame_seconds = frame_samples / rate
+        self.lookback = deque(maxlen=max(1, int(np.ceil(lookback_seconds / frame_seconds))))
+        self.hangover_frames = max(1, int(np.ceil(hangover_seconds / frame_seconds)))
+        self.open = False
+        self.remaining = 0
+        self.frames = 0
+        self.inferred = 0
+
+    def process(self, frame):
+        """Return the frames to run the model on, in order; empty while the room is quiet."""
+        self.frames += 1
+        loud = rms(frame) >= self.min_rms
+        if self.open:
+            self.remaining = self.hangover_frames if loud else self.remaining - 1
+            if self.remaining <= 0:
+                self.open = False
+            self.inferred += 1
+            return [frame]
+        if not loud:
+            self.lookback.append(frame)
+            return []
+        self.open = True
+        self.remaining = self.hangover_frames
+        frames = [*self.lookback, frame]
+        self.lookback.clear()
+        self.inferred += len(frames)
+        return frames
+
+    @property
+    def duty_cycle(self):
+        """Model runs per frame heard (lookback frames count when they are replayed)."""
+        return self.inferred / self.frames if self.frames else 0.0
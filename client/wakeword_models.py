@@ -0,0 +1,281 @@
+"""
+Local, checksum-verified cache of the openWakeWord ONNX models.
+
+``openwakeword.utils.download_models()`` checks (and on a fresh install
+downloads) every pre-trained model in both formats on each start. This
+keeps only the files the assistant needs in one directory:
+
+* the melspectrogram and embedding feature models
+* one classifier per wake word
+
+Every file fetched must match the SHA-256 shipped in ``MODEL_CHECKSUMS``
+(openWakeWord's v0.5.1 release files), and ``manifest.json`` records the
+checksum of each cached file. A start with an intact cache reads and
+hashes a few MB and never touches the network. A missing or corrupted
+file is copied from openWakeWord's own resources directory if an older
+install left it there, or downloaded again, and is checked before use. A
+model with no shipped checksum is only used if placed in the directory by
+hand.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+# SHA-256 of each model file the cache may fetch (openWakeWord v0.5.1 release assets)
+MODEL_CHECKSUMS = {
+    "melspectrogram.onnx": "ba2b0e0f8b7b875369a2c89cb13360ff53bac436f2895cced9f479fa65eb176f",
+    "embedding_model.onnx": "ba754db3cd768a524c655ea90655ee5e6055a43b8dfd29366a11e93716ae9e51",
+    "alexa_v0.1.onnx": "6ff566a01d12670e8d9e3c59da32651db1575d17272a601b7f8a39283dfbae3e",
+    "hey_jarvis_v0.1.onnx": "94a13cfe60075b132f6a472e7e462e8123ee70861bc3fb58434a73712ee0d2cb",
+    "hey_mycroft_v0.1.onnx": "785bdf5655863ae47553b23793aa108c7b0152d4823f7869b41f2d2d765912fc",
+    "timer_v0.1.onnx": "371e44535470a29248b3b8f1bbbbaf2525c86417fd8f75c67fcf02ae0b9626df",
+    "weather_v0.1.onnx": "8441da8e746899e8d969528d5bad5651cdd563079c05962788f77753041f60e7",
+}
+
+# ONNX Runtime settings for all three models; config.WAKEWORD_ONNX overrides these
+DEFAULT_SESSION = {
+    "intra_op_threads": 1,
+    "inter_op_threads": 1,
+    "graph_optimization": "all",  # disable, basic, extended or all
+    "execution_mode": "sequential",  # sequential or parallel
+    "spinning": False,  # Busy-wait worker threads between frames (lower latency, more idle CPU)
+    "quantized": [],  # Run int8 copies of any of: melspectrogram, embedding, wakeword
+}
+
+GRAPH_OPTIMIZATION = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+EXECUTION_MODE = {"sequential": "ORT_SEQUENTIAL", "parallel": "ORT_PARALLEL"}
+QUANTIZABLE = {"melspectrogram", "embedding", "wakeword"}
+
+# openWakeWord releases whose private attributes load_model() replaces; requirements.txt pins one
+PATCHED_VERSIONS = ("0.6.0",)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _onnx_url(tflite_url):
+    return tflite_url.replace(".tflite", ".onnx")
+
+
+def model_urls(wake_words):
+    """Map each ONNX file the assistant needs to its download URL."""
+    import openwakeword
+
+    urls = [_onnx_url(model["download_url"]) for model in openwakeword.FEATURE_MODELS.values()]
+    for wake_word in wake_words:
+        if wake_word not in openwakeword.MODELS:
+            raise ValueError(f"Unknown wake word model: {wake_word}")
+        urls.append(_onnx_url(openwakeword.MODELS[wake_word]["download_url"]))
+    return {url.rsplit("/", 1)[-1]: url for url in urls}
+
+
+def model_key(wake_word):
+    """The name openWakeWord reports predictions under for a cached model."""
+    import openwakeword
+
+    filename = openwakeword.MODELS[wake_word]["download_url"].rsplit("/", 1)[-1]
+    return os.path.splitext(filename)[0]
+
+
+def session_options(settings=None):
+    """Translate session settings (see DEFAULT_SESSION) into onnxruntime.SessionOptions."""
+    import onnxruntime as ort
+
+    settings = {**DEFAULT_SESSION, **(settings or {})}
+    if settings["graph_optimization"] not in GRAPH_OPTIMIZATION:
+        raise ValueError(f"Unknown graph_optimization: {settings['graph_optimization']}")
+    if settings["execution_mode"] not in EXECUTION_MODE:
+        raise ValueError(f"Unknown execution_mode: {settings['execution_mode']}")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = settings["intra_op_threads"]
+    options.inter_op_num_threads = settings["inter_op_threads"]
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION[settings["graph_optimization"]])
+    options.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODE[settings["execution_mode"]])
+    spinning = "1" if settings["spinning"] else "0"
+    options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+    return options
+
+
+def _download(url, directory):
+    import requests
+
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".download-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(response.content)
+    return tmp_path
+
+
+def _installed_copy(filename):
+    """The copy an older download_models() call left in openWakeWord's package, if any."""
+    import openwakeword
+
+    path = os.path.join(os.path.dirname(openwakeword.__file__), "resources", "models", filename)
+    return path if os.path.exists(path) else None
+
+
+class ModelCache:
+    def __init__(self, directory, download=_download, checksums=None):
+        self.directory = directory
+        self.download = download
+        self.checksums = MODEL_CHECKSUMS if checksums is None else checksums
+        self.manifest_path = os.path.join(directory, MANIFEST)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".manifest-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _fetch(self, filename, url):
+        installed = _installed_copy(filename)
+        if installed:
+            logger.info(f"Copying {filename} from the openWakeWord install")
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".copy-")
+            os.close(fd)
+            shutil.copyfile(installed, tmp_path)
+        else:
+            logger.info(f"Downloading {filename}")
+            tmp_path = self.download(url, self.directory)
+        os.replace(tmp_path, os.path.join(self.directory, filename))
+
+    def ensure(self, files):
+        """Make sure every file in {filename: url} is cached and intact; returns {filename: path}."""
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self._load_manifest()
+        changed = False
+        paths = {}
+        for filename, url in files.items():
+            path = os.path.join(self.directory, filename)
+            expected = self.checksums.get(filename) or manifest.get(filename)
+            if os.path.exists(path):
+                if expected and _sha256(path) == expected:
+                    paths[filename] = path
+                    continue
+                if expected:
+                    logger.warning(f"Cached model {filename} failed its checksum, fetching it again")
+                    self._fetch(filename, url)
+                # else: placed by hand, trust it from now on
+            elif expected:
+                self._fetch(filename, url)
+            else:
+                raise ValueError(f"No known checksum for {filename}; add its SHA-256 to MODEL_CHECKSUMS "
+                                 f"or place the file in {self.directory} by hand")
+            checksum = _sha256(path)
+            if expected and checksum != expected:
+                os.remove(path)
+                raise ValueError(f"{filename} from {url} does not match its expected checksum")
+            manifest[filename] = checksum
+            changed = True
+            paths[filename] = path
+        if changed:
+            self._save_manifest(manifest)
+        return paths
+
+    def quantized(self, filename):
+        """Path to a dynamic int8 copy of a cached model, made on first use.
+
+        The copy is named after the source checksum, so it is remade if the
+        source ever changes.
+        """
+        checksum = self._load_manifest()[filename]
+        target = os.path.join(self.directory, f"{os.path.splitext(filename)[0]}.int8-{checksum[:12]}.onnx")
+        if os.path.exists(target):
+            return target
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ValueError("Quantized wake word models need the onnx package: pip install onnx")
+        logger.info(f"Quantizing {filename} to int8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".quantize-", suffix=".onnx")
+        os.close(fd)
+        quantize_dynamic(os.path.join(self.directory, filename), tmp_path, weight_type=QuantType.QUInt8)
+        os.replace(tmp_path, target)
+        return target
+
+
+def _session(path, options):
+    import onnxruntime as ort
+
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def load_model(wake_words, directory, session=None, cache=None):
+    """Build an openWakeWord Model from the local cache with tuned ONNX sessions.
+
+    Model() only takes model paths and a thread count (``ncpu``), so the
+    feature models' quantized copies go in as paths and
+    ``intra_op_threads`` as ``ncpu``. The other ``session`` settings (see
+    DEFAULT_SESSION) have no constructor argument. For the releases in
+    PATCHED_VERSIONS the sessions openWakeWord built are swapped for tuned
+    ones through its private attributes: ``preprocessor.melspec_model``
+    and ``embedding_model`` (its predict lambdas read them on every call),
+    ``models`` and ``model_prediction_function`` (bound to the old
+    sessions). Any other release keeps its own sessions, with a warning.
+    """
+    from importlib.metadata import version
+    from openwakeword.model import Model
+
+    settings = {**DEFAULT_SESSION, **(session or {})}
+    unknown = set(settings["quantized"]) - QUANTIZABLE
+    if unknown:
+        raise ValueError(f"Unknown models to quantize: {sorted(unknown)} (choose from {sorted(QUANTIZABLE)})")
+
+    cache = cache or ModelCache(directory)
+    paths = cache.ensure(model_urls(wake_words))
+
+    def variant(role, filename):
+        return cache.quantized(filename) if role in settings["quantized"] else paths[filename]
+
+    # Classifiers go in at full precision: predictions are keyed by their file name
+    model = Model(
+        wakeword_models=[paths[f"{model_key(w)}.onnx"] for w in wake_words],
+        melspec_model_path=variant("melspectrogram", "melspectrogram.onnx"),
+        embedding_model_path=variant("embedding", "embedding_model.onnx"),
+        inference_framework="onnx",
+        ncpu=settings["intra_op_threads"],
+    )
+    installed = version("openwakeword")
+    if installed not in PATCHED_VERSIONS:
+        logger.warning(f"openWakeWord {installed} is not one of {', '.join(PATCHED_VERSIONS)}; using its own "
+                       f"ONNX sessions, without the tuned session options")
+        return model
+    options = session_options(settings)
+    features = model.preprocessor
+    features.melspec_model = _session(variant("melspectrogram", "melspectrogram.onnx"), options)
+    features.embedding_model = _session(variant("embedding", "embedding_model.onnx"), options)
+    for wake_word in wake_words:
+        key = model_key(wake_word)
+        classifier = _session(variant("wakeword", f"{key}.onnx"), options)
+        input_name = classifier.get_inputs()[0].name
+        model.models[key] = classifier
+        model.model_prediction_function[key] = (
+            lambda x, classifier=classifier, input_name=input_name: classifier.run(None, {input_name: x})
+        )
+    return model
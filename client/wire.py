@@ -0,0 +1,38 @@
+"""
+MessagePack for the context upload and the server's answers (see server/wire.py).
+
+With ``WIRE_FORMAT = "msgpack"`` in config.py (the default is JSON, which
+every server reads) and the msgpack package installed, a question's context goes up as a ``packed_context`` part
+instead of a JSON string field, and requests ask for MessagePack answers.
+``decode()`` reads whichever the server sent, so JSON error responses
+still work. Without msgpack everything stays JSON.
+"""
+import json
+
+from config import WIRE_FORMAT
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK = "application/msgpack"
+PACKED = WIRE_FORMAT == "msgpack" and msgpack is not None
+
+# Merged into the headers of every request to the server
+ACCEPT = {"Accept": f"{MSGPACK}, application/json;q=0.5"} if PACKED else {}
+
+
+def context_fields(context_dict):
+    """(files, data) carrying the context in a /process-audio upload."""
+    if PACKED:
+        return {"packed_context": ("context.msgpack", msgpack.packb(context_dict, use_bin_type=True), MSGPACK)}, {}
+    return {}, {"context": json.dumps(context_dict)}
+
+
+def decode(response):
+    """The body of a server response, MessagePack or JSON."""
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == MSGPACK and msgpack is not None:
+        return msgpack.unpackb(response.content, raw=False)
+    return response.json()
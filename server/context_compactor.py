@@ -0,0 +1,218 @@
+"""
+The system prompt, built from the client's context within a token budget.
+
+Sending the whole day as indented JSON makes the prompt, and the LLM's
+time to first token, grow with the activity history. Instead the prompt
+carries:
+
+* the schedule around now (``SCHEDULE_WINDOW_HOURS`` either side), plus
+  any activity the request names, with counts of what was left out
+* the newest ``RECENT_ACTIVITY_DETAIL`` activities in full, and older
+  ones as counts per activity and status. Newer clients send only their
+  latest rows plus ``today_summary`` (the day's rollup), and the counts
+  come from that instead
+* preferences and all of the above as compact JSON (no indent or spaces)
+
+If the estimate is still over ``CONTEXT_TOKEN_BUDGET`` tokens, detail is
+dropped step by step: fewer recent activities, then preferences, then the
+schedule window (keeping named and next activities), then the summary.
+Last, the schedule is cut to the named and next activities and the recent
+list is emptied. A prompt still over budget after that is logged.
+
+``estimate_tokens()`` is a local approximation of GPT tokenization: a
+token per word or symbol, extra ones for long words and numbers. It is
+within about 10-20% for this prompt and needs no tokenizer download.
+
+Times are the household's: the client sends ``local_time``. Older clients
+don't, so the server falls back to the latest activity, then its own clock.
+"""
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "500"))
+SCHEDULE_WINDOW_HOURS = float(os.getenv("SCHEDULE_WINDOW_HOURS", "3"))
+RECENT_ACTIVITY_DETAIL = int(os.getenv("RECENT_ACTIVITY_DETAIL", "5"))
+
+logger = logging.getLogger(__name__)
+
+PLAIN_PROMPT = "You are Quintilian, a helpful and friendly AI assistant. Keep your responses concise and engaging."
+
+INSTRUCTIONS = """When the user asks to update a schedule time (either by specifying a new time or delaying an activity):
+1. Calculate the new time if it's a delay request
+2. Use the update_schedule function to update the time
+3. Respond with just "OK" to save credits
+
+For example:
+- If user says "delay nap by 30 minutes", calculate the new time and use update_schedule
+- If user says "update nap time to 1:11 pm", convert to 24-hour format and use update_schedule"""
+
+_TOKEN_PATTERN = re.compile(r"\d+|[^\W\d]+|[^\w\s]|\n\s*| {2,}")  # Line breaks and indents cost tokens too
+
+
+def estimate_tokens(text):
+    """Approximate GPT token count: one per word or symbol, more for long words and numbers."""
+    count = 0
+    for piece in _TOKEN_PATTERN.findall(text or ""):
+        if piece.isdigit():
+            count += (len(piece) + 2) // 3  # Numbers are split into groups of up to 3 digits
+        else:
+            count += 1 + len(piece) // 8
+    return count
+
+
+def _compact(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _minute_of_day(value):
+    """Minutes since midnight of "HH:MM", an ISO timestamp, or a schedule entry dict."""
+    if isinstance(value, dict):
+        value = value.get("start_time") or value.get("time")
+    if not isinstance(value, str):
+        return None
+    match = re.search(r"(?:T|^)(\d{1,2}):(\d{2})", value)
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+
+def _clock(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def local_now(context_dict):
+    """The household's current time as minutes since midnight."""
+    minute = _minute_of_day(context_dict.get("local_time"))
+    if minute is None:
+        starts = [_minute_of_day(a.get("start_time")) for a in context_dict.get("recent_activities") or []]
+        starts = [s for s in starts if s is not None]
+        minute = max(starts) if starts else None
+    if minute is None:
+        now = datetime.now()
+        minute = now.hour * 60 + now.minute
+    return minute
+
+
+def mentioned(text, names):
+    """Activity names the request refers to ("bath_time" matches "bath time")."""
+    text = (text or "").lower()
+    return {
+        name for name in names
+        if re.search(rf"\b{re.escape(str(name).replace('_', ' ').lower())}\b", text.replace("_", " "))
+    }
+
+
+def compact_schedule(schedule, now_minute, keep=(), window_minutes=None):
+    """Entries within the window around now plus ``keep``; returns (entries, {"earlier": n, "later": n})."""
+    window = SCHEDULE_WINDOW_HOURS * 60 if window_minutes is None else window_minutes
+    kept, skipped = {}, {"earlier": 0, "later": 0}
+    next_name = None
+    for name, entry in schedule.items():
+        minute = _minute_of_day(entry)
+        if minute is not None and minute >= now_minute and (
+            next_name is None or minute < _minute_of_day(schedule[next_name])
+        ):
+            next_name = name
+    for name, entry in schedule.items():
+        minute = _minute_of_day(entry)
+        if name in keep or name == next_name or minute is None or abs(minute - now_minute) <= window:
+            kept[name] = _clock(minute) if minute is not None else entry
+        elif minute < now_minute:
+            skipped["earlier"] += 1
+        else:
+            skipped["later"] += 1
+    return kept, skipped
+
+
+def compact_activities(activities, detail=None):
+    """Newest ``detail`` activities as [name, "HH:MM", status]; the rest as {name: {status: count}}."""
+    detail = RECENT_ACTIVITY_DETAIL if detail is None else detail
+    ordered = sorted(activities, key=lambda a: a.get("start_time") or "", reverse=True)
+    recent = []
+    for activity in ordered[:detail]:
+        minute = _minute_of_day(activity.get("start_time"))
+        recent.append([activity.get("activity_name"), _clock(minute) if minute is not None else None,
+                       activity.get("status")])
+    summary = {}
+    for activity in ordered[detail:]:
+        counts = summary.setdefault(activity.get("activity_name"), {})
+        status = activity.get("status") or "unknown"
+        counts[status] = counts.get(status, 0) + 1
+    return recent, summary
+
+
+def summary_from_rollup(rollup):
+    """The client's ``today_summary`` as {name: {status: count}}."""
+    return {
+        name: {status: totals[status] for status in ("completed", "skipped", "in_progress") if totals.get(status)}
+        for name, totals in (rollup.get("activities") or {}).items()
+    }
+
+
+def _render(family, now_minute, schedule, skipped, recent, summary, preferences, summary_label="Earlier activities"):
+    lines = [
+        f"You are Quintilian, a helpful and friendly AI assistant for {family.get('child_name', 'the child')} "
+        f"(age {family.get('child_age', 'unknown')}).",
+        f"Local time: {_clock(now_minute)}",
+    ]
+    if schedule:
+        left_out = ", ".join(f"{count} {side}" for side, count in skipped.items() if count)
+        lines.append(f"Schedule (HH:MM){f' - {left_out} not shown' if left_out else ''}: {_compact(schedule)}")
+    else:
+        lines.append("Schedule: none set for today.")
+    if recent:
+        lines.append(f"Recent activities (newest first, [name, time, status]): {_compact(recent)}")
+    else:
+        lines.append("Recent activities: none.")
+    if summary:
+        lines.append(f"{summary_label} (counts by status): {_compact(summary)}")
+    if preferences:
+        lines.append(f"Child's preferences: {_compact(preferences)}")
+    return "\n".join(lines) + "\n\n" + INSTRUCTIONS
+
+
+def build_system_prompt(context_dict, user_message, budget=None):
+    """The system prompt for a request; returns (prompt, estimated tokens)."""
+    if not context_dict:
+        return PLAIN_PROMPT, estimate_tokens(PLAIN_PROMPT)
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    family = context_dict.get("family") or {}
+    schedule = (context_dict.get("daily_context") or {}).get("schedule") or {}
+    activities = context_dict.get("recent_activities") or []
+    now_minute = local_now(context_dict)
+    named = mentioned(user_message, list(schedule) + [a.get("activity_name") for a in activities])
+
+    rollup = context_dict.get("today_summary")
+    summary_label = "Today's activities" if rollup else "Earlier activities"
+
+    preferences = family.get("preferences")
+    window = None
+    detail = RECENT_ACTIVITY_DETAIL
+    keep_summary = True
+    # From the fullest prompt down, stop at the first that fits
+    for step in ("full", "fewer_activities", "no_preferences", "narrow_schedule", "no_summary", "essentials"):
+        if step == "fewer_activities":
+            detail = min(detail, 2)
+        elif step == "no_preferences":
+            preferences = None
+        elif step == "narrow_schedule":
+            window = 0
+        elif step == "no_summary":
+            keep_summary = False
+        elif step == "essentials":
+            window = -1  # Only the named and next activities
+            detail = 0
+        kept, skipped = compact_schedule(schedule, now_minute, named, window)
+        recent, summary = compact_activities(activities, detail)
+        if rollup:
+            summary = summary_from_rollup(rollup)
+        prompt = _render(family, now_minute, kept, skipped, recent, summary if keep_summary else {}, preferences,
+                         summary_label)
+        tokens = estimate_tokens(prompt)
+        if tokens <= budget:
+            break
+    else:
+        logger.warning(f"System prompt is {tokens} tokens, over the budget of {budget} "
+                       f"with {len(kept)} schedule entries left")
+    return prompt, tokens
@@ -9,8 +9,9 @@ SERVER_IP = "13.57.89.95"
 KEY_PATH = "../q key.pem"
 REMOTE_USER = "ubuntu"
 REMOTE_DIR = "/home/ubuntu/server"
-LOCAL_MAIN = "main.py"
-REMOTE_MAIN = f"{REMOTE_DIR}/main.py"
+# Server modules copied on every deploy (main.py imports the others)
+LOCAL_FILES = ["main.py", "tenancy.py", "storage.py", "router.py", "eventlog.py", "speakers.py", "transcription.py", "model_routing.py",
+              "context_compactor.py", "schedule_store.py", "wire.py"]
 SERVICE_NAME = "quintilian"  # Change if your systemd service is named differently
 HEALTH_URL = f"http://{SERVER_IP}:8000/health"
 
@@ -55,15 +56,17 @@ def main():
     if not Path(KEY_PATH).exists():
         print(f"Key file {KEY_PATH} not found!")
         return
-    # Check local main.py
-    if not Path(LOCAL_MAIN).exists():
-        print(f"Local {LOCAL_MAIN} not found!")
-        return
-    # Copy main.py
-    if not scp_file(LOCAL_MAIN, REMOTE_MAIN):
-        print("SCP failed. Aborting.")
-        return
-    print("main.py copied successfully.")
+    # Check local server files
+    for local_file in LOCAL_FILES:
+        if not Path(local_file).exists():
+            print(f"Local {local_file} not found!")
+            return
+    # Copy server files
+    for local_file in LOCAL_FILES:
+        if not scp_file(local_file, f"{REMOTE_DIR}/{local_file}"):
+            print("SCP failed. Aborting.")
+            return
+    print(f"{', '.join(LOCAL_FILES)} copied successfully.")
     # Restart the service
     print(f"Restarting service {SERVICE_NAME} ...")
     if not run_ssh_command(f"sudo systemctl restart {SERVICE_NAME}"):
@@ -1,28 +1,44 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 import openai
 import os
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 from elevenlabs import Voice, VoiceSettings
-import tempfile
+from elevenlabs.environment import ElevenLabsEnvironment
+import asyncio
+import hashlib
+import time
 import json
 from pydantic import BaseModel
 import logging
 import traceback
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from tenancy import admin, household, tenants, start_request_timing, format_server_timing
+from storage import create_store
+from speakers import speaker_profile
+from transcription import create_transcriber
+from model_routing import choose_route, escalation, route_stats, usable
+from context_compactor import build_system_prompt
+from schedule_store import create_schedule_store
+from wire import NegotiatedResponse, NegotiatedRoute, decode_context, msgpack
+from eventlog import configure_logging, get_event_logger
+
+# Configure logging (LOG_LEVEL, LOG_LEVELS=payload=DEBUG, LOG_FORMAT=json; see eventlog.py)
+configure_logging()
 logger = logging.getLogger(__name__)
+log = get_event_logger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+# JSON or MessagePack, as each client asks (see wire.py)
+app = FastAPI(default_response_class=NegotiatedResponse)
+app.router.route_class = NegotiatedRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -33,12 +49,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create audio directory if it doesn't exist
-AUDIO_DIR = "audio"
-os.makedirs(AUDIO_DIR, exist_ok=True)
+@app.middleware("http")
+async def server_timing(request, call_next):
+    """Report per-stage durations (queue wait and upstream call) in a Server-Timing header."""
+    timings = start_request_timing()
+    started = time.perf_counter()
+    response = await call_next(request)
+    timings["total"] = time.perf_counter() - started
+    response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
+# Generated audio and cached responses live in a pluggable store so any
+# worker can serve what another worker produced (see storage.py)
+store = create_store()
 
-# Mount the audio directory
-app.mount("/audio", StaticFiles(directory=AUDIO_DIR), name="audio")
+# Trims silence, splits long recordings and batches local ASR (see transcription.py)
+transcriber = create_transcriber()
+
+# Each household's schedule, shared by its devices (see schedule_store.py)
+schedule_store = create_schedule_store()
 
 # Load environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -49,7 +78,42 @@ if not OPENAI_API_KEY or not ELEVENLABS_API_KEY:
 
 # Configure API keys
 openai.api_key = OPENAI_API_KEY
-client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL")  # Optional, e.g. a local stand-in for tests
+if ELEVENLABS_BASE_URL:
+    # The SDK's base_url argument forces https and drops the port, so pass a full environment
+    client = ElevenLabs(
+        api_key=ELEVENLABS_API_KEY,
+        environment=ElevenLabsEnvironment(
+            base=ELEVENLABS_BASE_URL,
+            wss=ELEVENLABS_BASE_URL.replace("http", "ws", 1)
+        )
+    )
+else:
+    client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+
+# How long the answer to a request sent with an Idempotency-Key is kept for a
+# retry, and how long a retry is told to wait while the first try is still running
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_RUNNING_TTL = int(os.getenv("IDEMPOTENCY_RUNNING_TTL", "300"))
+
+# /process-text/batch: most texts per request, and most in flight at once per batch
+TEXT_BATCH_MAX = int(os.getenv("TEXT_BATCH_MAX", "500"))
+TEXT_BATCH_CONCURRENCY = int(os.getenv("TEXT_BATCH_CONCURRENCY", "8"))
+
+VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel voice - a default ElevenLabs voice
+TTS_MODEL = "eleven_monolingual_v1"
+
+def generate_speech(text):
+    """Synthesize text with the assistant's voice and return the audio bytes."""
+    audio_stream = client.generate(
+        text=text,
+        voice=Voice(
+            voice_id=VOICE_ID,
+            settings=VoiceSettings(stability=0.5, similarity_boost=0.75)
+        ),
+        model=TTS_MODEL
+    )
+    return b"".join(chunk for chunk in audio_stream)
 
 class AudioResponse(BaseModel):
     audio_url: str
@@ -64,148 +128,241 @@ class ScheduleModification(BaseModel):
     delay_minutes: int
     original_time: str
     new_time: str
+    day: Optional[str] = None  # YYYY-MM-DD, defaults to today
+
+class ScheduleChanges(BaseModel):
+    changes: List[Dict[str, Any]]
+    since: Optional[int] = None  # Also return what changed after this cursor
 
 class TextRequest(BaseModel):
     text: str
     context: Optional[Dict[str, Any]] = None
 
+class TextBatchRequest(BaseModel):
+    texts: List[str]
+    context: Dict[str, Any]  # Shared by every text
+    concurrency: Optional[int] = None  # Capped at TEXT_BATCH_CONCURRENCY
+
+class SpeechRequest(BaseModel):
+    text: str
+
 class TextResponse(BaseModel):
     text: str
     schedule: Optional[Dict[str, Any]] = None
     adjustments: Optional[Dict[str, Any]] = None
     function_call: Optional[Dict[str, Any]] = None
+    schedule_cursor: Optional[int] = None
+
+class TextBatchItem(BaseModel):
+    index: int
+    result: Optional[TextResponse] = None
+    error: Optional[str] = None
+    status: int = 200  # 429 if the household's rate limit ran out before this text
+
+class TextBatchResponse(BaseModel):
+    results: List[TextBatchItem]  # In request order
+    succeeded: int
+    failed: int
+
+# The only function the assistant can call; passed on every chat request
+SCHEDULE_FUNCTIONS = [
+    {
+        "name": "update_schedule",
+        "description": "Update the schedule for an activity",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "activity_name": {
+                    "type": "string",
+                    "description": "Name of the activity to update (e.g., 'nap', 'lunch')"
+                },
+                "new_time": {
+                    "type": "string",
+                    "description": "New time in 24-hour format (HH:MM)"
+                }
+            },
+            "required": ["activity_name", "new_time"]
+        }
+    }
+]
+
+def schedule_time(entry):
+    """Read an activity's time from a schedule entry.
+
+    Clients send either "HH:MM" (the normalized client schedule) or a dict
+    with a "start_time"/"time" key.
+    """
+    if isinstance(entry, dict):
+        return entry.get('start_time') or entry.get('time')
+    return entry
+
+def context_day(context_dict):
+    """The household's date (YYYY-MM-DD) from the client's local time, else the server's."""
+    local_time = (context_dict or {}).get("local_time") or ""
+    return local_time[:10] if len(local_time) >= 10 else datetime.now().date().isoformat()
+
+async def use_shared_schedule(household_id, context_dict):
+    """Put the household's stored schedule into the context; the first upload of a day seeds it.
+
+    Returns the day, or None without a context.
+    """
+    if not context_dict:
+        return None
+    day = context_day(context_dict)
+    daily_context = context_dict.get("daily_context") or {}
+    await run_in_threadpool(schedule_store.seed, household_id, day, daily_context.get("schedule"))
+    stored = await run_in_threadpool(schedule_store.schedule, household_id, day)
+    if stored:
+        context_dict["daily_context"] = {**daily_context, "schedule": stored}
+    return day
+
+async def complete_chat(household_id, system_prompt, user_message, functions, model="gpt-4"):
+    """Run a chat completion in the household's fair turn, off the event loop."""
+    async with tenants.stage(household_id, "llm"):
+        response = await run_in_threadpool(
+            openai.chat.completions.create,
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            functions=functions,
+            function_call="auto"
+        )
+    if getattr(response, "usage", None):
+        tenants.usage.add(household_id, "llm_tokens", response.usage.total_tokens)
+    return response
+
+async def routed_chat(household_id, system_prompt, user_message, context_dict, profile):
+    """Answer with the model for this request's route (see model_routing.py).
+
+    A command the small model answers with nothing usable (no text and no
+    function call, or unreadable arguments) is asked again on the open route.
+    """
+    schedule = ((context_dict or {}).get("daily_context") or {}).get("schedule") or {}
+    route = choose_route(user_message, schedule.keys(), profile)
+    escalated = False
+    while True:
+        started = time.perf_counter()
+        response = await complete_chat(household_id, system_prompt, user_message, SCHEDULE_FUNCTIONS, route["model"])
+        route_stats.record(route["name"], route["model"], time.perf_counter() - started,
+                           getattr(response, "usage", None), escalated)
+        log.info("chat.route", route=route["name"], model=route["model"], escalated=escalated,
+                 ms=round((time.perf_counter() - started) * 1000))
+        if route["name"] != "command" or usable(response.choices[0].message):
+            return response
+        route, escalated = escalation(profile), True
+
+async def synthesize_speech(household_id, text):
+    """Run TTS in the household's fair turn, off the event loop."""
+    async with tenants.stage(household_id, "tts"):
+        audio_bytes = await run_in_threadpool(generate_speech, text)
+    tenants.usage.add(household_id, "tts_characters", len(text))
+    return audio_bytes
+
+async def stored_speech(household_id, text):
+    """Return the storage key of the audio for text, synthesizing it only once."""
+    audio_filename = f"tts_{hashlib.sha1(f'{VOICE_ID}|{text}'.encode('utf-8')).hexdigest()[:20]}.wav"
+    # The store may be a network disk or Redis: keep its calls off the event loop
+    if await run_in_threadpool(store.exists, audio_filename):
+        log.debug("tts.reused", key=audio_filename)
+        return audio_filename
+    audio_bytes = await synthesize_speech(household_id, text)
+    await run_in_threadpool(store.put, audio_filename, audio_bytes)
+    log.info("tts.stored", key=audio_filename, chars=len(text), audio_bytes=len(audio_bytes))
+    return audio_filename
+
+def _idempotency_entry(household_id, key):
+    return f"idempotency-{hashlib.sha1(f'{household_id}|{key}'.encode('utf-8')).hexdigest()}"
+
+async def earlier_answer(household_id, key):
+    """The answer already given to a request sent with this Idempotency-Key, or None for a new one.
+
+    A client that timed out may send a question again that was in fact
+    handled (or still is); it gets the first answer instead of a second
+    schedule change, and a 409 to retry later while the first is running.
+    The check isn't atomic, so two copies arriving together can both run.
+    """
+    if not key:
+        return None
+    entry_key = _idempotency_entry(household_id, key)
+    entry = await run_in_threadpool(store.cache_get, entry_key)
+    if entry is None:
+        await run_in_threadpool(store.cache_set, entry_key, {"status": "running"}, IDEMPOTENCY_RUNNING_TTL)
+        return None
+    if entry.get("status") == "running":
+        raise HTTPException(status_code=409, detail="This request is still being processed; retry later")
+    log.info("idempotency.replayed", household=household_id)
+    return entry["response"]
+
+async def remember_answer(household_id, key, response):
+    """Keep the answer for retries of this Idempotency-Key (None forgets the key, after a failure)."""
+    if key:
+        entry = {"status": "done", "response": response} if response is not None else None
+        await run_in_threadpool(store.cache_set, _idempotency_entry(household_id, key), entry, IDEMPOTENCY_TTL)
 
 @app.post("/process-audio", response_model=AudioResponse, responses={500: {"model": ErrorResponse}})
 async def process_audio(
     audio_file: UploadFile = File(...),
     context: Optional[str] = Form(None),
-    transcript: Optional[str] = Form(None)
+    packed_context: Optional[UploadFile] = File(None),  # The context as MessagePack, instead of context
+    transcript: Optional[str] = Form(None),
+    household_id: str = Depends(household),
+    profile: dict = Depends(speaker_profile),
+    idempotency_key: Optional[str] = Header(None)
 ):
+    if packed_context is not None and msgpack is None:
+        raise HTTPException(status_code=415, detail="This server can't read MessagePack; send context as JSON")
+    packed = await packed_context.read() if packed_context is not None else None
+
+    # Parse context if provided
+    context_dict = None
+    if packed or context:
+        try:
+            context_dict = decode_context(packed, packed_context.content_type) if packed else json.loads(context)
+            log.debug("context", category="payload", context=context_dict)
+        except Exception as e:
+            logger.warning(f"Could not parse context: {e}")
+            context_dict = None
+        if context_dict is not None and not isinstance(context_dict, dict):
+            # E.g. a JSON string packed as MessagePack: the client has to send the object itself
+            raise HTTPException(status_code=400,
+                                detail=f"context must be an object, not {type(context_dict).__name__}")
+
+    earlier = await earlier_answer(household_id, idempotency_key)
+    if earlier is not None:
+        return AudioResponse(**earlier)
     try:
-        logger.info("Starting audio processing")
-        
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-            logger.info(f"Saved temporary file to {temp_file_path}")
-
-        # Generate audio filename early
-        audio_filename = f"response_{os.path.basename(temp_file_path)}"
-        audio_path = os.path.join(AUDIO_DIR, audio_filename)
-
-        # Parse context if provided
-        context_dict = None
-        if context:
-            try:
-                context_dict = json.loads(context)
-                logger.info(f"Successfully parsed context JSON: {json.dumps(context_dict, indent=2)}")
-            except Exception as e:
-                logger.warning(f"Could not parse context JSON: {e}")
-                context_dict = None
-        
+        content = await audio_file.read()
+        log.info("process_audio.start", household=household_id, audio_bytes=len(content),
+                 context_chars=len(packed or context or ""), packed=packed is not None,
+                 wake_word=profile["wake_word"], profile=profile["name"])
+
         # Use provided transcript or transcribe audio using Whisper
         if transcript:
-            logger.info(f"Using provided transcript: {transcript}")
             transcript_text = transcript
         else:
-            logger.info("Starting Whisper transcription")
-            with open(temp_file_path, "rb") as audio_file:
-                transcript_obj = openai.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            transcript_text = transcript_obj.text
-        logger.info(f"Using transcript: {transcript_text}")
+            transcript_text = await transcriber.transcribe(household_id, content, audio_file.filename)
+        log.info("transcript", source="client" if transcript else "whisper", chars=len(transcript_text))
+        log.debug("transcript", category="payload", text=transcript_text)
         
-        # Build the prompt with context if available
-        if context_dict:
-            logger.info(f"Building prompt with context")
-            family = context_dict.get("family", {})
-            daily_context = context_dict.get("daily_context", {})
-            recent_activities = context_dict.get("recent_activities", [])
-            
-            # Define the function schema for schedule updates
-            functions = [
-                {
-                    "name": "update_schedule",
-                    "description": "Update the schedule for an activity",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "activity_name": {
-                                "type": "string",
-                                "description": "Name of the activity to update (e.g., 'nap', 'lunch')"
-                            },
-                            "new_time": {
-                                "type": "string",
-                                "description": "New time in 24-hour format (HH:MM)"
-                            }
-                        },
-                        "required": ["activity_name", "new_time"]
-                    }
-                }
-            ]
-
-            system_prompt = f"""You are Quintilian, a helpful and friendly AI assistant for {family.get('child_name', 'the child')} (age {family.get('child_age', 'unknown')}).
-
-Current Schedule:
-{json.dumps(daily_context.get('schedule', {}), indent=2) if daily_context.get('schedule') else "No schedule set for today."}
-
-Recent Activities:
-{json.dumps([{"name": a.get('activity_name'), "time": a.get('start_time'), "status": a.get('status')} for a in recent_activities], indent=2) if recent_activities else "No recent activities."}
-
-Child's Preferences:
-{json.dumps(family.get('preferences', {}), indent=2) if family.get('preferences') else "No preferences set."}
-
-When the user asks to update a schedule time (either by specifying a new time or delaying an activity):
-1. Calculate the new time if it's a delay request
-2. Use the update_schedule function to update the time
-3. Respond with just "OK" to save credits
-
-For example:
-- If user says "delay nap by 30 minutes", calculate the new time and use update_schedule
-- If user says "update nap time to 1:11 pm", convert to 24-hour format and use update_schedule"""
-            logger.info(f"Built system prompt with context: {system_prompt}")
-            user_message = transcript_text  # Just use the transcript directly
-        else:
+        # Compact, token-budgeted prompt from the context (see context_compactor.py)
+        if not context_dict:
             logger.warning("No context received from client")
-            system_prompt = "You are Quintilian, a helpful and friendly AI assistant. Keep your responses concise and engaging."
-            user_message = transcript_text
+        day = await use_shared_schedule(household_id, context_dict)
+        system_prompt, prompt_tokens = build_system_prompt(context_dict, transcript_text)
+        log.info("system_prompt", estimated_tokens=prompt_tokens)
+        log.debug("system_prompt", category="payload", max_chars=4000, prompt=system_prompt)
+        user_message = transcript_text  # Just use the transcript directly
         
-        # Get GPT-4 response with function calling
-        logger.info("Getting GPT-4 response with function calling")
-        response = openai.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            functions=functions,
-            function_call="auto"
-        )
+        # Get a response with function calling from the model for this route
+        response = await routed_chat(household_id, system_prompt, user_message, context_dict, profile)
         
         message = response.choices[0].message
         gpt_response = message.content
 
-        # Generate audio using ElevenLabs
-        logger.info("Generating audio with ElevenLabs")
-        audio_stream = client.generate(
-            text="OK",
-            voice=Voice(
-                voice_id="21m00Tcm4TlvDq8ikWAM",  # Rachel voice - a default ElevenLabs voice
-                settings=VoiceSettings(stability=0.5, similarity_boost=0.75)
-            ),
-            model="eleven_monolingual_v1"
-        )
-        
-        # Convert generator to bytes and write to file
-        logger.info("Converting audio stream to bytes and saving")
-        audio_bytes = b"".join(chunk for chunk in audio_stream)
-        with open(audio_path, "wb") as f:
-            f.write(audio_bytes)
-        logger.info(f"Audio saved to {audio_path}")
+        # Generate audio using ElevenLabs (or reuse the stored clip for this phrase)
+        audio_filename = await stored_speech(household_id, "OK")
 
         # Check if GPT wants to call the update_schedule function
         if message.function_call and message.function_call.name == "update_schedule":
@@ -213,34 +370,33 @@ For example:
             activity_name = function_args["activity_name"]
             new_time = function_args["new_time"]
             
-            # Log the function call
-            logger.info(f"Function call detected: {message.function_call.name}")
-            logger.info(f"Function arguments: {json.dumps(function_args, indent=2)}")
-            
-            # Clean up the temporary input file
-            os.unlink(temp_file_path)
-            logger.info("Temporary file cleaned up")
+            log.info("function_call", name=message.function_call.name, arguments=function_args)
+            action = {
+                "type": "update_schedule",
+                "activity": activity_name,
+                "new_start_time": new_time
+            }
+            if day:
+                result = await run_in_threadpool(schedule_store.apply, household_id, [
+                    {"day": day, "activity_name": activity_name, "time": new_time}
+                ], "voice")
+                action["schedule_cursor"] = result["cursor"]
             
-            return AudioResponse(
+            answer = AudioResponse(
                 audio_url=f"/audio/{audio_filename}",
-                action={
-                    "type": "update_schedule",
-                    "activity": activity_name,
-                    "new_start_time": new_time
-                }
+                action=action
             )
-
-        # Clean up the temporary input file
-        os.unlink(temp_file_path)
-        logger.info("Temporary file cleaned up")
-
-        return AudioResponse(
-            audio_url=f"/audio/{audio_filename}"
-        )
+        else:
+            answer = AudioResponse(
+                audio_url=f"/audio/{audio_filename}"
+            )
+        await remember_answer(household_id, idempotency_key, answer.model_dump())
+        return answer
 
     except Exception as e:
         error_detail = traceback.format_exc()
         logger.error(f"Error processing audio: {str(e)}\n{error_detail}")
+        await remember_answer(household_id, idempotency_key, None)
         raise HTTPException(
             status_code=500,
             detail={
@@ -250,11 +406,17 @@ For example:
         )
 
 @app.post("/modify-schedule")
-async def modify_schedule(modification: ScheduleModification):
+async def modify_schedule(modification: ScheduleModification, household_id: str = Depends(household)):
     try:
-        logger.info(f"Received schedule modification request: {modification}")
+        log.info("modify_schedule", activity=modification.activity_name,
+                 delay_minutes=modification.delay_minutes, new_time=modification.new_time)
         
-        # Return the modification details for the client to update its database
+        # Record it in the household's schedule, then return it for the client to update its database
+        result = await run_in_threadpool(schedule_store.apply, household_id, [{
+            "day": modification.day or datetime.now().date().isoformat(),
+            "activity_name": modification.activity_name,
+            "time": modification.new_time
+        }], "voice")
         return {
             "status": "success",
             "modification": {
@@ -262,7 +424,8 @@ async def modify_schedule(modification: ScheduleModification):
                 "delay_minutes": modification.delay_minutes,
                 "original_time": modification.original_time,
                 "new_time": modification.new_time
-            }
+            },
+            "schedule_cursor": result["cursor"]
         }
     except Exception as e:
         error_detail = traceback.format_exc()
@@ -275,10 +438,88 @@ async def modify_schedule(modification: ScheduleModification):
             }
         )
 
+@app.get("/schedule/sync")
+async def schedule_sync(
+    since: int = 0,
+    limit: Optional[int] = None,
+    day: Optional[str] = None,
+    household_id: str = Depends(household)
+):
+    """Schedule entries changed after the device's cursor (see schedule_store.py).
+
+    With ``day``, also says whether the server holds that day, so the device
+    can stop uploading it.
+    """
+    try:
+        result = await run_in_threadpool(schedule_store.changes_since, household_id, since, limit)
+        if day:
+            result["has_day"] = await run_in_threadpool(schedule_store.has_day, household_id, day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+@app.post("/schedule/changes")
+async def schedule_changes(request: ScheduleChanges, household_id: str = Depends(household)):
+    """Apply a device's schedule changes; with ``since``, also return what it hasn't seen."""
+    try:
+        result = await run_in_threadpool(schedule_store.apply, household_id, request.changes)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid schedule change: {e}")
+    log.info("schedule.changes", household=household_id, applied=len(result["applied"]),
+             conflicts=len(result["conflicts"]), cursor=result["cursor"])
+    if request.since is not None:
+        result["sync"] = await run_in_threadpool(schedule_store.changes_since, household_id, request.since)
+    return result
+
+@app.post("/synthesize")
+async def synthesize(request: SpeechRequest, household_id: str = Depends(household)):
+    """Return speech audio for a fixed phrase so clients can cache it ahead of time."""
+    try:
+        log.info("synthesize", household=household_id, text=request.text)
+        audio_filename = await stored_speech(household_id, request.text)
+        return Response(
+            content=await run_in_threadpool(store.get, audio_filename),
+            media_type="audio/mpeg",
+            headers={"Content-Location": f"/audio/{audio_filename}"}
+        )
+    except Exception as e:
+        error_detail = traceback.format_exc()
+        logger.error(f"Error synthesizing speech: {str(e)}\n{error_detail}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": str(e),
+                "detail": error_detail
+            }
+        )
+
+@app.get("/audio/{audio_filename}")
+async def get_audio(audio_filename: str):
+    try:
+        audio_bytes = await run_in_threadpool(store.get, audio_filename)
+    except ValueError:
+        audio_bytes = None
+    if audio_bytes is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return Response(content=audio_bytes, media_type="audio/mpeg")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/tenants/usage", dependencies=[Depends(admin)])
+async def tenant_usage():
+    """Per-household request counts, upstream usage and stage latencies."""
+    return {
+        "households": tenants.usage.snapshot(),
+        "queues": {name: queue.queued for name, queue in tenants.queues.items()}
+    }
+
+@app.get("/routes/usage", dependencies=[Depends(admin)])
+async def routes_usage():
+    """Calls, escalations, latency, tokens and estimated cost per model route."""
+    return route_stats.snapshot()
+
 @app.get("/ip")
 async def get_ip():
     """Return the server's public IP address."""
@@ -288,142 +529,103 @@ async def get_ip():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def answer_text(household_id, user_message, context_dict, day, profile):
+    """Answer one text command against a context already holding the household's schedule."""
+    daily_context = context_dict.get("daily_context", {})
+
+    # Compact, token-budgeted prompt from the context (see context_compactor.py)
+    system_prompt, prompt_tokens = build_system_prompt(context_dict, user_message)
+    log.info("system_prompt", estimated_tokens=prompt_tokens)
+    log.debug("system_prompt", category="payload", max_chars=4000, prompt=system_prompt)
+
+    # Get a response with function calling from the model for this route
+    response = await routed_chat(household_id, system_prompt, user_message, context_dict, profile)
+
+    message = response.choices[0].message
+    gpt_response = message.content
+
+    # Check if GPT wants to call the update_schedule function
+    if message.function_call and message.function_call.name == "update_schedule":
+        function_args = json.loads(message.function_call.arguments)
+        activity_name = function_args["activity_name"]
+        new_time = function_args["new_time"]
+        
+        log.info("function_call", name=message.function_call.name, arguments=function_args)
+        
+        # Update the schedule
+        current_schedule = daily_context.get('schedule', {})
+        if activity_name in current_schedule:
+            original_time = schedule_time(current_schedule[activity_name])
+            if original_time:
+                # Update the household's stored schedule, then answer with it
+                result = await run_in_threadpool(schedule_store.apply, household_id, [
+                    {"day": day, "activity_name": activity_name, "time": new_time}
+                ], "voice")
+                current_schedule = await run_in_threadpool(schedule_store.schedule, household_id, day)
+                
+                # Log the modification
+                log.info("schedule.modified", activity=activity_name, old_time=original_time, new_time=new_time)
+                
+                # Create adjustments record
+                adjustments = {
+                    activity_name: {
+                        "original_time": original_time,
+                        "new_time": new_time,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                }
+                
+                return TextResponse(
+                    text="OK",
+                    schedule=current_schedule,
+                    schedule_cursor=result["cursor"],
+                    adjustments=adjustments,
+                    function_call={
+                        "name": message.function_call.name,
+                        "arguments": function_args,
+                        "status": "success"
+                    }
+                )
+            else:
+                logger.warning(f"Could not find start_time for {activity_name}")
+                return TextResponse(
+                    text="OK",
+                    function_call={
+                        "name": message.function_call.name,
+                        "arguments": function_args,
+                        "status": "error",
+                        "error": f"Could not find start_time for {activity_name}"
+                    }
+                )
+        else:
+            logger.warning(f"Activity {activity_name} not found in schedule")
+            return TextResponse(
+                text="OK",
+                function_call={
+                    "name": message.function_call.name,
+                    "arguments": function_args,
+                    "status": "error",
+                    "error": f"Activity {activity_name} not found in schedule"
+                }
+            )
+
+    return TextResponse(text="OK")
+
 @app.post("/process-text", response_model=TextResponse)
-async def process_text(request: TextRequest):
+async def process_text(
+    request: TextRequest,
+    household_id: str = Depends(household),
+    profile: dict = Depends(speaker_profile)
+):
     try:
-        logger.info("Processing text input for testing (no TTS, no audio)")
+        log.info("process_text.start", household=household_id, chars=len(request.text), profile=profile["name"])
         user_message = request.text
         context_dict = request.context
 
         # Build the prompt with context if available
         if context_dict:
-            logger.info(f"Building prompt with context")
-            family = context_dict.get("family", {})
-            daily_context = context_dict.get("daily_context", {})
-            recent_activities = context_dict.get("recent_activities", [])
-
-            # Define the function schema for schedule updates
-            functions = [
-                {
-                    "name": "update_schedule",
-                    "description": "Update the schedule for an activity",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "activity_name": {
-                                "type": "string",
-                                "description": "Name of the activity to update (e.g., 'nap', 'lunch')"
-                            },
-                            "new_time": {
-                                "type": "string",
-                                "description": "New time in 24-hour format (HH:MM)"
-                            }
-                        },
-                        "required": ["activity_name", "new_time"]
-                    }
-                }
-            ]
-
-            system_prompt = f"""You are Quintilian, a helpful and friendly AI assistant for {family.get('child_name', 'the child')} (age {family.get('child_age', 'unknown')}).
-
-Current Schedule:
-{json.dumps(daily_context.get('schedule', {}), indent=2) if daily_context.get('schedule') else 'No schedule set for today.'}
-
-Recent Activities:
-{json.dumps([{'name': a.get('activity_name'), 'time': a.get('start_time'), 'status': a.get('status')} for a in recent_activities], indent=2) if recent_activities else 'No recent activities.'}
-
-Child's Preferences:
-{json.dumps(family.get('preferences', {}), indent=2) if family.get('preferences') else 'No preferences set.'}
-
-When the user asks to update a schedule time (either by specifying a new time or delaying an activity):
-1. Calculate the new time if it's a delay request
-2. Use the update_schedule function to update the time
-3. Respond with just "OK" to save credits
-
-For example:
-- If user says "delay nap by 30 minutes", calculate the new time and use update_schedule
-- If user says "update nap time to 1:11 pm", convert to 24-hour format and use update_schedule"""
-
-            # Get GPT-4 response with function calling
-            logger.info("Getting GPT-4 response with function calling")
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                functions=functions,
-                function_call="auto"
-            )
-
-            message = response.choices[0].message
-            gpt_response = message.content
-
-            # Check if GPT wants to call the update_schedule function
-            if message.function_call and message.function_call.name == "update_schedule":
-                function_args = json.loads(message.function_call.arguments)
-                activity_name = function_args["activity_name"]
-                new_time = function_args["new_time"]
-                
-                # Log the function call
-                logger.info(f"Function call detected: {message.function_call.name}")
-                logger.info(f"Function arguments: {json.dumps(function_args, indent=2)}")
-                
-                # Update the schedule
-                current_schedule = daily_context.get('schedule', {})
-                if activity_name in current_schedule:
-                    original_time = current_schedule[activity_name].get('start_time')
-                    if original_time:
-                        # Update the schedule
-                        current_schedule[activity_name]['start_time'] = new_time
-                        daily_context['schedule'] = current_schedule
-                        
-                        # Log the modification
-                        logger.info(f"Modified {activity_name} time from {original_time} to {new_time}")
-                        
-                        # Create adjustments record
-                        adjustments = {
-                            activity_name: {
-                                "original_time": original_time,
-                                "new_time": new_time,
-                                "timestamp": datetime.now().isoformat()
-                            }
-                        }
-                        
-                        return TextResponse(
-                            text="OK",
-                            schedule=current_schedule,
-                            adjustments=adjustments,
-                            function_call={
-                                "name": message.function_call.name,
-                                "arguments": function_args,
-                                "status": "success"
-                            }
-                        )
-                    else:
-                        logger.warning(f"Could not find start_time for {activity_name}")
-                        return TextResponse(
-                            text="OK",
-                            function_call={
-                                "name": message.function_call.name,
-                                "arguments": function_args,
-                                "status": "error",
-                                "error": f"Could not find start_time for {activity_name}"
-                            }
-                        )
-                else:
-                    logger.warning(f"Activity {activity_name} not found in schedule")
-                    return TextResponse(
-                        text="OK",
-                        function_call={
-                            "name": message.function_call.name,
-                            "arguments": function_args,
-                            "status": "error",
-                            "error": f"Activity {activity_name} not found in schedule"
-                        }
-                    )
-
-            return TextResponse(text="OK")
+            day = await use_shared_schedule(household_id, context_dict)
+            return await answer_text(household_id, user_message, context_dict, day, profile)
 
     except Exception as e:
         error_detail = traceback.format_exc()
@@ -436,6 +638,60 @@ For example:
             }
         )
 
+@app.post("/process-text/batch", response_model=TextBatchResponse)
+async def process_text_batch(
+    request: TextBatchRequest,
+    household_id: str = Depends(household),
+    profile: dict = Depends(speaker_profile)
+):
+    """Answer many text commands against one shared context (bulk evaluation, log backfill).
+
+    The schedule is read once and every text sees the same context, as if
+    each were the first command of the day; schedule changes still go to
+    the household's store. At most ``TEXT_BATCH_CONCURRENCY`` texts are in
+    flight at once, and the LLM stage still queues them fairly against
+    other households (see tenancy.py). A failed text is an ``error`` in its
+    slot; the others are unaffected.
+
+    Each text counts against the household's rate limit like a request of
+    its own; the first is the request itself, so a household already over
+    its limit gets a 429 for the whole batch. Texts past the limit are
+    answered with ``status`` 429 and aren't sent to the model.
+    """
+    if len(request.texts) > TEXT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {TEXT_BATCH_MAX} texts per batch")
+    concurrency = max(1, min(request.concurrency or TEXT_BATCH_CONCURRENCY, TEXT_BATCH_CONCURRENCY))
+    log.info("process_text_batch.start", household=household_id, texts=len(request.texts),
+             concurrency=concurrency, profile=profile["name"])
+    try:
+        context_dict = request.context
+        day = await use_shared_schedule(household_id, context_dict) or context_day(context_dict)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    fan_out = asyncio.Semaphore(concurrency)
+
+    async def answer(index, text):
+        async with fan_out:
+            if index > 0 and not tenants.admit(household_id):
+                return TextBatchItem(index=index, error=f"Rate limit exceeded for household {household_id}", status=429)
+            try:
+                return TextBatchItem(
+                    index=index, result=await answer_text(household_id, text, context_dict, day, profile)
+                )
+            except Exception as e:
+                logger.error(f"Error processing batch text {index}: {e}\n{traceback.format_exc()}")
+                return TextBatchItem(index=index, error=str(e), status=500)
+
+    results = await asyncio.gather(*(answer(index, text) for index, text in enumerate(request.texts)))
+    failed = sum(1 for item in results if item.error is not None)
+    rate_limited = sum(1 for item in results if item.status == 429)
+    log.info("process_text_batch.done", household=household_id, texts=len(results), failed=failed,
+             rate_limited=rate_limited)
+    if rate_limited:
+        logger.warning(f"Rate limit exceeded for household {household_id}: {rate_limited} batch texts not answered")
+    return TextBatchResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
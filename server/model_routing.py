@@ -0,0 +1,135 @@
+"""
+Which chat model answers a request.
+
+Most questions are schedule commands ("delay nap 30 minutes", "move lunch
+to 12:15"). They only need the model to fill in an ``update_schedule``
+call and answer "OK", and a small, fast model does that well. Open-ended
+parenting questions go to the big model.
+
+``classify()`` is a cheap keyword check on the transcript, run before any
+model is called:
+
+* ``command`` - a schedule verb (delay, move, push, ...) plus an activity
+  from today's schedule, a time, or a duration. It goes to
+  ``CHAT_MODEL_COMMAND``. If that model's answer can't be used (no text
+  and no function call, or function arguments that aren't a JSON
+  object), the request is escalated to the ``open`` route. A plain text
+  answer ("Which nap?") is used as it is.
+* ``open``    - everything else. It goes to ``CHAT_MODEL_OPEN``, or to the
+  model the speaker profile picks (see speakers.py).
+
+``RouteStats`` keeps call counts, latency percentiles, tokens and an
+estimated cost per route for ``/routes/usage``.
+"""
+import json
+import os
+import re
+import threading
+from collections import defaultdict, deque
+
+from tenancy import percentile
+
+ROUTE_MODELS = {
+    "command": os.getenv("CHAT_MODEL_COMMAND", "gpt-3.5-turbo"),
+    "open": os.getenv("CHAT_MODEL_OPEN", "gpt-4"),
+}
+
+# USD per 1K (prompt, completion) tokens, for cost estimates only
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+COMMAND_VERBS = re.compile(
+    r"\b(delay|push|move|postpone|reschedule|change|update|set|shift|bump)\b", re.IGNORECASE
+)
+TIME_OR_DURATION = re.compile(
+    r"\b(\d{1,2}(:\d{2})?\s*(am|pm|a\.m\.|p\.m\.)?|\d+\s*(minutes?|mins?|hours?|hrs?)|half an hour|an hour|noon)\b",
+    re.IGNORECASE
+)
+QUESTION_WORDS = re.compile(r"\b(why|how|what|should|could|would|is it|can you explain)\b", re.IGNORECASE)
+
+LATENCY_WINDOW = 500
+
+
+def classify(text, activities=()):
+    """"command" for a schedule change, "open" for anything else."""
+    text = text or ""
+    if not COMMAND_VERBS.search(text):
+        return "open"
+    names = [name.replace("_", " ").lower() for name in activities]
+    mentions_activity = any(re.search(rf"\b{re.escape(name)}\b", text.lower()) for name in names if name)
+    if not (mentions_activity or TIME_OR_DURATION.search(text)):
+        return "open"
+    # "Should I move nap earlier because she's cranky?" needs the big model
+    if QUESTION_WORDS.search(text) and len(text.split()) > 8:
+        return "open"
+    return "command"
+
+
+def choose_route(text, activities=(), profile=None):
+    """The route for a request: its name and the model to call."""
+    name = classify(text, activities)
+    models = {**ROUTE_MODELS, **((profile or {}).get("models") or {})}
+    return {"name": name, "model": models[name]}
+
+
+def escalation(profile=None):
+    """The open route, for command requests the small model could not handle."""
+    models = {**ROUTE_MODELS, **((profile or {}).get("models") or {})}
+    return {"name": "open", "model": models["open"]}
+
+
+def usable(message):
+    """True unless the answer is empty or its function call can't be read."""
+    function_call = getattr(message, "function_call", None)
+    if function_call:
+        try:
+            return isinstance(json.loads(function_call.arguments or ""), dict)
+        except ValueError:
+            return False
+    return bool((getattr(message, "content", None) or "").strip())
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class RouteStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, route, model, seconds, usage=None, escalated=False):
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        with self._lock:
+            counters = self.counters[route]
+            counters["calls"] += 1
+            counters["escalated"] += int(escalated)
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            counters["cost_usd"] += estimate_cost(model, prompt_tokens, completion_tokens)
+            counters[f"model:{model}"] += 1
+            self.latencies[route].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {
+                    **{key: round(value, 6) if key == "cost_usd" else int(value) for key, value in counters.items()},
+                    "latency": {
+                        "p50": percentile(self.latencies[route], 50),
+                        "p95": percentile(self.latencies[route], 95),
+                    },
+                }
+                for route, counters in self.counters.items()
+            }
+
+
+route_stats = RouteStats()
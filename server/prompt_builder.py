@@ -1,33 +1,36 @@
-from database import get_db, FamilyProfile, DailyContext, ActivityLog
+from database import read_session, FamilyProfile, DailyContext, ActivityLog
 from datetime import datetime, timedelta
 import json
+from sqlalchemy.orm import joinedload
 
 class PromptBuilder:
-    def __init__(self):
-        self.db = next(get_db())
-        
     def get_current_context(self):
-        """Get the current family profile and daily context."""
+        """Get the current family profile and daily context.
+
+        Each call is its own short read transaction on this thread's
+        session; the objects returned stay readable after it closes.
+        """
         try:
-            # Get the family profile (assuming single family for now)
-            family = self.db.query(FamilyProfile).first()
-            if not family:
-                return None
+            with read_session() as db:
+                # Get the family profile (assuming single family for now)
+                family = db.query(FamilyProfile).first()
+                if not family:
+                    return None
+                    
+                # Get today's context
+                today = datetime.now().date()
+                daily_context = db.query(DailyContext).options(joinedload(DailyContext.family)).filter(
+                    DailyContext.family_id == family.id,
+                    DailyContext.date >= today,
+                    DailyContext.date < today + timedelta(days=1)
+                ).first()
+                
+                # Get recent activities
+                recent_activities = db.query(ActivityLog).options(joinedload(ActivityLog.family)).filter(
+                    ActivityLog.family_id == family.id,
+                    ActivityLog.start_time >= today
+                ).order_by(ActivityLog.start_time.desc()).all()
                 
-            # Get today's context
-            today = datetime.now().date()
-            daily_context = self.db.query(DailyContext).filter(
-                DailyContext.family_id == family.id,
-                DailyContext.date >= today,
-                DailyContext.date < today + timedelta(days=1)
-            ).first()
-            
-            # Get recent activities
-            recent_activities = self.db.query(ActivityLog).filter(
-                ActivityLog.family_id == family.id,
-                ActivityLog.start_time >= today
-            ).order_by(ActivityLog.start_time.desc()).all()
-            
             return {
                 "family": family,
                 "daily_context": daily_context,
@@ -36,8 +39,6 @@ class PromptBuilder:
         except Exception as e:
             print(f"Error getting context: {e}")
             return None
-        finally:
-            self.db.close()
             
     def build_prompt(self, user_input):
         """Build a context-aware prompt for GPT-4."""
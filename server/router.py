@@ -0,0 +1,72 @@
+"""
+Household-affinity router for running several server workers.
+
+Each request is forwarded to the worker chosen by rendezvous hashing on
+its ``X-Household-ID``, so a household keeps hitting the same worker (and
+that worker's rate-limit bucket and fair-queue state) while households
+spread evenly across workers. Adding or removing a worker only moves the
+households that hashed to it.
+
+    WORKER_URLS=http://127.0.0.1:8001,http://127.0.0.1:8002 uvicorn router:app --port 8000
+"""
+import hashlib
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from tenancy import DEFAULT_HOUSEHOLD
+
+logger = logging.getLogger(__name__)
+
+# Hop-by-hop headers must not be forwarded by a proxy
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "te", "upgrade", "host", "content-length"}
+
+
+def pick_worker(household_id, workers):
+    """Return the worker with the highest hash score for this household."""
+    def score(worker):
+        return hashlib.sha1(f"{worker}|{household_id}".encode("utf-8")).digest()
+    return max(workers, key=score)
+
+
+def create_router(workers):
+    http = httpx.AsyncClient(timeout=120)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await http.aclose()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/router/health")
+    async def router_health():
+        return {"status": "healthy", "workers": workers}
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    async def forward(path: str, request: Request):
+        household_id = request.headers.get("x-household-id") or DEFAULT_HOUSEHOLD
+        worker = pick_worker(household_id, workers)
+        upstream = await http.request(
+            request.method,
+            f"{worker}/{path}",
+            params=request.query_params,
+            headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS},
+            content=await request.body(),
+        )
+        # httpx has already decoded the body, so drop the upstream encoding header
+        headers = {
+            k: v for k, v in upstream.headers.items()
+            if k.lower() not in HOP_HEADERS and k.lower() != "content-encoding"
+        }
+        headers["X-Served-By"] = worker
+        return Response(content=upstream.content, status_code=upstream.status_code, headers=headers)
+
+    return app
+
+
+app = create_router([url.strip() for url in os.getenv("WORKER_URLS", "http://127.0.0.1:8001").split(",") if url.strip()])
@@ -0,0 +1,90 @@
+"""
+Run N server workers sharing one storage backend behind the household router.
+
+    python run_cluster.py --workers 3 --port 8000 --storage-path /tmp/quintilian-shared
+
+Workers listen on port+1 .. port+N and the router on ``port``.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _spawn(module, port, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_healthy(url, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def start_cluster(workers, port, storage_path, extra_env=None):
+    """Start the workers and router; returns (router_url, worker_urls, processes)."""
+    env = dict(os.environ, STORAGE_BACKEND="shared", STORAGE_PATH=storage_path, **(extra_env or {}))
+    worker_urls = [f"http://127.0.0.1:{port + i}" for i in range(1, workers + 1)]
+    processes = [_spawn("main", port + i, env) for i in range(1, workers + 1)]
+    processes.append(_spawn("router", port, dict(env, WORKER_URLS=",".join(worker_urls))))
+
+    router_url = f"http://127.0.0.1:{port}"
+    for url in worker_urls:
+        if not wait_healthy(f"{url}/health"):
+            stop_cluster(processes)
+            raise RuntimeError(f"Worker {url} did not become healthy")
+    if not wait_healthy(f"{router_url}/router/health"):
+        stop_cluster(processes)
+        raise RuntimeError("Router did not become healthy")
+    return router_url, worker_urls, processes
+
+
+def stop_cluster(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--storage-path", default=os.path.join(SERVER_DIR, "shared_storage"))
+    args = parser.parse_args()
+
+    router_url, worker_urls, processes = start_cluster(args.workers, args.port, args.storage_path)
+    print(f"Router: {router_url}")
+    for url in worker_urls:
+        print(f"Worker: {url}")
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_cluster(processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+The household's schedule, kept on the server.
+
+Each device used to hold the only copy in its own SQLite file and upload
+it with every question. Now the server keeps one schedule per household
+and day, and devices sync with it:
+
+* ``seed()``    - the first time a day is seen, the schedule a client sent
+  becomes the stored one; after that the client's copy is ignored
+* ``apply()``   - changes from a voice command or a device; last writer
+  wins, unless a change carries ``base_seq`` and the entry has changed
+  since, which makes it a conflict
+* ``changes_since()`` - what changed after a device's cursor
+
+Every write takes the household's next sequence number, and each entry
+row keeps the one of its latest change. A pull is then an indexed range
+scan on ``seq > cursor`` that returns each changed entry once, however
+often it moved, and the new cursor is the largest ``seq`` returned.
+
+Storage is a SQLite file (``SCHEDULE_DB``, by default next to the audio
+in ``STORAGE_PATH``), so workers sharing that directory share schedules.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = int(os.getenv("SCHEDULE_SYNC_PAGE_SIZE", "500"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedule_entry (
+    household_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    activity_name TEXT NOT NULL,
+    minute INTEGER,
+    seq INTEGER NOT NULL,
+    source TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (household_id, day, activity_name)
+);
+CREATE INDEX IF NOT EXISTS ix_schedule_entry_household_seq ON schedule_entry (household_id, seq);
+CREATE TABLE IF NOT EXISTS household_cursor (
+    household_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_TIME = re.compile(r"^\s*(\d{1,2}):(\d{2})(?::\d{2})?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE)
+
+
+def parse_minute(value):
+    """Minutes after midnight for "HH:MM" or "h:MM pm" (or a dict with "start_time"/"time"); None if unreadable."""
+    if isinstance(value, dict):
+        value = value.get("start_time") or value.get("time")
+    match = _TIME.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), (match.group(3) or "").lower()
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}" if minute is not None else None
+
+
+def _check_day(day):
+    if not isinstance(day, str) or not _DAY.match(day):
+        raise ValueError(f"Invalid day: {day!r} (expected YYYY-MM-DD)")
+    return day
+
+
+class ScheduleStore:
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by all threads, so every use holds the lock;
+        # statements are small and indexed, so this is cheaper than a pool
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # Other workers wait here instead of failing mid-write
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _next_seq(self, household_id):
+        self._conn.execute(
+            "INSERT INTO household_cursor (household_id, seq) VALUES (?, 1) "
+            "ON CONFLICT (household_id) DO UPDATE SET seq = seq + 1",
+            (household_id,)
+        )
+        return self._cursor(household_id)
+
+    def _cursor(self, household_id):
+        row = self._conn.execute(
+            "SELECT seq FROM household_cursor WHERE household_id = ?", (household_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def cursor(self, household_id):
+        with self._lock:
+            return self._cursor(household_id)
+
+    def has_day(self, household_id, day):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM schedule_entry WHERE household_id = ? AND day = ? LIMIT 1",
+                (household_id, _check_day(day))
+            ).fetchone() is not None
+
+    def schedule(self, household_id, day):
+        """{activity_name: "HH:MM"} for one day, in time order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity_name, minute FROM schedule_entry "
+                "WHERE household_id = ? AND day = ? AND minute IS NOT NULL ORDER BY minute, activity_name",
+                (household_id, _check_day(day))
+            ).fetchall()
+        return {name: format_minute(minute) for name, minute in rows}
+
+    def seed(self, household_id, day, schedule, source="seed"):
+        """Store a client's schedule for a day the server has no entries for. Returns True if it did."""
+        _check_day(day)
+        entries = {name: parse_minute(entry) for name, entry in (schedule or {}).items()}
+        entries = {name: minute for name, minute in entries.items() if minute is not None}
+        if not entries:
+            return False
+        with self._transaction() as conn:
+            if conn.execute(
+                "SELECT 1 FROM schedule_entry WHERE household_id = ? AND day = ? LIMIT 1", (household_id, day)
+            ).fetchone():
+                return False
+            for name, minute in entries.items():
+                conn.execute(
+                    "INSERT INTO schedule_entry (household_id, day, activity_name, minute, seq, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (household_id, day, name, minute, self._next_seq(household_id), source, time.time())
+                )
+        logger.info(f"Seeded {len(entries)} schedule entries for {household_id} on {day}")
+        return True
+
+    def apply(self, household_id, changes, source="device"):
+        """Apply changes ({"day", "activity_name", "time", optional "base_seq"}); "time": None removes one.
+
+        Returns {"applied": [...], "conflicts": [...], "cursor": n}.
+        """
+        applied, conflicts = [], []
+        with self._transaction() as conn:
+            for change in changes:
+                day = _check_day(change.get("day"))
+                name = change["activity_name"]
+                minute = parse_minute(change.get("time"))
+                if change.get("time") is not None and minute is None:
+                    raise ValueError(f"Unreadable time for {name}: {change.get('time')!r}")
+                row = conn.execute(
+                    "SELECT minute, seq FROM schedule_entry WHERE household_id = ? AND day = ? AND activity_name = ?",
+                    (household_id, day, name)
+                ).fetchone()
+                if change.get("base_seq") is not None and row and row[1] > change["base_seq"]:
+                    conflicts.append({"day": day, "activity_name": name, "time": format_minute(row[0]),
+                                      "seq": row[1]})
+                    continue
+                if row and row[0] == minute:
+                    continue  # Already there; don't wake up other devices
+                seq = self._next_seq(household_id)
+                conn.execute(
+                    "INSERT INTO schedule_entry (household_id, day, activity_name, minute, seq, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (household_id, day, activity_name) DO UPDATE SET "
+                    "minute = excluded.minute, seq = excluded.seq, source = excluded.source, "
+                    "updated_at = excluded.updated_at",
+                    (household_id, day, name, minute, seq, change.get("source") or source, time.time())
+                )
+                applied.append({"day": day, "activity_name": name, "time": format_minute(minute), "seq": seq,
+                                "old_time": format_minute(row[0]) if row else None})
+            cursor = self._cursor(household_id)
+        return {"applied": applied, "conflicts": conflicts, "cursor": cursor}
+
+    def changes_since(self, household_id, cursor=0, limit=None):
+        """Entries changed after ``cursor``, oldest first: {"changes", "cursor", "more", "reset"}.
+
+        A cursor ahead of the server's (its database was replaced) starts
+        over from 0 with ``"reset": True``.
+        """
+        limit = limit or SYNC_PAGE_SIZE
+        cursor = max(cursor or 0, 0)
+        with self._lock:
+            reset = cursor > self._cursor(household_id)
+            if reset:
+                cursor = 0
+            rows = self._conn.execute(
+                "SELECT day, activity_name, minute, seq, source FROM schedule_entry "
+                "WHERE household_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (household_id, cursor, limit + 1)
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "changes": [
+                {"day": day, "activity_name": name, "time": format_minute(minute), "seq": seq, "source": source}
+                for day, name, minute, seq, source in rows
+            ],
+            "cursor": rows[-1][3] if rows else cursor,
+            "more": more,
+            "reset": reset,
+        }
+
+
+def create_schedule_store(path=None):
+    path = path or os.getenv("SCHEDULE_DB") or os.path.join(os.getenv("STORAGE_PATH", "audio"), "schedules.db")
+    return ScheduleStore(path)
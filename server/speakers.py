@@ -0,0 +1,51 @@
+"""
+Processing profiles chosen by the wake word that started a request.
+
+A household can use several wake words, say one for the parents and one
+for the nanny. The client sends the one that fired in the ``X-Wake-Word``
+header, and ``WAKE_WORD_PROFILES`` maps it to a profile, e.g.
+``WAKE_WORD_PROFILES=hey_mycroft=light``. The profile picks a lighter or
+heavier path for the request: it can replace the model used for any route
+(see model_routing.py). Requests without a hint, or with an unmapped wake
+word, get ``DEFAULT_PROFILE``.
+"""
+import logging
+import os
+from typing import Optional
+
+from fastapi import Header
+
+logger = logging.getLogger(__name__)
+
+# Route -> model overrides; routes not listed use model_routing.ROUTE_MODELS
+PROFILES = {
+    "full": {"models": {}},
+    "light": {"models": {"open": os.getenv("CHAT_MODEL_LIGHT", "gpt-3.5-turbo")}},
+}
+DEFAULT_PROFILE = os.getenv("DEFAULT_PROFILE", "full")
+
+
+def _parse_profiles(value):
+    """Parse "hey_mycroft=light,alexa=full" into {"hey_mycroft": "light", "alexa": "full"}."""
+    profiles = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        wake_word, _, profile = item.partition("=")
+        profile = profile.strip()
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r} for wake word {wake_word.strip()!r}")
+        profiles[wake_word.strip()] = profile
+    return profiles
+
+
+WAKE_WORD_PROFILES = _parse_profiles(os.getenv("WAKE_WORD_PROFILES"))
+
+
+def profile_for(wake_word):
+    """The profile name and settings for a wake word (or None)."""
+    name = WAKE_WORD_PROFILES.get(wake_word or "", DEFAULT_PROFILE)
+    return {"name": name, "wake_word": wake_word, **PROFILES[name]}
+
+
+async def speaker_profile(x_wake_word: Optional[str] = Header(None)):
+    """FastAPI dependency: the processing profile for the wake word that started this request."""
+    return profile_for((x_wake_word or "").strip() or None)
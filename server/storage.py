@@ -0,0 +1,114 @@
+"""
+Storage for generated audio and cached responses.
+
+Workers only hand out keys (``/audio/<key>``) and read them back through
+the configured backend, so any worker can serve audio another one made
+as long as they share the backend:
+
+* ``local``  - a directory on this host (the default, ``audio/``)
+* ``shared`` - the same, pointed at a directory every worker mounts
+* ``redis``  - any Redis-compatible server (Redis, KeyDB, a local stand-in)
+
+Select with ``STORAGE_BACKEND`` plus ``STORAGE_PATH`` or ``REDIS_URL``.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _check_key(key):
+    if not key or "/" in key or "\\" in key or key.startswith("."):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+class FileStore:
+    """Blobs and cache entries as files in one directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache_directory = os.path.join(directory, ".cache")
+        os.makedirs(self.cache_directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, _check_key(key))
+
+    def _write(self, path, data):
+        # Write then rename so readers on other workers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, key, data):
+        self._write(self._path(key), data)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def cache_get(self, key):
+        try:
+            with open(os.path.join(self.cache_directory, _check_key(key)), "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry["expires_at"] and entry["expires_at"] < time.time():
+            return None
+        return entry["value"]
+
+    def cache_set(self, key, value, ttl=None):
+        entry = {"value": value, "expires_at": time.time() + ttl if ttl else None}
+        self._write(os.path.join(self.cache_directory, _check_key(key)), json.dumps(entry).encode("utf-8"))
+
+
+class RedisStore:
+    """Blobs and cache entries in a Redis-compatible server."""
+
+    def __init__(self, url, prefix="quintilian:"):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("STORAGE_BACKEND=redis needs the redis package: pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def put(self, key, data):
+        self.client.set(f"{self.prefix}blob:{_check_key(key)}", data)
+
+    def get(self, key):
+        return self.client.get(f"{self.prefix}blob:{_check_key(key)}")
+
+    def exists(self, key):
+        return bool(self.client.exists(f"{self.prefix}blob:{_check_key(key)}"))
+
+    def cache_get(self, key):
+        value = self.client.get(f"{self.prefix}cache:{_check_key(key)}")
+        return json.loads(value) if value is not None else None
+
+    def cache_set(self, key, value, ttl=None):
+        self.client.set(f"{self.prefix}cache:{_check_key(key)}", json.dumps(value), ex=ttl)
+
+
+def create_store(backend=None, path=None, redis_url=None):
+    backend = backend or os.getenv("STORAGE_BACKEND", "local")
+    if backend == "local":
+        return FileStore(path or os.getenv("STORAGE_PATH", "audio"))
+    if backend == "shared":
+        path = path or os.getenv("STORAGE_PATH")
+        if not path:
+            raise ValueError("STORAGE_BACKEND=shared needs STORAGE_PATH set to a directory every worker mounts")
+        return FileStore(path)
+    if backend == "redis":
+        return RedisStore(redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,290 @@
+"""
+Per-household admission, fair scheduling and usage accounting.
+
+Every request names its household in the ``X-Household-ID`` header and
+proves it with that household's ``X-Household-Key`` (``HOUSEHOLD_KEYS``);
+without keys configured only the default household is served. The
+all-household views (/tenants/usage) need ``Authorization: Bearer
+<ADMIN_TOKEN>``. A token
+bucket per household caps its request rate, and the LLM/TTS/Whisper
+stages sit behind weighted fair queues so a busy household waits its turn
+instead of starving everyone else.
+"""
+import asyncio
+import contextvars
+import heapq
+import hmac
+import itertools
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOUSEHOLD = "default"
+
+
+def _parse_weights(value):
+    """Parse "home-a=2,home-b=1" into {"home-a": 2.0, "home-b": 1.0}."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def _parse_keys(value):
+    """Parse "home-a=secret,home-b=other" into {"home-a": "secret", "home-b": "other"}."""
+    keys = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, key = item.partition("=")
+        if key.strip():
+            keys[name.strip()] = key.strip()
+    return keys
+
+
+HOUSEHOLD_KEYS = _parse_keys(os.getenv("HOUSEHOLD_KEYS"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Unset: the admin views are off
+HOUSEHOLD_WEIGHTS = _parse_weights(os.getenv("HOUSEHOLD_WEIGHTS"))
+HOUSEHOLD_RATE_PER_MINUTE = float(os.getenv("HOUSEHOLD_RATE_PER_MINUTE", "30"))
+HOUSEHOLD_BURST = float(os.getenv("HOUSEHOLD_BURST", "10"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+ASR_CONCURRENCY = int(os.getenv("ASR_CONCURRENCY", "4"))
+
+# Latency samples kept per household and stage for percentiles
+LATENCY_WINDOW = 500
+
+# Per-household rate-limit and queue entries kept before idle ones are swept
+IDLE_SWEEP_SIZE = 1024
+
+
+# Stage durations of the request being handled, reported as Server-Timing
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timing():
+    """Start collecting stage durations for the current request and return them."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings):
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def authenticate(household_id, key):
+    """True if ``key`` is the household's key, or no keys are configured and it is the default household."""
+    if not HOUSEHOLD_KEYS:
+        return household_id == DEFAULT_HOUSEHOLD
+    expected = HOUSEHOLD_KEYS.get(household_id)
+    return expected is not None and hmac.compare_digest(expected.encode("utf-8"), (key or "").encode("utf-8"))
+
+
+def household_weight(household_id):
+    return HOUSEHOLD_WEIGHTS.get(household_id, 1.0)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, burst):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def idle(self, now):
+        """True once the bucket has refilled: forgetting it changes nothing."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def take(self, cost=1.0):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class FairScheduler:
+    """Weighted fair queue in front of a stage with bounded concurrency.
+
+    Each request gets a virtual finish tag of
+    ``max(virtual_time, household's last tag) + cost / weight``; when a slot
+    frees up the smallest tag runs next. A household that floods the queue
+    pushes only its own tags further out.
+    """
+
+    def __init__(self, name, concurrency):
+        self.name = name
+        self.concurrency = concurrency
+        self._active = 0
+        self._virtual_time = 0.0
+        self._last_tag = {}
+        self._sweep_at = IDLE_SWEEP_SIZE
+        self._waiting = []  # (tag, seq, future)
+        self._seq = itertools.count()
+
+    @property
+    def queued(self):
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    @asynccontextmanager
+    async def slot(self, household_id, cost=1.0):
+        tag = max(self._virtual_time, self._last_tag.get(household_id, 0.0)) + cost / household_weight(household_id)
+        self._last_tag[household_id] = tag
+        if len(self._last_tag) > self._sweep_at:
+            self._forget_idle()
+
+        if self._active < self.concurrency and not self.queued:
+            self._active += 1
+            self._virtual_time = tag
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (tag, next(self._seq), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # Slot was handed over just as we were cancelled
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _forget_idle(self):
+        """Drop households whose last tag the virtual time has passed; max() would ignore it anyway."""
+        self._last_tag = {h: tag for h, tag in self._last_tag.items() if tag > self._virtual_time}
+        self._sweep_at = max(IDLE_SWEEP_SIZE, 2 * len(self._last_tag))
+
+    def _release(self):
+        self._active -= 1
+        while self._waiting and self._active < self.concurrency:
+            tag, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self._active += 1
+            self._virtual_time = tag
+            future.set_result(None)
+
+
+def percentile(samples, pct):
+    """The ``pct`` percentile of ``samples`` (nearest rank), or None if there are none."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class UsageTracker:
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.latencies = defaultdict(lambda: defaultdict(lambda: deque(maxlen=LATENCY_WINDOW)))
+
+    def add(self, household_id, counter, amount):
+        self.counters[household_id][counter] += amount
+
+    def observe(self, household_id, stage, seconds):
+        self.latencies[household_id][stage].append(seconds)
+
+    def snapshot(self):
+        households = set(self.requests) | set(self.rejected) | set(self.counters) | set(self.latencies)
+        return {
+            household_id: {
+                "requests": self.requests[household_id],
+                "rate_limited": self.rejected[household_id],
+                "usage": dict(self.counters[household_id]),
+                "latency": {
+                    stage: {
+                        "count": len(samples),
+                        "p50": percentile(samples, 50),
+                        "p95": percentile(samples, 95),
+                        "p99": percentile(samples, 99),
+                    }
+                    for stage, samples in self.latencies[household_id].items()
+                },
+            }
+            for household_id in sorted(households)
+        }
+
+
+class Tenants:
+    def __init__(self):
+        self.buckets = {}
+        self._sweep_at = IDLE_SWEEP_SIZE
+        self.usage = UsageTracker()
+        self.queues = {
+            "asr": FairScheduler("asr", ASR_CONCURRENCY),
+            "llm": FairScheduler("llm", LLM_CONCURRENCY),
+            "tts": FairScheduler("tts", TTS_CONCURRENCY),
+        }
+
+    def admit(self, household_id):
+        """Count a request against the household's rate limit; False if over it."""
+        bucket = self.buckets.get(household_id)
+        if bucket is None:
+            if len(self.buckets) >= self._sweep_at:
+                self._forget_idle()
+            bucket = self.buckets[household_id] = TokenBucket(HOUSEHOLD_RATE_PER_MINUTE / 60.0, HOUSEHOLD_BURST)
+        if not bucket.take():
+            self.usage.rejected[household_id] += 1
+            return False
+        self.usage.requests[household_id] += 1
+        return True
+
+    def _forget_idle(self):
+        """Drop full buckets; a new one starts full too."""
+        now = time.monotonic()
+        self.buckets = {h: bucket for h, bucket in self.buckets.items() if not bucket.idle(now)}
+        self._sweep_at = max(IDLE_SWEEP_SIZE, 2 * len(self.buckets))
+
+    @asynccontextmanager
+    async def stage(self, household_id, stage, cost=1.0):
+        """Wait for a fair turn at ``stage`` and record how long the work took."""
+        queued_at = time.perf_counter()
+        async with self.queues[stage].slot(household_id, cost):
+            started = time.perf_counter()
+            self._observe(household_id, f"{stage}_queue", started - queued_at)
+            try:
+                yield
+            finally:
+                self._observe(household_id, stage, time.perf_counter() - started)
+
+    def _observe(self, household_id, stage, seconds):
+        self.usage.observe(household_id, stage, seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+tenants = Tenants()
+
+
+async def household(x_household_id: Optional[str] = Header(None), x_household_key: Optional[str] = Header(None)):
+    """FastAPI dependency: authenticate the household and enforce its rate limit."""
+    household_id = (x_household_id or DEFAULT_HOUSEHOLD).strip() or DEFAULT_HOUSEHOLD
+    if not authenticate(household_id, x_household_key):
+        logger.warning(f"Rejected request for household {household_id}: unknown household or wrong key")
+        raise HTTPException(status_code=401, detail="Unknown household or wrong X-Household-Key")
+    if not tenants.admit(household_id):
+        logger.warning(f"Rate limit exceeded for household {household_id}")
+        raise HTTPException(status_code=429, detail=f"Rate limit exceeded for household {household_id}")
+    return household_id
+
+
+async def admin(authorization: Optional[str] = Header(None)):
+    """FastAPI dependency for the all-household views: ``Authorization: Bearer <ADMIN_TOKEN>``."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if not ADMIN_TOKEN or scheme.lower() != "bearer" or not hmac.compare_digest(
+        ADMIN_TOKEN.encode("utf-8"), token.strip().encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
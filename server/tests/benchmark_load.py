@@ -0,0 +1,270 @@
+"""
+Load test for /process-audio and /process-text against fake upstreams.
+
+Starts ``fake_backends`` and ``main`` as local uvicorn processes, drives
+the endpoints at a fixed concurrency and reports throughput plus
+p50/p95/p99 per stage (from the server's Server-Timing header). A /health
+probe runs alongside the load: if its latency climbs with the load,
+something is blocking the event loop.
+
+Run from the server directory:
+    python tests/benchmark_load.py --requests 200 --concurrency 16 --latency asr=300,llm=800,tts=200
+
+``--wire msgpack`` sends the context and asks for answers as MessagePack
+(see wire.py).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import wave
+from collections import defaultdict
+
+import httpx
+import msgpack
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_CONTEXT = {
+    "family": {"child_name": "Emma", "child_age": 2.5, "preferences": {"favorite_activities": ["art", "outdoor_play"]}},
+    "daily_context": {
+        "schedule": {
+            "wake_up": "07:00", "breakfast": "07:30", "morning_play": "08:00", "snack": "10:00",
+            "lunch": "12:00", "nap": "13:00", "afternoon_play": "15:00", "dinner": "18:00", "bedtime": "19:30",
+        },
+        "adjustments": {},
+        "mood_notes": None,
+    },
+    "recent_activities": [
+        {"activity_name": "breakfast", "start_time": "2025-05-16T07:30:00", "end_time": "2025-05-16T08:00:00",
+         "status": "completed", "notes": None},
+    ],
+}
+
+
+# Households the harness's servers serve (HOUSEHOLD_KEYS); requests send the matching key
+HOUSEHOLDS = [f"home-{i}" for i in range(64)] + ["batch-home", "bulk-home", "retry-home"]
+
+
+ADMIN_TOKEN = "load-test-admin"
+ADMIN_HEADERS = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+
+
+def household_headers(household_id):
+    return {"X-Household-ID": household_id, "X-Household-Key": f"key-{household_id}"}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _silent_wav(seconds=2.0, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def _spawn(module, port, cwd, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_healthy(url, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def start_servers(storage_path, latency="", jitter_ms=0, seed=0, env=None):
+    """Start the fake upstreams and the server; returns (server_url, processes).
+
+    ``env`` overrides the server's environment, e.g. to turn rate limits back on.
+    """
+    fake_port, server_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    processes = [_spawn("fake_backends", fake_port, TESTS_DIR, dict(
+        os.environ, FAKE_LATENCY_MS=latency, FAKE_JITTER_MS=str(jitter_ms), FAKE_SEED=str(seed)
+    ))]
+    processes.append(_spawn("main", server_port, SERVER_DIR, {
+        **os.environ,
+        "OPENAI_API_KEY": "load-test",
+        "ELEVENLABS_API_KEY": "load-test",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "ELEVENLABS_BASE_URL": fake_url,
+        "STORAGE_PATH": storage_path,
+        "HOUSEHOLD_RATE_PER_MINUTE": "1000000",
+        "HOUSEHOLD_BURST": "1000000",
+        "HOUSEHOLD_KEYS": ",".join(f"{h}=key-{h}" for h in HOUSEHOLDS),
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        **(env or {}),
+    }))
+    server_url = f"http://127.0.0.1:{server_port}"
+    if not (_wait_healthy(f"{fake_url}/calls") and _wait_healthy(f"{server_url}/health")):
+        stop_servers(processes)
+        raise RuntimeError("Servers did not start")
+    return server_url, processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=10)
+
+
+def _parse_server_timing(header):
+    timings = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, duration = part.partition(";dur=")
+        timings[name] = float(duration) / 1000.0
+    return timings
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_load(server_url, endpoint, total, concurrency, households=4, texts=None, wire="json"):
+    """Drive one endpoint; returns a report dict."""
+    texts = texts or ["Delay nap 30 minutes", "What should Emma do after lunch?"]
+    audio = _silent_wav()
+    context_json = json.dumps(SAMPLE_CONTEXT)
+    packed = wire == "msgpack"
+    stages = defaultdict(list)
+    content_types = defaultdict(int)
+    client_latency = []
+    health_latency = []
+    errors = 0
+    counter = iter(range(total))
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=server_url, timeout=120) as http:
+        async def one_request(i):
+            headers = household_headers(f"home-{i % households}")
+            if packed:
+                headers["Accept"] = "application/msgpack"
+            if endpoint == "process-audio":
+                files = {"audio_file": ("audio.wav", audio, "audio/wav")}
+                if packed:
+                    files["packed_context"] = ("context.msgpack", msgpack.packb(SAMPLE_CONTEXT), "application/msgpack")
+                return await http.post(
+                    "/process-audio",
+                    files=files,
+                    data={} if packed else {"context": context_json},
+                    headers=headers,
+                )
+            body = {"text": texts[i % len(texts)], "context": SAMPLE_CONTEXT}
+            if packed:
+                return await http.post(
+                    "/process-text",
+                    content=msgpack.packb(body),
+                    headers={**headers, "Content-Type": "application/msgpack"},
+                )
+            return await http.post("/process-text", json=body, headers=headers)
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await one_request(i)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                client_latency.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                content_types[response.headers.get("content-type")] += 1
+                for stage, seconds in _parse_server_timing(response.headers.get("server-timing")).items():
+                    stages[stage].append(seconds)
+
+        async def health_probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await http.get("/health")
+                health_latency.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        probe = asyncio.create_task(health_probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": (total - errors) / elapsed if elapsed else 0.0,
+        "latency": {"client": client_latency, "health_probe": health_latency, **stages},
+        "content_types": dict(content_types),
+    }
+
+
+def print_report(report):
+    print(f"\n/{report['endpoint']}: {report['requests']} requests at concurrency {report['concurrency']}")
+    print(f"  throughput: {report['throughput']:.1f} req/s, errors: {report['errors']}, elapsed: {report['elapsed']:.2f}s")
+    print(f"  {'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, samples in report["latency"].items():
+        if not samples:
+            continue
+        p50, p95, p99 = (percentile(samples, p) * 1000 for p in (50, 95, 99))
+        print(f"  {stage:<14}{len(samples):>7}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--households", type=int, default=4)
+    parser.add_argument("--latency", default="asr=300,llm=800,tts=200", help="Per-backend latency in ms")
+    parser.add_argument("--jitter", type=float, default=50, help="Latency jitter in ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--endpoint", choices=["process-audio", "process-text", "both"], default="both")
+    parser.add_argument("--wire", choices=["json", "msgpack"], default="json")
+    args = parser.parse_args()
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as storage_path:
+        server_url, processes = start_servers(storage_path, args.latency, args.jitter, args.seed)
+        try:
+            endpoints = ["process-audio", "process-text"] if args.endpoint == "both" else [args.endpoint]
+            for endpoint in endpoints:
+                report = asyncio.run(run_load(
+                    server_url, endpoint, args.requests, args.concurrency, args.households, wire=args.wire
+                ))
+                print_report(report)
+        finally:
+            stop_servers(processes)
+
+
+if __name__ == "__main__":
+    main()
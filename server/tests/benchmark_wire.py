@@ -0,0 +1,110 @@
+"""
+Size and encode/decode time of JSON vs. MessagePack for the payloads the
+client and server exchange (see wire.py).
+
+Payloads: the load test's context, a full day's context (every activity
+logged, notes, summary), a /process-text answer, a /schedule/sync page
+and a /process-text/batch answer.
+
+Run from the server directory:
+    python tests/benchmark_wire.py [iterations]
+"""
+import json
+import os
+import sys
+import time
+
+import msgpack
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_load import SAMPLE_CONTEXT
+
+DAY = ["wake_up", "breakfast", "morning_play", "park", "snack", "lunch", "nap", "afternoon_play", "dinner",
+       "bath_time", "bedtime"]
+
+
+def full_context():
+    recent = [
+        {"activity_name": name, "start_time": f"2026-03-02T{7 + i:02d}:00:00",
+         "end_time": f"2026-03-02T{7 + i:02d}:40:00", "status": "completed",
+         "notes": "Ate well, played with the blocks and the big red ball" if i % 3 == 0 else None}
+        for i, name in enumerate(DAY[:10])
+    ]
+    return {
+        "local_time": "2026-03-02T17:05",
+        "family": {"child_name": "Emma", "child_age": 3,
+                   "preferences": {"favorite_activities": ["art", "outdoor_play", "music"], "allergies": ["peanuts"],
+                                   "nap_routine": "white noise, two books"}},
+        "daily_context": {
+            "schedule": {name: f"{7 + i:02d}:{(i * 15) % 60:02d}" for i, name in enumerate(DAY)},
+            "adjustments": {"nap": {"original_time": "13:00", "new_time": "13:30", "timestamp": "2026-03-02T12:40:00"}},
+            "mood_notes": "A bit tired after the park",
+        },
+        "recent_activities": recent,
+        "today_summary": {"activity_count": 10, "completed_count": 9, "skipped_count": 1, "in_progress_count": 0,
+                          "total_minutes": 412.5, "completion_rate": 0.9},
+    }
+
+
+def text_answer():
+    return {"text": "OK", "schedule": full_context()["daily_context"]["schedule"], "schedule_cursor": 4182,
+            "adjustments": {"nap": {"original_time": "13:00", "new_time": "13:30",
+                                    "timestamp": "2026-03-02T12:40:00.123456"}},
+            "function_call": {"name": "update_schedule", "arguments": {"activity_name": "nap", "new_time": "13:30"},
+                              "status": "success"}}
+
+
+def sync_page(size=500):
+    return {"changes": [{"day": f"2026-03-{1 + i // 11 % 28:02d}", "activity_name": DAY[i % 11],
+                         "time": f"{7 + i % 11:02d}:{i % 4 * 15:02d}", "seq": 1000 + i, "source": "voice"}
+                        for i in range(size)],
+            "cursor": 1000 + size - 1, "more": True, "reset": False}
+
+
+def batch_answer(size=100):
+    return {"results": [{"index": i, "result": text_answer() if i % 4 else None,
+                         "error": None if i % 4 else "Unreadable time for nap: '13:99'"} for i in range(size)],
+            "succeeded": size - size // 4, "failed": size // 4}
+
+
+CODECS = {
+    "json": (lambda value: json.dumps(value).encode("utf-8"), json.loads),
+    "json compact": (lambda value: json.dumps(value, separators=(",", ":")).encode("utf-8"), json.loads),
+    "msgpack": (lambda value: msgpack.packb(value, use_bin_type=True), lambda data: msgpack.unpackb(data, raw=False)),
+}
+
+
+def per_call(function, argument, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payloads = {
+        "load test context": SAMPLE_CONTEXT,
+        "full day context": full_context(),
+        "text answer": text_answer(),
+        "sync page (500)": sync_page(),
+        "batch answer (100)": batch_answer(),
+    }
+    print(f"{'payload':<20}{'codec':<14}{'bytes':>8}{'size':>7}{'encode us':>11}{'decode us':>11}")
+    for name, payload in payloads.items():
+        # Big payloads get fewer iterations so each row takes about as long
+        runs = max(10, iterations * 2000 // len(json.dumps(payload)))
+        baseline = None
+        for codec, (encode, decode) in CODECS.items():
+            data = encode(payload)
+            assert decode(data) == payload
+            baseline = baseline or len(data)
+            encode_s = per_call(encode, payload, runs)
+            decode_s = per_call(decode, data, runs)
+            print(f"{name:<20}{codec:<14}{len(data):>8}{len(data) / baseline:>7.0%}"
+                  f"{encode_s * 1e6:>11.1f}{decode_s * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Server modules import each other flat (``from tenancy import ...``), as when run from server/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,115 @@
+"""
+Deterministic local stand-ins for Whisper, chat completions and ElevenLabs.
+
+Point the server at it with ``OPENAI_BASE_URL=<url>/v1`` and
+``ELEVENLABS_BASE_URL=<url>``. Latency and jitter are per backend so a
+load test can model a slow LLM next to fast TTS:
+
+    FAKE_LATENCY_MS="asr=300,llm=800,tts=200" FAKE_JITTER_MS=50 \\
+        uvicorn fake_backends:app --port 9000
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+DEFAULT_TRANSCRIPT = "Delay nap 30 minutes"
+
+
+def _parse_latency(value):
+    latency = {"asr": 0.0, "llm": 0.0, "tts": 0.0}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, ms = item.partition("=")
+        latency[name.strip()] = float(ms) / 1000.0
+    return latency
+
+
+class FakeBackends:
+    def __init__(self, latency=None, jitter=0.0, seed=0, transcript=DEFAULT_TRANSCRIPT):
+        self.latency = latency or {"asr": 0.0, "llm": 0.0, "tts": 0.0}
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.transcript = transcript
+        self.calls = {"asr": 0, "llm": 0, "tts": 0}
+
+    async def delay(self, backend):
+        self.calls[backend] += 1
+        seconds = self.latency.get(backend, 0.0)
+        if self.jitter:
+            seconds += self.random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def chat_completion(self, body):
+        """Answer schedule changes with an update_schedule call, anything else with text."""
+        user_message = next(
+            (m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), ""
+        )
+        message = {"role": "assistant", "content": "OK"}
+        match = re.search(r"(?:delay|move|update)\s+(\w+)", user_message.lower())
+        if match and body.get("functions"):
+            minutes = re.search(r"(\d+)\s*minutes", user_message.lower())
+            new_time = f"13:{int(minutes.group(1)) if minutes else 0:02d}"
+            message = {
+                "role": "assistant",
+                "content": None,
+                "function_call": {
+                    "name": "update_schedule",
+                    "arguments": json.dumps({"activity_name": match.group(1), "new_time": new_time}),
+                },
+            }
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        return {
+            "id": f"chatcmpl-fake-{self.calls['llm']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 10, "total_tokens": prompt_tokens + 10},
+        }
+
+
+def create_app(backends=None):
+    backends = backends or FakeBackends(
+        latency=_parse_latency(os.getenv("FAKE_LATENCY_MS")),
+        jitter=float(os.getenv("FAKE_JITTER_MS", "0")) / 1000.0,
+        seed=int(os.getenv("FAKE_SEED", "0")),
+        transcript=os.getenv("FAKE_TRANSCRIPT", DEFAULT_TRANSCRIPT),
+    )
+    app = FastAPI()
+    app.state.backends = backends
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        await request.body()
+        await backends.delay("asr")
+        return {"text": backends.transcript}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await backends.delay("llm")
+        return backends.chat_completion(body)
+
+    @app.post("/v1/text-to-speech/{voice_id}")
+    @app.post("/v1/text-to-speech/{voice_id}/stream")
+    async def text_to_speech(voice_id: str, request: Request):
+        body = await request.json()
+        await backends.delay("tts")
+        # Deterministic bytes per phrase, roughly the size of a short clip
+        seed = sum(body.get("text", "").encode("utf-8")) % 251
+        return Response(content=bytes((seed + i) % 256 for i in range(4096)), media_type="audio/mpeg")
+
+    @app.get("/calls")
+    async def calls():
+        return backends.calls
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,70 @@
+import json
+
+from context_compactor import build_system_prompt, compact_activities, compact_schedule, estimate_tokens
+
+SCHEDULE = {
+    "wake_up": "07:00", "breakfast": "07:30", "morning_play": "08:00", "snack": "10:00", "lunch": "12:00",
+    "nap": "13:00", "afternoon_play": "15:00", "dinner": "18:00", "bath_time": "19:00", "bedtime": "19:30",
+}
+
+
+def busy_day(activities=120):
+    return {
+        "local_time": "2025-05-16T12:40",
+        "family": {"child_name": "Emma", "child_age": 2.5,
+                   "preferences": {"favorite_activities": ["art", "outdoor_play"], "foods": ["pasta"] * 20}},
+        "daily_context": {"schedule": SCHEDULE, "adjustments": {}, "mood_notes": None},
+        "recent_activities": [
+            {"activity_name": ["snack", "diaper", "play", "water"][i % 4],
+             "start_time": f"2025-05-16T{6 + i * 6 // 60:02d}:{i * 6 % 60:02d}:00",
+             "end_time": None, "status": "completed", "notes": None}
+            for i in range(activities)
+        ],
+    }
+
+
+def test_token_estimate_is_close_to_gpt_tokenization():
+    # "Delay nap by 30 minutes, please." is 8 GPT-4 tokens
+    assert 7 <= estimate_tokens("Delay nap by 30 minutes, please.") <= 10
+    assert estimate_tokens(json.dumps(SCHEDULE, indent=2)) > estimate_tokens(json.dumps(SCHEDULE, separators=(",", ":")))
+
+
+def test_schedule_window_keeps_now_next_and_named_activities():
+    kept, skipped = compact_schedule(SCHEDULE, now_minute=12 * 60 + 40, keep={"bedtime"}, window_minutes=60)
+    assert kept == {"lunch": "12:00", "nap": "13:00", "bedtime": "19:30"}
+    assert skipped == {"earlier": 4, "later": 3}
+
+    recent, summary = compact_activities(busy_day(10)["recent_activities"], detail=3)
+    assert [name for name, _, _ in recent] == ["diaper", "snack", "water"]
+    assert summary == {"play": {"completed": 2}, "diaper": {"completed": 2}, "snack": {"completed": 2},
+                       "water": {"completed": 1}}
+
+
+def test_prompt_stays_within_budget_as_history_grows():
+    _, half_tokens = build_system_prompt(busy_day(60), "Move bedtime to 8pm")
+    large, large_tokens = build_system_prompt(busy_day(120), "Move bedtime to 8pm")
+    assert large_tokens <= 500
+    assert abs(large_tokens - half_tokens) < 5  # History is summarized, not listed
+    assert '"bedtime":"19:30"' in large and '"nap":"13:00"' in large
+    assert "update_schedule" in large and "Local time: 12:40" in large
+
+    tight, tight_tokens = build_system_prompt(busy_day(120), "Move bedtime to 8pm", budget=200)
+    assert tight_tokens < large_tokens
+    assert '"bedtime":"19:30"' in tight
+
+    assert build_system_prompt(None, "hi")[0].startswith("You are Quintilian")
+
+    # Clients with rollups send today's totals instead of the whole history
+    day = busy_day(5)
+    day["today_summary"] = {"count": 40, "activities": {"nap": {"count": 1, "completed": 1, "skipped": 0},
+                                                        "snack": {"count": 3, "completed": 2, "skipped": 1}}}
+    prompt, _ = build_system_prompt(day, "How is today going?")
+    assert 'Today\'s activities (counts by status): {"nap":{"completed":1},"snack":{"completed":2,"skipped":1}}' in prompt
+
+
+def test_prompt_over_budget_keeps_only_named_and_next_activities(caplog):
+    prompt, tokens = build_system_prompt(busy_day(120), "Move bedtime to 8pm", budget=10)
+    assert tokens > 10
+    assert 'Schedule (HH:MM) - 5 earlier, 3 later not shown: {"nap":"13:00","bedtime":"19:30"}' in prompt
+    assert "Recent activities: none." in prompt
+    assert "over the budget of 10" in caplog.text
@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+
+from eventlog import Event, JsonFormatter, get_event_logger, redact
+
+
+@pytest.fixture
+def payload_logger():
+    logger = logging.getLogger("quintilian.payload")
+    yield logger
+    logger.setLevel(logging.NOTSET)
+
+
+def test_disabled_events_are_never_formatted(caplog, payload_logger):
+    caplog.set_level(logging.INFO)
+    caplog.handler.setLevel(logging.NOTSET)  # Like the root handler: loggers decide
+    calls = []
+    log = get_event_logger("test.eventlog")
+
+    log.debug("context", category="payload", context=lambda: calls.append(1) or {"big": "x" * 10000})
+    assert calls == []
+    assert not caplog.records
+
+    # Turning the category up on its own is enough to see it
+    payload_logger.setLevel(logging.DEBUG)
+    log.debug("context", category="payload", context=lambda: calls.append(1) or {"big": "x"})
+    assert calls == [1]
+    assert caplog.records[0].name == "quintilian.payload"
+    assert caplog.records[0].getMessage() == 'context context={"big":"x"}'
+
+
+def test_sampling_keeps_one_in_n(caplog):
+    caplog.set_level(logging.DEBUG)
+    log = get_event_logger("test.eventlog")
+    for level in range(10):
+        log.debug("audio.level", category="audio", every=4, level=level)
+    assert [r.args[0].fields["level"] for r in caplog.records] == [0, 4, 8]
+    assert "sampled=4" in caplog.records[0].getMessage()
+
+
+def test_redact_masks_secrets_and_truncates():
+    value = {
+        "family": {"child_name": "Emma", "child_age": 2},
+        "authorization": "Bearer abc",
+        "transcript": "a" * 500,
+        "audio": b"\x00" * 2048,
+        "activities": list(range(30)),
+    }
+    safe = redact(value, max_chars=50)
+    assert safe["family"] == {"child_name": "[redacted]", "child_age": 2}
+    assert safe["authorization"] == "[redacted]"
+    assert safe["transcript"] == "a" * 50 + "... (+450 chars)"
+    assert safe["audio"] == "<2048 bytes>"
+    assert len(safe["activities"]) == 21 and safe["activities"][-1] == "... +10 items"
+
+
+def test_json_formatter_writes_event_fields():
+    record = logging.LogRecord(
+        "main", logging.INFO, __file__, 1, "%s", (Event("tts.stored", {"chars": 2, "token": "s3cret"}),), None
+    )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["event"] == "tts.stored"
+    assert entry["chars"] == 2
+    assert entry["token"] == "[redacted]"
+    assert entry["level"] == "INFO"
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import httpx
+import msgpack
+import pytest
+
+from benchmark_load import ADMIN_HEADERS, SAMPLE_CONTEXT, _silent_wav, household_headers, run_load, start_servers, stop_servers
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    url, processes = start_servers(str(tmp_path / "storage"), latency="asr=20,llm=40,tts=10", jitter_ms=5)
+    try:
+        yield url
+    finally:
+        stop_servers(processes)
+
+
+@pytest.mark.parametrize("endpoint,wire", [
+    ("process-audio", "json"), ("process-text", "json"), ("process-audio", "msgpack"), ("process-text", "msgpack")
+])
+def test_load_harness_reports_stages(server_url, endpoint, wire):
+    report = asyncio.run(run_load(server_url, endpoint, total=12, concurrency=4, wire=wire))
+
+    assert report["errors"] == 0
+    assert report["content_types"] == {"application/msgpack" if wire == "msgpack" else "application/json": 12}
+    assert report["throughput"] > 0
+    assert len(report["latency"]["llm"]) == 12
+    assert len(report["latency"]["total"]) == 12
+    if endpoint == "process-audio":
+        assert len(report["latency"]["asr"]) == 12
+
+    # Schedule commands go to the small model; questions to the big one
+    routes = httpx.get(f"{server_url}/routes/usage", headers=ADMIN_HEADERS).json()
+    assert routes["command"]["calls"] == (12 if endpoint == "process-audio" else 6)
+    assert routes["command"]["model:gpt-3.5-turbo"] == routes["command"]["calls"]
+    assert routes.get("open", {}).get("escalated", 0) == 0
+
+    # The change is in the household's stored schedule, for its other devices to pull
+    sync = httpx.get(f"{server_url}/schedule/sync", headers=household_headers("home-0")).json()
+    nap = [change for change in sync["changes"] if change["activity_name"] == "nap"]
+    assert [change["time"] for change in nap] == ["13:30"]
+    assert sync["cursor"] == max(change["seq"] for change in sync["changes"])
+
+    # Only with the household's key; all households only with the admin token
+    assert httpx.get(f"{server_url}/tenants/usage", headers=household_headers("home-0")).status_code == 401
+    for headers in [{"X-Household-ID": "home-0"}, {**household_headers("home-0"), "X-Household-Key": "guess"}]:
+        assert httpx.get(f"{server_url}/schedule/sync", headers=headers).status_code == 401
+
+
+def test_text_batch_answers_in_order_with_per_item_errors(server_url):
+    texts = ["Delay nap 30 minutes", "What should Emma do after lunch?", "Delay nap 99 minutes"] * 4
+    response = httpx.post(
+        f"{server_url}/process-text/batch",
+        json={"texts": texts, "context": SAMPLE_CONTEXT, "concurrency": 4},
+        headers=household_headers("batch-home"),
+        timeout=60,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["index"] for item in body["results"]] == list(range(12))
+    assert body["succeeded"] == 8 and body["failed"] == 4
+    for item, text in zip(body["results"], texts):
+        if "99" in text:  # "13:99" isn't a time: that text fails, the rest of the batch doesn't
+            assert item["result"] is None and "Unreadable time" in item["error"]
+        elif text.startswith("Delay"):
+            assert item["result"]["function_call"]["status"] == "success"
+            assert item["result"]["schedule"]["nap"] == "13:30"
+        else:
+            assert item["result"]["text"] == "OK" and item["error"] is None
+
+    too_many = httpx.post(f"{server_url}/process-text/batch", json={"texts": ["hi"] * 501, "context": {}},
+                          headers=household_headers("batch-home"))
+    assert too_many.status_code == 413
+
+
+def test_resent_question_is_answered_once(server_url):
+    def ask():
+        return httpx.post(
+            f"{server_url}/process-audio",
+            files={"audio_file": ("audio.wav", _silent_wav(), "audio/wav")},
+            data={"context": json.dumps(SAMPLE_CONTEXT)},
+            headers={**household_headers("retry-home"), "Idempotency-Key": "question-1"},
+            timeout=60,
+        )
+
+    first, again = ask(), ask()  # The device timed out and sent it again
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    usage = httpx.get(f"{server_url}/tenants/usage", headers=ADMIN_HEADERS).json()["households"]["retry-home"]
+    assert usage["latency"]["llm"]["count"] == 1
+
+
+def test_context_must_be_an_object(server_url):
+    for files, data in [
+        ({"packed_context": ("context.msgpack", msgpack.packb(json.dumps(SAMPLE_CONTEXT)), "application/msgpack")}, {}),
+        ({}, {"context": json.dumps(json.dumps(SAMPLE_CONTEXT))}),
+    ]:
+        response = httpx.post(
+            f"{server_url}/process-audio",
+            files={"audio_file": ("audio.wav", _silent_wav(), "audio/wav"), **files},
+            data=data, headers=household_headers("home-1"), timeout=60,
+        )
+        assert response.status_code == 400 and "object" in response.json()["detail"]
+
+
+def test_text_batch_counts_each_text_against_the_rate_limit(tmp_path):
+    url, processes = start_servers(str(tmp_path / "storage"), env={
+        "HOUSEHOLD_RATE_PER_MINUTE": "0.001", "HOUSEHOLD_BURST": "5"
+    })
+    try:
+        batch = {"texts": ["What should Emma do after lunch?"] * 8, "context": SAMPLE_CONTEXT}
+        headers = household_headers("bulk-home")
+        body = httpx.post(f"{url}/process-text/batch", json=batch, headers=headers, timeout=60).json()
+        assert [item["status"] for item in body["results"]] == [200] * 5 + [429] * 3
+        assert body["failed"] == 3
+
+        # Nothing left: the next batch is turned away whole
+        assert httpx.post(f"{url}/process-text/batch", json=batch, headers=headers, timeout=60).status_code == 429
+        usage = httpx.get(f"{url}/tenants/usage", headers=ADMIN_HEADERS).json()["households"]["bulk-home"]
+        assert usage["latency"]["llm"]["count"] == 5 and usage["requests"] == 5 and usage["rate_limited"] == 4  # Three texts, then the batch
+    finally:
+        stop_servers(processes)
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from model_routing import RouteStats, choose_route, classify, escalation, usable
+
+
+@pytest.mark.parametrize("text", [
+    "Delay nap 30 minutes",
+    "move lunch to 12:15",
+    "Push bath time back half an hour",
+    "postpone snack",
+])
+def test_schedule_changes_are_commands(text):
+    assert classify(text, ["nap", "lunch", "bath_time", "snack"]) == "command"
+
+
+@pytest.mark.parametrize("text", [
+    "What should Emma do after lunch?",
+    "Why won't she nap?",
+    "Should I move nap earlier because she keeps waking up cranky in the afternoon?",
+    "Change of plans, we are going to grandma's",
+])
+def test_open_questions_go_to_the_big_model(text):
+    assert classify(text, ["nap", "lunch"]) == "open"
+
+
+def test_profiles_override_route_models_and_stats_add_up():
+    light = {"models": {"open": "gpt-3.5-turbo"}}
+    assert choose_route("Why won't she nap?", ["nap"], light) == {"name": "open", "model": "gpt-3.5-turbo"}
+    assert choose_route("Delay nap 30 minutes", ["nap"], light)["name"] == "command"
+    assert escalation()["name"] == "open"
+
+    stats = RouteStats()
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+    stats.record("command", "gpt-3.5-turbo", 0.2, usage)
+    stats.record("open", "gpt-4", 1.5, usage, escalated=True)
+    snapshot = stats.snapshot()
+    assert snapshot["command"]["calls"] == 1
+    assert snapshot["command"]["cost_usd"] == pytest.approx(0.00065)
+    assert snapshot["open"]["escalated"] == 1
+    assert snapshot["open"]["cost_usd"] == pytest.approx(0.036)
+    assert snapshot["open"]["latency"]["p50"] == 1.5
+
+
+def test_only_unusable_answers_escalate():
+    def message(content=None, arguments=None):
+        call = SimpleNamespace(name="update_schedule", arguments=arguments) if arguments is not None else None
+        return SimpleNamespace(content=content, function_call=call)
+
+    assert usable(message(arguments='{"activity_name": "nap", "new_time": "13:30"}'))
+    assert usable(message("Which nap do you mean?"))  # Asking back is an answer
+    assert not usable(message())
+    assert not usable(message("  "))
+    assert not usable(message(arguments='{"activity_name": "nap"'))
+    assert not usable(message(arguments='"nap"'))
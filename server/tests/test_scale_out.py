@@ -0,0 +1,104 @@
+"""
+Multi-worker harness: two real uvicorn workers sharing a storage directory
+behind the household router, with a local stand-in for ElevenLabs.
+"""
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from router import pick_worker
+from run_cluster import start_cluster, stop_cluster
+
+
+class FakeTTS(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        FakeTTS.calls += 1
+        body = b"FAKE-AUDIO-" + self.path.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port_block(size):
+    for _ in range(50):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            base = sock.getsockname()[1]
+        if base + size >= 65535:
+            continue
+        try:
+            for port in range(base, base + size):
+                with socket.socket() as probe:
+                    probe.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+    raise RuntimeError("No free port block")
+
+
+def test_pick_worker_is_sticky_and_spreads():
+    workers = ["http://w1", "http://w2", "http://w3"]
+    assert all(pick_worker("home-a", workers) == pick_worker("home-a", workers) for _ in range(5))
+    assigned = {pick_worker(f"home-{i}", workers) for i in range(50)}
+    assert assigned == set(workers)
+    # Removing a worker only moves the households that were on it
+    for i in range(50):
+        before = pick_worker(f"home-{i}", workers)
+        if before != "http://w3":
+            assert pick_worker(f"home-{i}", workers[:2]) == before
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    tts = ThreadingHTTPServer(("127.0.0.1", 0), FakeTTS)
+    threading.Thread(target=tts.serve_forever, daemon=True).start()
+    FakeTTS.calls = 0
+
+    port = _free_port_block(3)
+    router_url, worker_urls, processes = start_cluster(2, port, str(tmp_path / "shared"), extra_env={
+        "OPENAI_API_KEY": "test",
+        "ELEVENLABS_API_KEY": "test",
+        "ELEVENLABS_BASE_URL": f"http://127.0.0.1:{tts.server_address[1]}",
+        "HOUSEHOLD_KEYS": "home-a=key-a",
+    })
+    try:
+        yield router_url, worker_urls
+    finally:
+        stop_cluster(processes)
+        tts.shutdown()
+
+
+def test_audio_made_on_one_worker_is_served_by_another(cluster):
+    router_url, worker_urls = cluster
+    headers = {"X-Household-ID": "home-a", "X-Household-Key": "key-a"}
+
+    response = requests.post(f"{router_url}/synthesize", json={"text": "Art is over in 5 minutes"}, headers=headers)
+    assert response.status_code == 200
+    served_by = response.headers["X-Served-By"]
+    audio_url = response.headers["Content-Location"]
+
+    # Sticky: the household keeps landing on the same worker
+    again = requests.post(f"{router_url}/synthesize", json={"text": "It's time for art!"}, headers=headers)
+    assert again.headers["X-Served-By"] == served_by
+
+    other = next(url for url in worker_urls if url != served_by)
+    fetched = requests.get(f"{other}{audio_url}")
+    assert fetched.status_code == 200
+    assert fetched.content == response.content
+
+    # The other worker reuses the shared clip instead of calling TTS again
+    calls = FakeTTS.calls
+    direct = requests.post(f"{other}/synthesize", json={"text": "Art is over in 5 minutes"}, headers=headers)
+    assert direct.content == response.content
+    assert FakeTTS.calls == calls
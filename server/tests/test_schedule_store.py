@@ -0,0 +1,69 @@
+import threading
+
+from schedule_store import ScheduleStore
+
+DAY = "2025-05-16"
+
+
+def test_seed_once_then_changes_win(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedules.db"))
+    assert store.seed("home-a", DAY, {"nap": "13:00", "lunch": {"start_time": "12:00"}, "morning": {}})
+    # A second device's stale upload does not overwrite the stored day
+    assert not store.seed("home-a", DAY, {"nap": "09:00"})
+    assert store.schedule("home-a", DAY) == {"lunch": "12:00", "nap": "13:00"}
+
+    result = store.apply("home-a", [{"day": DAY, "activity_name": "nap", "time": "1:30 pm"}], "voice")
+    assert result["applied"][0]["old_time"] == "13:00"
+    assert store.schedule("home-a", DAY)["nap"] == "13:30"
+    # Repeating a change is a no-op and doesn't move the cursor
+    assert store.apply("home-a", [{"day": DAY, "activity_name": "nap", "time": "13:30"}])["applied"] == []
+    assert store.cursor("home-a") == 3
+    assert store.schedule("home-b", DAY) == {}
+
+
+def test_sync_returns_each_changed_entry_once(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedules.db"))
+    store.seed("home-a", DAY, {"nap": "13:00", "lunch": "12:00", "bath": "18:30"})
+    cursor = store.cursor("home-a")
+    for new_time in ("13:10", "13:20", "13:30"):
+        store.apply("home-a", [{"day": DAY, "activity_name": "nap", "time": new_time}])
+    store.apply("home-a", [{"day": DAY, "activity_name": "bath", "time": None}])
+
+    sync = store.changes_since("home-a", cursor)
+    assert [(c["activity_name"], c["time"]) for c in sync["changes"]] == [("nap", "13:30"), ("bath", None)]
+    assert sync["cursor"] == store.cursor("home-a") and not sync["more"]
+    assert store.changes_since("home-a", sync["cursor"])["changes"] == []
+
+    # Paging, and a cursor from before the server's database was replaced
+    first = store.changes_since("home-a", 0, limit=2)
+    assert first["more"] and len(first["changes"]) == 2
+    assert store.changes_since("home-a", first["cursor"], limit=2)["changes"][-1]["activity_name"] == "bath"
+    assert store.changes_since("home-a", 999)["reset"]
+
+
+def test_base_seq_detects_conflicts(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedules.db"))
+    store.seed("home-a", DAY, {"nap": "13:00"})
+    seen = store.cursor("home-a")
+    store.apply("home-a", [{"day": DAY, "activity_name": "nap", "time": "13:30"}])
+
+    result = store.apply("home-a", [{"day": DAY, "activity_name": "nap", "time": "14:00", "base_seq": seen}])
+    assert result["applied"] == []
+    assert result["conflicts"] == [{"day": DAY, "activity_name": "nap", "time": "13:30", "seq": seen + 1}]
+
+
+def test_concurrent_writers_get_distinct_sequence_numbers(tmp_path):
+    path = str(tmp_path / "schedules.db")
+    stores = [ScheduleStore(path) for _ in range(2)]  # Like two workers sharing STORAGE_PATH
+
+    def write(store, offset):
+        for i in range(20):
+            store.apply("home-a", [{"day": DAY, "activity_name": f"a{offset}", "time": f"10:{i:02d}"}])
+
+    threads = [threading.Thread(target=write, args=(stores[i % 2], i)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stores[0].cursor("home-a") == 80
+    assert {c["time"] for c in stores[1].changes_since("home-a")["changes"]} == {"10:19"}
@@ -0,0 +1,19 @@
+import asyncio
+
+import pytest
+
+import speakers
+from speakers import _parse_profiles, profile_for, speaker_profile
+
+
+def test_wake_words_map_to_profiles(monkeypatch):
+    monkeypatch.setattr(speakers, "WAKE_WORD_PROFILES", _parse_profiles("hey_mycroft=light, alexa=full"))
+
+    assert profile_for("hey_mycroft")["name"] == "light"
+    assert profile_for("hey_mycroft")["models"] == speakers.PROFILES["light"]["models"]
+    assert profile_for("hey_jarvis")["name"] == speakers.DEFAULT_PROFILE
+    assert asyncio.run(speaker_profile(" ")) == {"wake_word": None, "name": speakers.DEFAULT_PROFILE,
+                                                **speakers.PROFILES[speakers.DEFAULT_PROFILE]}
+
+    with pytest.raises(ValueError):
+        _parse_profiles("hey_mycroft=tiny")
@@ -0,0 +1,33 @@
+import pytest
+
+import storage
+from storage import FileStore, create_store
+
+
+def test_blobs_round_trip(tmp_path):
+    store = FileStore(str(tmp_path))
+    assert not store.exists("tts_abc.wav") and store.get("tts_abc.wav") is None
+    store.put("tts_abc.wav", b"RIFF")
+    assert store.exists("tts_abc.wav") and store.get("tts_abc.wav") == b"RIFF"
+    # Another worker pointed at the same directory sees it
+    assert create_store("shared", path=str(tmp_path)).get("tts_abc.wav") == b"RIFF"
+
+    for key in ["", "../etc/passwd", "a/b", ".cache"]:
+        with pytest.raises(ValueError):
+            store.get(key)
+
+
+def test_cache_entries_expire(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path))
+    now = [1000.0]
+    monkeypatch.setattr(storage.time, "time", lambda: now[0])
+
+    store.cache_set("idempotency-1", {"status": "done", "response": {"text": "OK"}}, ttl=60)
+    store.cache_set("forever", [1, 2])
+    assert store.cache_get("idempotency-1") == {"status": "done", "response": {"text": "OK"}}
+    assert store.cache_get("missing") is None
+
+    now[0] += 61
+    assert store.cache_get("idempotency-1") is None
+    assert store.cache_get("forever") == [1, 2]
+    assert not store.exists("idempotency-1")  # Cache entries aren't blobs
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import tenancy
+from tenancy import FairScheduler, TokenBucket, Tenants
+
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate_per_second=0.0, burst=3)
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_busy_household_does_not_starve_others():
+    order = []
+
+    async def work(scheduler, household_id, label):
+        async with scheduler.slot(household_id):
+            order.append(label)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        scheduler = FairScheduler("llm", concurrency=1)
+        busy = [asyncio.create_task(work(scheduler, "busy", f"busy-{i}")) for i in range(5)]
+        await asyncio.sleep(0)
+        quiet = asyncio.create_task(work(scheduler, "quiet", "quiet-0"))
+        await asyncio.gather(*busy, quiet)
+
+    asyncio.run(main())
+    # The quiet household runs right after the request already in flight
+    assert order.index("quiet-0") <= 2
+    assert len(order) == 6
+
+
+def test_weights_share_the_stage(monkeypatch):
+    monkeypatch.setattr(tenancy, "HOUSEHOLD_WEIGHTS", {"big": 2.0})
+    order = []
+
+    async def work(scheduler, household_id):
+        async with scheduler.slot(household_id):
+            order.append(household_id)
+            await asyncio.sleep(0)
+
+    async def main():
+        scheduler = FairScheduler("llm", concurrency=1)
+        tasks = [asyncio.create_task(work(scheduler, h)) for h in ["big"] * 6 + ["small"] * 6]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # Among the first nine turns "big" gets twice the share of "small"
+    assert order[:9].count("big") == 6
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def main():
+        scheduler = FairScheduler("tts", concurrency=1)
+        gate = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        async def quick():
+            async with scheduler.slot("b"):
+                return "done"
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(quick())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        gate.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await asyncio.wait_for(quick(), 1) == "done"
+
+    asyncio.run(main())
+
+
+def test_usage_snapshot():
+    tenants = Tenants()
+    assert tenants.admit("home-a")
+
+    async def main():
+        async with tenants.stage("home-a", "llm"):
+            pass
+
+    asyncio.run(main())
+    tenants.usage.add("home-a", "llm_tokens", 120)
+    usage = tenants.usage.snapshot()["home-a"]
+    assert usage["requests"] == 1
+    assert usage["usage"] == {"llm_tokens": 120}
+    assert usage["latency"]["llm"]["count"] == 1
+
+
+def test_households_must_prove_who_they_are(monkeypatch):
+    monkeypatch.setattr(tenancy, "HOUSEHOLD_KEYS", {})
+    assert asyncio.run(tenancy.household(None, None)) == "default"
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(tenancy.household("home-a", None))  # Only the default household without keys
+    assert rejected.value.status_code == 401
+
+    monkeypatch.setattr(tenancy, "HOUSEHOLD_KEYS", tenancy._parse_keys("home-a=secret, home-b=other"))
+    assert asyncio.run(tenancy.household("home-a", "secret")) == "home-a"
+    for household_id, key in [("home-a", "other"), ("home-a", None), ("home-c", "secret"), (None, None)]:
+        with pytest.raises(HTTPException):
+            asyncio.run(tenancy.household(household_id, key))
+
+
+def test_idle_households_are_forgotten(monkeypatch):
+    monkeypatch.setattr(tenancy, "IDLE_SWEEP_SIZE", 8)
+    monkeypatch.setattr(tenancy, "HOUSEHOLD_RATE_PER_MINUTE", 6e7)  # Refilled by the next request
+    tenants = Tenants()
+    scheduler = FairScheduler("llm", concurrency=1)
+
+    async def visit(household_id):
+        async with scheduler.slot(household_id):
+            pass
+
+    async def main():
+        for i in range(100):  # Each household comes once and leaves
+            assert tenants.admit(f"home-{i}")
+            await visit(f"home-{i}")
+
+    asyncio.run(main())
+    assert len(scheduler._last_tag) <= 9
+    assert len(tenants.buckets) <= 9
+
+
+def test_admin_views_need_the_token(monkeypatch):
+    monkeypatch.setattr(tenancy, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException):
+        asyncio.run(tenancy.admin("Bearer "))  # Off when unset
+    monkeypatch.setattr(tenancy, "ADMIN_TOKEN", "s3cret")
+    asyncio.run(tenancy.admin("Bearer s3cret"))
+    for header in [None, "Bearer nope", "s3cret", "Basic s3cret"]:
+        with pytest.raises(HTTPException):
+            asyncio.run(tenancy.admin(header))
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import numpy as np
+
+from transcription import (
+    MicroBatcher, TranscriptionService, decode_wav, encode_wav, split_at_silences, trim_silence
+)
+
+RATE = 16000
+
+
+def speech(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    return (2000 * rng.standard_normal(int(seconds * RATE))).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+def test_trim_keeps_speech_and_padding():
+    audio = np.concatenate([silence(2.0), speech(1.0), silence(3.0)])
+    trimmed = trim_silence(audio, RATE, threshold=60, pad=0.25)
+    assert abs(len(trimmed) / RATE - 1.5) < 0.07
+    assert trim_silence(silence(1.0), RATE, threshold=60) is None
+
+
+def test_long_audio_is_cut_in_its_pauses():
+    # Three 6 s phrases with short pauses between them
+    audio = np.concatenate([speech(6, 1), silence(0.5), speech(6, 2), silence(0.5), speech(6, 3)])
+    segments = split_at_silences(audio, RATE, max_seconds=10, min_seconds=3)
+    assert len(segments) == 3
+    assert sum(len(s) for s in segments) == len(audio)
+    assert all(len(s) <= 10 * RATE for s in segments)
+    # Every cut lands inside a pause
+    cut = len(segments[0])
+    assert not audio[cut - 100:cut + 100].any()
+
+
+class FakeBackend:
+    def __init__(self):
+        self.segments = []
+        self.files = []
+
+    async def transcribe(self, household_id, segments, rate):
+        self.segments.append([len(s) / rate for s in segments])
+        # Finish out of order; the service must keep the original order
+        async def one(i):
+            await asyncio.sleep(0.01 * (len(segments) - i))
+            return f" part {i} "
+        return await asyncio.gather(*(one(i) for i in range(len(segments))))
+
+    async def transcribe_file(self, household_id, data, filename):
+        self.files.append(filename)
+        return "whole file"
+
+
+def test_service_trims_splits_and_merges_in_order():
+    backend = FakeBackend()
+    service = TranscriptionService(backend)
+    audio = np.concatenate([silence(1), speech(8, 1), silence(0.5), speech(8, 2), silence(1)])
+    assert decode_wav(encode_wav(audio, RATE))[1] == RATE
+
+    text = asyncio.run(service.transcribe("home-a", encode_wav(audio, RATE), "question.wav"))
+    assert text == "part 0 part 1"
+    assert len(backend.segments[0]) == 2
+
+    # Not a WAV, or nothing but silence: sent as it is
+    assert asyncio.run(service.transcribe("home-a", b"ID3 not a wav", "question.mp3")) == "whole file"
+    assert asyncio.run(service.transcribe("home-a", encode_wav(silence(1), RATE), "q.wav")) == "whole file"
+    assert backend.files == ["question.mp3", "q.wav"]
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    def run_batch(items):
+        time.sleep(0.02)
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch=4, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert asyncio.run(main()) == [i * 10 for i in range(10)]
+    assert batcher.batch_sizes == [4, 4, 2]
@@ -0,0 +1,61 @@
+import json
+
+import msgpack
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from wire import MSGPACK, NegotiatedResponse, NegotiatedRoute, accepts_msgpack, decode_context
+
+CONTEXT = {"local_time": "2026-01-01T09:00", "daily_context": {"schedule": {"nap": "13:00"}, "mood_notes": None}}
+
+
+class Echo(BaseModel):
+    text: str
+    context: dict
+
+
+def _client():
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    app.router.route_class = NegotiatedRoute
+
+    @app.post("/echo")
+    async def echo(request: Echo):
+        return {"text": request.text.upper(), "schedule": request.context["daily_context"]["schedule"]}
+
+    return TestClient(app)
+
+
+def test_accept_header_negotiation():
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/msgpack, application/json;q=0.5")
+    assert not accepts_msgpack("application/json, application/msgpack;q=0.5")
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack(None)
+
+
+def test_msgpack_bodies_and_answers():
+    client = _client()
+    body = {"text": "delay nap", "context": CONTEXT}
+    expected = {"text": "DELAY NAP", "schedule": {"nap": "13:00"}}
+
+    plain = client.post("/echo", json=body)
+    assert plain.headers["content-type"] == "application/json" and plain.json() == expected
+
+    packed = client.post("/echo", content=msgpack.packb(body),
+                         headers={"Content-Type": MSGPACK, "Accept": MSGPACK})
+    assert packed.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(packed.content) == expected
+
+    # Either direction on its own
+    assert client.post("/echo", json=body, headers={"Accept": MSGPACK}).headers["content-type"] == MSGPACK
+    assert client.post("/echo", content=msgpack.packb(body), headers={"Content-Type": MSGPACK}).json() == expected
+
+    # Bad bodies are the client's fault, whatever the encoding
+    assert client.post("/echo", content=b"\xc1", headers={"Content-Type": MSGPACK}).status_code == 400
+    assert client.post("/echo", content=msgpack.packb({"text": 1}), headers={"Content-Type": MSGPACK}).status_code == 422
+
+
+def test_decode_context_reads_either_encoding():
+    assert decode_context(msgpack.packb(CONTEXT), MSGPACK) == CONTEXT
+    assert decode_context(json.dumps(CONTEXT)) == CONTEXT
@@ -0,0 +1,251 @@
+"""
+Speech-to-text for uploaded questions.
+
+Before anything is sent to the ASR backend:
+
+* leading and trailing silence is trimmed, so the upload and the billed
+  audio are only as long as the speech (plus a little padding)
+* recordings longer than ``ASR_SEGMENT_SECONDS`` are split at their
+  quietest points, the segments are transcribed in parallel, and the
+  texts are joined back in order
+
+Uploads that are not 16-bit PCM WAV, or where nothing rises above the
+silence threshold, are sent as they are.
+
+Backends (``ASR_BACKEND``):
+
+* ``openai`` - Whisper through the OpenAI API (the default); each segment
+  is its own request and takes its own fair turn at the ``asr`` stage
+* ``local``  - a Whisper model run in this process with Hugging Face
+  transformers (``ASR_LOCAL_MODEL``, needs ``pip install transformers
+  torch``). Segments from concurrent requests are micro-batched: the first
+  one waits up to ``ASR_BATCH_WAIT_MS`` for others, and up to
+  ``ASR_BATCH_SIZE`` run through the model together. Each request holds
+  one ``asr`` slot while it waits, so raise ``ASR_CONCURRENCY`` to at
+  least the batch size.
+
+Seconds of audio actually transcribed are counted per household as
+``asr_seconds`` usage.
+"""
+import asyncio
+import io
+import logging
+import os
+import wave
+
+import numpy as np
+import openai
+from starlette.concurrency import run_in_threadpool
+
+from tenancy import tenants
+
+logger = logging.getLogger(__name__)
+
+ASR_SILENCE_RMS = float(os.getenv("ASR_SILENCE_RMS", "60"))  # int16 units, like the client's silence threshold
+ASR_PAD_SECONDS = float(os.getenv("ASR_PAD_SECONDS", "0.25"))
+ASR_SEGMENT_SECONDS = float(os.getenv("ASR_SEGMENT_SECONDS", "10"))
+ASR_MIN_SEGMENT_SECONDS = float(os.getenv("ASR_MIN_SEGMENT_SECONDS", "3"))
+ASR_BATCH_SIZE = int(os.getenv("ASR_BATCH_SIZE", "8"))
+ASR_BATCH_WAIT_MS = float(os.getenv("ASR_BATCH_WAIT_MS", "20"))
+ASR_LOCAL_MODEL = os.getenv("ASR_LOCAL_MODEL", "openai/whisper-base")
+
+FRAME_SECONDS = 0.03
+
+
+def decode_wav(data):
+    """Mono int16 samples and the sample rate of a 16-bit PCM WAV, or None for anything else."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getcomptype() != "NONE":
+                return None
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+    except (wave.Error, EOFError):
+        return None
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def encode_wav(samples, rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+
+def frame_rms(samples, frame):
+    """RMS level of each whole frame of ``frame`` samples."""
+    count = len(samples) // frame
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def trim_silence(samples, rate, threshold=None, pad=None):
+    """Samples from just before the first loud frame to just after the last, or None if all quiet."""
+    threshold = ASR_SILENCE_RMS if threshold is None else threshold
+    pad = ASR_PAD_SECONDS if pad is None else pad
+    frame = max(1, int(rate * FRAME_SECONDS))
+    loud = np.flatnonzero(frame_rms(samples, frame) >= threshold)
+    if not len(loud):
+        return None
+    start = max(0, loud[0] * frame - int(pad * rate))
+    end = min(len(samples), (loud[-1] + 1) * frame + int(pad * rate))
+    return samples[start:end]
+
+
+def split_at_silences(samples, rate, max_seconds=None, min_seconds=None):
+    """Split into segments of at most max_seconds, cutting at the quietest frame in reach."""
+    max_len = int((max_seconds or ASR_SEGMENT_SECONDS) * rate)
+    min_len = int((min_seconds or ASR_MIN_SEGMENT_SECONDS) * rate)
+    frame = max(1, int(rate * FRAME_SECONDS))
+    levels = frame_rms(samples, frame)
+    segments = []
+    start = 0
+    while len(samples) - start > max_len:
+        # Quietest frame between min_len and max_len into the segment
+        first, last = (start + min_len) // frame, (start + max_len) // frame
+        quietest = first + int(np.argmin(levels[first:last])) if last > first else last
+        cut = quietest * frame + frame // 2
+        segments.append(samples[start:cut])
+        start = cut
+    segments.append(samples[start:])
+    return segments
+
+
+class OpenAIWhisper:
+    """One Whisper API request per segment, all in flight at once."""
+
+    async def _one(self, household_id, name, data):
+        async with tenants.stage(household_id, "asr"):
+            result = await run_in_threadpool(
+                openai.audio.transcriptions.create, model="whisper-1", file=(name, data)
+            )
+        return result.text
+
+    async def transcribe(self, household_id, segments, rate):
+        return await asyncio.gather(*(
+            self._one(household_id, f"segment-{i}.wav", encode_wav(segment, rate))
+            for i, segment in enumerate(segments)
+        ))
+
+    async def transcribe_file(self, household_id, data, filename):
+        return await self._one(household_id, filename or "audio.wav", data)
+
+
+class MicroBatcher:
+    """Collect concurrent submissions and run them through ``run_batch`` together.
+
+    One worker runs the batches, one at a time. A batch starts once it is
+    full or its oldest item has waited ``max_wait`` seconds; while a batch
+    runs, the next one fills up.
+    """
+
+    def __init__(self, run_batch, max_batch=None, max_wait=None):
+        self.run_batch = run_batch
+        self.max_batch = max_batch or ASR_BATCH_SIZE
+        self.max_wait = ASR_BATCH_WAIT_MS / 1000 if max_wait is None else max_wait
+        self.pending = []  # (item, future, enqueued at)
+        self.batch_sizes = []
+        self._loop = None
+        self._wakeup = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            loop.create_task(self._worker())
+        future = loop.create_future()
+        self.pending.append((item, future, loop.time()))
+        self._wakeup.set()
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            while self.pending and len(self.pending) < self.max_batch:
+                remaining = self.pending[0][2] + self.max_wait - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            if not self.pending:
+                self._wakeup.clear()
+            if not batch:
+                continue
+            self.batch_sizes.append(len(batch))
+            try:
+                results = await run_in_threadpool(self.run_batch, [item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class LocalWhisper:
+    """A Whisper model in this process; segments of concurrent requests are batched."""
+
+    def __init__(self, model_name=None, max_batch=None, max_wait=None):
+        try:
+            from transformers import pipeline
+        except ImportError:
+            raise ValueError("ASR_BACKEND=local needs transformers: pip install transformers torch")
+        self.pipeline = pipeline("automatic-speech-recognition", model=model_name or ASR_LOCAL_MODEL)
+        self.batcher = MicroBatcher(self._run_batch, max_batch, max_wait)
+
+    def _run_batch(self, items):
+        outputs = self.pipeline(items, batch_size=len(items))
+        return [output["text"] for output in outputs]
+
+    async def transcribe(self, household_id, segments, rate):
+        async with tenants.stage(household_id, "asr", cost=len(segments)):
+            return await asyncio.gather(*(
+                self.batcher.submit({"raw": segment.astype(np.float32) / 32768.0, "sampling_rate": rate})
+                for segment in segments
+            ))
+
+    async def transcribe_file(self, household_id, data, filename):
+        async with tenants.stage(household_id, "asr"):
+            return await self.batcher.submit(data)
+
+
+class TranscriptionService:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def transcribe(self, household_id, data, filename=None):
+        """Text of an uploaded recording."""
+        decoded = decode_wav(data)
+        if decoded is None:
+            return await self.backend.transcribe_file(household_id, data, filename)
+        samples, rate = decoded
+        speech = trim_silence(samples, rate)
+        if speech is None:
+            return await self.backend.transcribe_file(household_id, data, filename)
+        segments = split_at_silences(speech, rate)
+        tenants.usage.add(household_id, "asr_seconds", len(speech) / rate)
+        logger.debug(f"Transcribing {len(speech) / rate:.1f}s of {len(samples) / rate:.1f}s in {len(segments)} segment(s)")
+        texts = await self.backend.transcribe(household_id, segments, rate)
+        return " ".join(text.strip() for text in texts if text and text.strip())
+
+
+def create_transcriber(backend=None):
+    backend = backend or os.getenv("ASR_BACKEND", "openai")
+    if backend == "openai":
+        return TranscriptionService(OpenAIWhisper())
+    if backend == "local":
+        return TranscriptionService(LocalWhisper())
+    raise ValueError(f"Unknown ASR_BACKEND: {backend}")
@@ -0,0 +1,110 @@
+"""
+MessagePack or JSON on the wire, chosen per request.
+
+* Request bodies sent as ``Content-Type: application/msgpack`` are decoded
+  by ``NegotiatedRoute`` and validated like JSON ones. /process-audio also
+  takes its context as a ``packed_context`` file part of that type instead
+  of the ``context`` JSON string field.
+* Responses are MessagePack when the request's ``Accept`` asks for it
+  (``NegotiatedResponse``), JSON otherwise. Error responses stay JSON.
+
+MessagePack needs the ``msgpack`` package (its C encoder). Without it the
+server answers JSON only and turns MessagePack bodies away with 415, so a
+client can fall back.
+
+Compare sizes and encode/decode times with tests/benchmark_wire.py.
+"""
+import contextvars
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+# Whether the request being handled asked for MessagePack answers
+_wants_msgpack = contextvars.ContextVar("wants_msgpack", default=False)
+
+
+def is_msgpack(content_type):
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_TYPES
+
+
+def accepts_msgpack(accept):
+    """True if ``accept`` prefers MessagePack over JSON (and the server can write it)."""
+    if msgpack is None or not accept:
+        return False
+    preference = {}
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = next((float(p[2:]) for p in params if p.startswith("q=")), 1.0)
+        preference[media_type.lower()] = quality
+    best = max((preference.get(media_type, 0.0) for media_type in MSGPACK_TYPES), default=0.0)
+    return best > 0 and best >= preference.get("application/json", 0.0)
+
+
+def packb(value):
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpackb(data):
+    if msgpack is None:
+        raise HTTPException(status_code=415, detail="This server can't read MessagePack; send JSON")
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid MessagePack: {e}")
+
+
+def decode_context(data, content_type=None):
+    """A context dict from a MessagePack part, or from JSON bytes/text."""
+    if is_msgpack(content_type):
+        return unpackb(data)
+    return json.loads(data)
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON, or MessagePack if the request asked for it."""
+
+    def render(self, content):
+        if _wants_msgpack.get():
+            self.media_type = MSGPACK
+            return packb(content)
+        return super().render(content)
+
+
+class _MsgpackBodyRequest(Request):
+    """A MessagePack body, handed to FastAPI as if it had been JSON."""
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """Reads MessagePack bodies and remembers whether to answer in MessagePack."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request):
+            _wants_msgpack.set(accepts_msgpack(request.headers.get("accept")))
+            if is_msgpack(request.headers.get("content-type")):
+                # FastAPI only parses JSON content types; the body is decoded by json() above
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, b"application/json" if name == b"content-type" else value)
+                    for name, value in request.scope["headers"]
+                ]
+                request = _MsgpackBodyRequest(scope, request.receive)
+            return await handler(request)
+
+        return negotiated_handler